@@ -248,7 +248,8 @@ def load_all_data():
     
     with st.spinner('🌍 Chargement Europe (ENTSOE-E)...'):
         prices_europe = fetch_european_prices(countries=['FR', 'DE', 'ES'], days=7)
-        predictions_europe = predict_prices_europe(prices_europe, {}, forecast_hours=48)
+        predictions_europe = predict_prices_europe(prices_europe, {}, forecast_hours=48,
+                                                   residual_stats=load_residual_statistics())
     
     # 3. Supply/Demand Data
     client, _ = init_clients()
@@ -270,53 +271,155 @@ def load_all_data():
     
     return df_france, prices_europe, predictions_europe, supply_demand
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_residual_statistics():
+    """Statistiques des erreurs de prévision stockées en base (zones sans historique: valeurs par défaut)"""
+    from src.analysis.scenarios import residual_statistics, residuals_from_db
+    _, db = init_clients()
+    return residual_statistics(residuals_from_db(db))
+
+def default_stats_caption(zones):
+    """Signale les zones dont les intervalles/scénarios reposent sur les statistiques par défaut"""
+    from src.analysis.scenarios import DEFAULT_AR, DEFAULT_CORRELATION, DEFAULT_SIGMA
+    estimated = load_residual_statistics()['estimated']
+    defaults = [z for z in zones if z not in estimated]
+    if defaults:
+        st.caption(f"ℹ️ Sans historique de résidus pour {', '.join(defaults)}: incertitude par défaut "
+                   f"(σ {DEFAULT_SIGMA:.0f} €/MWh, AR {DEFAULT_AR}, corrélation {DEFAULT_CORRELATION})")
+
+@st.cache_resource(ttl=3600)
+def build_price_scenarios(predictions_europe):
+    """Scénarios Monte Carlo (scénario × zone × heure) partagés par l'arbitrage et les contrats"""
+    from src.analysis.scenarios import generate_price_scenarios
+    return generate_price_scenarios(predictions_europe, load_residual_statistics())
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def run_walk_forward_backtest(df_full, features):
+    """Backtest walk-forward (folds entraînés en parallèle), recalculé quand l'historique change"""
+    from src.analysis.walk_forward_backtest import walk_forward_backtest
+    return walk_forward_backtest(df_full, features)
+
+@st.cache_data(ttl=3600, max_entries=16, show_spinner=False)
+def run_what_if(_model, _features, _df_france, model_version, data_key, forecast_run, temp_range, wind_range, demand_shift):
+    """
+    Grille what-if (un seul appel au modèle), recalculée seulement quand le modèle,
+    l'historique, le run météo ou les curseurs changent
+    
+    Returns:
+        (summary, prix moyen de référence, nombre de scénarios), None sans prévisions météo
+    """
+    from src.analysis.what_if import perturbation_grid, what_if_sweep
+    
+    grid = perturbation_grid({
+        'temperature_c': ('add', np.arange(temp_range[0], temp_range[1] + 0.5, 0.5)),
+        'wind_speed_kmh': ('scale', np.arange(wind_range[0], wind_range[1] + 5, 5) / 100),
+        'demand_gw': ('scale', [1 + demand_shift / 100]),
+    })
+    
+    cube = what_if_sweep(_model, _features, _df_france, grid, days=2)
+    if cube is None:
+        return None
+    return cube.summary(), float(cube.baseline.mean()), len(grid)
+
+@st.cache_resource
+def load_calibrator():
+    """Calibrateur d'intervalles conformes (gardé en mémoire, complété à chaque appel)"""
+    from src.models.conformal import ConformalCalibrator
+    return ConformalCalibrator()
+
+def get_calibrator():
+    """Calibrateur à jour: seules les erreurs arrivées depuis le dernier appel sont intégrées"""
+    _, db = init_clients()
+    calibrator = load_calibrator()
+    calibrator.sync(db)
+    return calibrator
+
+def store_forecast(predictions, model, zone='FR'):
+    """
+    Stocke une prévision émise (une fois par heure d'émission et version de modèle):
+    ses erreurs alimentent le calibrateur quand les prix réels arrivent
+    """
+    _, db = init_clients()
+    future = predictions[predictions['lead_time_hours'] >= 1]
+    if future.empty:
+        return 0
+    
+    metadata = getattr(model, 'metadata', None) or {}
+    model_version = f"{metadata.get('name')}:{metadata.get('version')}" if metadata else type(model).__name__
+    issued_at = future['timestamp'].iloc[0] - pd.Timedelta(hours=int(future['lead_time_hours'].iloc[0]))
+    
+    batch = future.rename(columns={'timestamp': 'target_timestamp'}).assign(zone=zone)
+    try:
+        return db.store_prediction_batch(batch, model_version=model_version, prediction_time=issued_at)
+    except Exception as e:
+        print(f"⚠️ Prévision non stockée: {e}")
+        return 0
+
 @st.cache_resource
+def start_training_worker():
+    """Worker d'entraînement en arrière-plan (un par machine)"""
+    from src.models.training_worker import ensure_training_worker
+    return ensure_training_worker()
+
+@st.cache_resource
+def start_inference_server():
+    """Serveur de prédiction local partagé par les process du dashboard (un par machine)"""
+    from src.models.inference_server import ensure_inference_server
+    return ensure_inference_server()
+
+@st.cache_resource
+def load_model_version(version):
+    """Modèle publié au registre: servi par le serveur local (modèle chaud, micro-lots), sinon chargé ici"""
+    from src.models.inference_server import connect_model
+    from src.models.training import MODEL_NAME
+    return connect_model(MODEL_NAME, version)
+
 def train_models(_df_france):
-    """Entraîne les modèles ML"""
-    from sklearn.ensemble import RandomForestRegressor
-    from sklearn.model_selection import train_test_split
-    
-    # Features
-    df = _df_france.copy()
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.dayofweek
-    df['month'] = df['timestamp'].dt.month
-    df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-    df['is_peak_hour'] = ((df['hour'] >= 18) & (df['hour'] <= 20)).astype(int)
-    
-    if 'temperature_c' in df.columns:
-        df['temp_extreme'] = ((df['temperature_c'] < 5) | (df['temperature_c'] > 25)).astype(int)
-    
-    prod_cols = [c for c in df.columns if 'production_gw' in c and c != 'total_production_gw']
-    if prod_cols:
-        renewable_cols = [c for c in prod_cols if 'wind' in c.lower() or 'solar' in c.lower()]
-        if renewable_cols:
-            df['renewable_production_gw'] = df[renewable_cols].sum(axis=1)
-            df['renewable_share'] = df['renewable_production_gw'] / df['total_production_gw'].replace(0, np.nan)
-            df['renewable_share'] = df['renewable_share'].fillna(0)
-    
-    if 'demand_gw' in df.columns and 'total_production_gw' in df.columns:
-        df['production_demand_gap'] = df['demand_gw'] - df['total_production_gw']
-    
-    feature_columns = [
-        'temperature_c', 'wind_speed_kmh', 'solar_radiation_wm2',
-        'nuclear_production_gw', 'total_production_gw', 'demand_gw',
-        'hour', 'day_of_week', 'month', 'is_weekend', 'is_peak_hour',
-        'temp_extreme', 'renewable_share', 'production_demand_gap'
-    ]
-    feature_columns = [f for f in feature_columns if f in df.columns]
-    
-    X = df[feature_columns].fillna(0)
-    y = df['price_eur_mwh']
-    
-    split_idx = int(len(X) * 0.8)
-    X_train, X_test = X[:split_idx], X[split_idx:]
-    y_train, y_test = y[:split_idx], y[split_idx:]
-    
-    model = RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1)
-    model.fit(X_train, y_train)
-    
-    return model, feature_columns, df, X_test, y_test
+    """Modèle ML courant publié par le worker d'entraînement (jamais entraîné ni promu ici)"""
+    import time
+    from src.models.registry import ModelRegistry
+    from src.models.training import MODEL_NAME, prepare_training_data
+    
+    registry = ModelRegistry()
+    version = registry.current_version(MODEL_NAME)
+    
+    if version is None:
+        # Premier cycle du worker en cours: pages ML en attente (cf. show_model_pending)
+        return None
+    
+    # Nouvelle version promue par le worker → chargée au rerun suivant (hot-swap)
+    start = time.perf_counter()
+    model = load_model_version(version)
+    model.warm()  # Chargement effectif (memory-map local ou côté serveur)
+    load_seconds = time.perf_counter() - start
+    
+    data = prepare_training_data(_df_france, feature_columns=model.features)
+    training_report = {
+        'source': 'registre',
+        'version': registry.tag(MODEL_NAME, version),
+        'fingerprint': model.metadata.get('fingerprint'),
+        'load_seconds': load_seconds,
+        'train_seconds': model.metadata.get('train_seconds'),
+        'trained_at': model.metadata.get('created_at'),
+    }
+    
+    return model, data['feature_columns'], data['df'], data['X_test'], data['y_test'], training_report
+
+def show_model_pending():
+    """Aucun modèle publié: état du worker d'entraînement (premier cycle en cours)"""
+    from src.models.training_worker import read_worker_state, worker_alive
+    
+    state = read_worker_state() or {}
+    st.info(
+        "⏳ **Modèle en préparation** : le worker d'entraînement publie la première version "
+        "(quelques minutes). La page s'affichera dès qu'elle sera disponible."
+    )
+    st.caption(
+        f"Worker {'actif' if worker_alive() else 'non démarré'} · statut : {state.get('status', 'inconnu')} · "
+        f"dernier signal : {state.get('heartbeat', '—')}"
+    )
+    if st.button("🔄 Rafraîchir"):
+        st.rerun()
 
 # ==========================================
 # SIDEBAR NAVIGATION
@@ -450,13 +553,23 @@ def page_overview(df_france, prices_europe, predictions_europe, supply_demand, d
     # ==== BACKTESTING P&L ====
     st.markdown("---")
     st.subheader("💰 Backtesting ML - Performance Historique")
-    st.caption("📊 **Backtesting ML sur données historiques complètes** : Performance du modèle sur ensemble de test (30% des données) avec stratégie top 10 actions/jour")
+    from src.models.training import TRAIN_FRACTION
+    test_size = 1 - TRAIN_FRACTION
+    
+    # Fin de la fenêtre d'entraînement du modèle publié: seules les heures suivantes sont testées
+    data_window = (getattr(model, 'metadata', None) or {}).get('data_window')
+    train_end = pd.Timestamp(data_window[1]) if data_window else None
+    
+    if train_end is not None:
+        st.caption(f"📊 **Backtesting ML hors échantillon** : Performance du modèle sur les heures postérieures à sa fenêtre d'entraînement (après le {train_end:%d/%m/%Y %H:%M}, jamais vues) avec stratégie top 10 actions/jour")
+    else:
+        st.caption(f"📊 **Backtesting ML sur données historiques** : Performance du modèle sur les derniers {test_size:.0%} des données (fenêtre d'entraînement inconnue: recouvrement possible) avec stratégie top 10 actions/jour")
     
     try:
-        from src.analysis.ml_backtesting import calculate_ml_backtest
+        from src.analysis.backtest_cache import cached_ml_backtest
         
-        # Calculer backtesting ML sur données historiques complètes
-        backtest = calculate_ml_backtest(df_full, model, features, test_size=0.3)
+        # Recalculé seulement si le modèle, l'historique ou les paramètres changent (sinon cache)
+        backtest, _ = cached_ml_backtest(df_full, model, features, test_size=test_size, train_end=train_end)
         
         if not backtest['available']:
             st.warning(f"⚠️ {backtest['message']}")
@@ -553,6 +666,24 @@ def page_overview(df_france, prices_europe, predictions_europe, supply_demand, d
                     st.info("Pas encore de transactions")
             
             st.success(f"✅ **Backtesting ML validé** : {backtest['train_size']}h train + {backtest['test_size']}h test · R²={backtest['r2']:.2f} · MAE={backtest['mae']:.1f}€")
+            
+            # Walk-forward: un modèle réentraîné par période, toujours testé sur la suite
+            if st.toggle("🔁 Backtest walk-forward (réentraînement par période)"):
+                with st.spinner('⏳ Entraînement des folds en parallèle...'):
+                    walk_forward = run_walk_forward_backtest(df_full, features)
+                
+                if not walk_forward['available']:
+                    st.warning(f"⚠️ {walk_forward['message']}")
+                else:
+                    folds = walk_forward['folds'][['fold', 'train_hours', 'test_from', 'test_to', 'mae', 'rmse', 'pnl', 'win_rate']].copy()
+                    folds['test_from'] = pd.to_datetime(folds['test_from']).dt.strftime('%d/%m/%Y')
+                    folds['test_to'] = pd.to_datetime(folds['test_to']).dt.strftime('%d/%m/%Y')
+                    folds.columns = ['Fold', 'Heures train', 'Test du', 'Test au', 'MAE', 'RMSE', 'P&L (€/MWh)', 'Jours gagnants (%)']
+                    st.dataframe(folds, use_container_width=True, hide_index=True)
+                    
+                    timing = walk_forward['timing']
+                    st.caption(f"P&L hors échantillon {walk_forward['total_pnl']:.2f} €/MWh · RMSE {walk_forward['rmse']:.2f}€ · "
+                               f"{len(folds)} folds en {timing['total_seconds']:.1f}s sur {timing['workers']} process")
     
     except Exception as e:
         st.error(f"❌ Erreur backtesting: {e}")
@@ -1006,10 +1137,13 @@ def page_france(df_france, model, features):
                     model=model,
                     feature_columns=features,
                     historical_data=df_france,
-                    days=2
+                    days=2,
+                    calibrator=get_calibrator()
                 )
             
             if not future_predictions.empty:
+                store_forecast(future_predictions, model)
+                
                 # Graphique prédictions
                 fig = go.Figure()
                 
@@ -1070,6 +1204,58 @@ def page_france(df_france, model, features):
                     - {max_hour['timestamp'].strftime('%d/%m %Hh')} : **{max_price:.2f} €/MWh**
                     - Surcoût vs moyenne : **{max_price - avg_price:.2f} €/MWh**
                     """)
+                
+                # Scénarios what-if: toute la grille évaluée en un seul appel au modèle
+                with st.expander("🧪 Scénarios what-if (météo, demande)"):
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        temp_range = st.slider("Écart température (°C)", -10, 10, (-5, 5))
+                    with col2:
+                        wind_range = st.slider("Vent (% de la prévision)", 0, 200, (50, 150), step=10)
+                    with col3:
+                        demand_shift = st.slider("Demande (%)", -20, 20, 0, step=5)
+                    
+                    # Calcul à la demande (le contenu d'un expander s'exécute même replié)
+                    what_if = None
+                    if st.toggle("Calculer les scénarios"):
+                        from src.data.weather_service import current_model_run
+                        from src.features.pipeline import frame_hash
+                        
+                        metadata = getattr(model, 'metadata', None) or {}
+                        with st.spinner("🧪 Évaluation des scénarios..."):
+                            what_if = run_what_if(
+                                model, features, df_france,
+                                model_version=f"{metadata.get('name')}:{metadata.get('version')}",
+                                data_key=frame_hash(df_france),
+                                forecast_run=current_model_run(),
+                                temp_range=temp_range,
+                                wind_range=wind_range,
+                                demand_shift=demand_shift,
+                            )
+                    
+                    if what_if is not None:
+                        summary, baseline_mean, n_scenarios = what_if
+                        heatmap = summary.pivot(index='temperature_c', columns='wind_speed_kmh', values='mean_price')
+                        
+                        fig_what_if = go.Figure(data=go.Heatmap(
+                            z=heatmap.values,
+                            x=[f"{w:.0%}" for w in heatmap.columns],
+                            y=heatmap.index,
+                            colorscale='Oranges',
+                            colorbar=dict(title='€/MWh')
+                        ))
+                        fig_what_if.update_layout(
+                            title=f"Prix moyen 48h — {n_scenarios} scénarios",
+                            xaxis_title="Vent (% de la prévision)",
+                            yaxis_title="Écart température (°C)",
+                            template='plotly_dark',
+                            paper_bgcolor='#0c0c0c',
+                            plot_bgcolor='#161616',
+                            height=450
+                        )
+                        st.plotly_chart(fig_what_if, use_container_width=True)
+                        
+                        st.caption(f"Référence (prévision actuelle): {baseline_mean:.2f} €/MWh en moyenne")
             else:
                 st.error("Impossible de générer les prédictions")
         
@@ -1206,8 +1392,9 @@ def page_arbitrage(predictions_europe):
     from src.arbitrage.engine import ArbitrageEngine, generate_recommendation
     from src.data.entsoe_api import EntsoeClient
     
-    engine = ArbitrageEngine(predictions_europe)
+    engine = ArbitrageEngine(predictions_europe, scenarios=build_price_scenarios(predictions_europe))
     opps = engine.calculate_all_opportunities()
+    default_stats_caption(list(predictions_europe))
     
     # Meilleure opportunité
     best = engine.get_best_opportunity()
@@ -1231,16 +1418,18 @@ def page_arbitrage(predictions_europe):
         
         if not top10.empty:
             display = top10[['from_country', 'to_country', 'timestamp', 
-                           'spread_net', 'volume_optimal', 'gain_total', 'score']].copy()
+                           'spread_net', 'spread_net_p5', 'prob_profit',
+                           'volume_optimal', 'gain_total', 'score']].copy()
             
-            display.columns = ['Achat', 'Vente', 'Heure', 'Spread (€/MWh)', 
-                              'Volume (MWh)', 'Gain (€)', 'Score']
+            display.columns = ['Achat', 'Vente', 'Heure', 'Spread (€/MWh)', 'Spread P5 (€/MWh)',
+                              'Proba gain', 'Volume (MWh)', 'Gain (€)', 'Score']
             
             display['Heure'] = pd.to_datetime(display['Heure']).dt.strftime('%d/%m %H:%M')
+            display['Proba gain'] = display['Proba gain'].map(lambda p: f"{p:.0%}" if pd.notna(p) else "—")
             
             st.dataframe(display, use_container_width=True, hide_index=True)
 
-def page_contracts():
+def page_contracts(prices_europe, predictions_europe):
     """Page Contrats"""
     st.markdown("# 📊 Mes Contrats")
     st.markdown("""
@@ -1285,6 +1474,50 @@ def page_contracts():
                     st.rerun()
     else:
         st.dataframe(contracts, use_container_width=True, hide_index=True)
+        
+        # Risque: marge si l'énergie est achetée au spot sur l'horizon prévu
+        from src.analysis.scenarios import contract_risk
+        scenarios = build_price_scenarios(predictions_europe)
+        risk = contract_risk(contracts, scenarios)
+        
+        if not risk.empty:
+            st.markdown(f"### 🎲 Risque contrats ({scenarios.n_scenarios:,} scénarios de prix)")
+            display = risk[['client_name', 'volume_mwh', 'guaranteed_price_eur_mwh',
+                            'expected_margin_eur', 'margin_p5_eur', 'prob_loss']].copy()
+            display.columns = ['Client', 'Volume (MWh)', 'Prix garanti (€/MWh)',
+                               'Marge espérée (€)', 'Marge P5 (€)', 'Proba perte']
+            display['Proba perte'] = display['Proba perte'].map(lambda p: f"{p:.0%}")
+            st.dataframe(display, use_container_width=True, hide_index=True)
+        
+        # Recommandation d'achat France (mêmes scénarios: probabilité d'atteindre la cible)
+        prices_fr = prices_europe.get('FR')
+        predictions_fr = predictions_europe.get('FR')
+        if prices_fr is not None and not prices_fr.empty and predictions_fr is not None:
+            from src.trading.recommendations import RecommendationEngine
+            
+            reco = RecommendationEngine(db).generate_recommendation(
+                current_price=float(prices_fr['price_eur_mwh'].iloc[-1]),
+                predicted_prices=predictions_fr,
+                contracts_df=contracts,
+                scenarios=scenarios,
+                zone='FR'
+            )
+            
+            st.markdown("### 🎯 Recommandation d'achat (France)")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Action", reco['action'], f"score {reco['score']}/100")
+            with col2:
+                st.metric("Volume suggéré", f"{reco['volume_mwh']:.1f} MWh")
+            with col3:
+                st.metric("Proba prix cible",
+                          f"{reco['probability']:.0%}" if reco['probability'] is not None else "—",
+                          help="Part des scénarios où le prix descend sous la cible d'achat")
+            st.markdown(f"""
+            <div class="glass-card">
+                {reco['reasoning'].replace(chr(10), '<br>')}
+            </div>
+            """, unsafe_allow_html=True)
 
 
 def page_predictions_detaillees(prices_europe, predictions_europe, df_france, model, features):
@@ -1381,6 +1614,7 @@ def page_predictions_detaillees(prices_europe, predictions_europe, df_france, mo
             )
             
             st.plotly_chart(fig, use_container_width=True)
+            default_stats_caption([country])
     
     # ==========================================
     # 2. TOP 10 ACTIONS FUTURES
@@ -1571,7 +1805,7 @@ def page_predictions_detaillees(prices_europe, predictions_europe, df_france, mo
         st.info("Aucune opportunité d'arbitrage rentable détectée pour le moment")
 
 
-def page_ml(df_france, model, features, X_test, y_test):
+def page_ml(df_france, model, features, X_test, y_test, training_report=None):
     """Page Modèles ML"""
     st.markdown("# 🤖 Modèles ML")
     st.markdown("""
@@ -1613,6 +1847,20 @@ def page_ml(df_france, model, features, X_test, y_test):
     with col3:
         st.metric("RMSE", f"{rmse:.2f} €/MWh")
     
+    if training_report:
+        if training_report['source'] != 'entraînement':
+            train_time = training_report['train_seconds']
+            st.caption(
+                f"💾 Modèle `{training_report.get('version', training_report['fingerprint'])}` chargé depuis le {training_report['source']} en "
+                f"{training_report['load_seconds'] * 1000:.0f} ms"
+                + (f" (entraînement initial: {train_time:.1f} s, le {training_report['trained_at']})" if train_time else "")
+            )
+        else:
+            st.caption(
+                f"🏋️ Modèle `{training_report.get('version', training_report['fingerprint'])}` entraîné en "
+                f"{training_report['train_seconds']:.1f} s (données modifiées), mis en cache"
+            )
+    
     st.markdown("---")
     
     # Feature importance
@@ -1648,14 +1896,24 @@ def main():
     try:
         entsoe_client, db = init_clients()
         df_france, prices_europe, predictions_europe, supply_demand = load_all_data()
-        model, features, df_full, X_test, y_test = train_models(df_france)
+        start_training_worker()
+        start_inference_server()
+        loaded = train_models(df_france)
     except Exception as e:
         st.error(f"❌ Erreur chargement: {e}")
         return
     
+    model, features, df_full, X_test, y_test, training_report = loaded or (None,) * 6
+    
     # Navigation
     page = show_sidebar()
     
+    # Pages qui utilisent le modèle: en attente de la première version publiée
+    if loaded is None and page in ("🏠 Vue d'Ensemble", "🇫🇷 France Détaillée",
+                                   "🔮 Prédictions Détaillées", "🤖 Modèles ML"):
+        show_model_pending()
+        return
+    
     # Router
     if page == "🏠 Vue d'Ensemble":
         page_overview(df_france, prices_europe, predictions_europe, supply_demand, db, model, features, df_full)
@@ -1668,11 +1926,11 @@ def main():
     elif page == "💰 Arbitrage":
         page_arbitrage(predictions_europe)
     elif page == "📊 Mes Contrats":
-        page_contracts()
+        page_contracts(prices_europe, predictions_europe)
     elif page == "🔮 Prédictions Détaillées":
         page_predictions_detaillees(prices_europe, predictions_europe, df_france, model, features)
     elif page == "🤖 Modèles ML":
-        page_ml(df_france, model, features, X_test, y_test)
+        page_ml(df_france, model, features, X_test, y_test, training_report)
 
 if __name__ == "__main__":
     main()
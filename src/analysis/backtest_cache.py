@@ -0,0 +1,282 @@
+"""
+Cache des résultats de backtest (mémoire LRU + disque)
+Clé = empreinte (modèle, données, paramètres): un backtest n'est recalculé
+que si le modèle, l'historique ou les paramètres changent
+- Modèle du registre: version + empreinte d'entraînement (métadonnées)
+- Modèle en mémoire: hash de l'objet picklé, calculé une fois par objet
+- Données: frame_hash (cf. src/features/pipeline.py)
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from src.features.pipeline import frame_hash
+
+
+BACKTEST_CACHE_DIR = 'data/cache/backtests'
+MAX_MEMORY_ENTRIES = 32
+MAX_DISK_ENTRIES = 50
+
+# Empreintes des modèles en mémoire (pickle + hash une seule fois par objet)
+_model_fingerprints = weakref.WeakKeyDictionary()
+_fingerprint_lock = threading.Lock()
+
+
+def model_fingerprint(model):
+    """
+    Empreinte d'un modèle
+    
+    Args:
+        model: LazyModel / RemoteModel (métadonnées du registre) ou estimateur entraîné
+    
+    Returns:
+        String
+    """
+    metadata = getattr(model, 'metadata', None)
+    if isinstance(metadata, dict) and metadata.get('version') is not None:
+        return f"registry:{metadata['version']}:{metadata.get('fingerprint')}"
+    
+    with _fingerprint_lock:
+        try:
+            fingerprint = _model_fingerprints.get(model)
+        except TypeError:  # Objet sans weakref: pas de mémorisation
+            fingerprint = None
+    
+    if fingerprint is None:
+        digest = hashlib.sha1(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()[:16]
+        fingerprint = f'{type(model).__name__}:{digest}'
+        with _fingerprint_lock:
+            try:
+                _model_fingerprints[model] = fingerprint
+            except TypeError:
+                pass
+    
+    return fingerprint
+
+
+def backtest_key(kind, model, df, params):
+    """
+    Clé d'un backtest
+    
+    Args:
+        kind: Type de backtest (ex: 'ml')
+        model: Modèle évalué
+        df: Historique (DataFrame)
+        params: Dict des autres paramètres (features, test_size...)
+    
+    Returns:
+        String hexadécimale (16 caractères)
+    """
+    digest = hashlib.sha1(kind.encode())
+    digest.update(model_fingerprint(model).encode())
+    digest.update(frame_hash(df).encode())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()[:16]
+
+
+class BacktestCache:
+    """Résultats de backtest indexés par clé de contenu, en mémoire puis sur disque"""
+    
+    def __init__(self, cache_dir=BACKTEST_CACHE_DIR, max_entries=MAX_MEMORY_ENTRIES, max_files=MAX_DISK_ENTRIES):
+        """
+        Args:
+            cache_dir: Dossier du cache disque (None = mémoire seulement)
+            max_entries: Résultats gardés en mémoire
+            max_files: Résultats gardés sur disque (les moins récemment utilisés sont supprimés)
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_files = max_files
+        
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    def get_or_compute(self, key, compute_fn):
+        """
+        Résultat de cette clé, ou calculé puis stocké
+        
+        Les résultats indisponibles ('available': False, ex: erreur) ne sont pas gardés.
+        
+        Args:
+            key: Clé (backtest_key)
+            compute_fn: Fonction sans argument qui retourne le résultat
+        
+        Returns:
+            (result, report): report = dict avec source ('mémoire', 'disque' ou 'calcul'), seconds, key
+        """
+        start = time.perf_counter()
+        result, source = self._lookup(key)
+        
+        if result is None:
+            source = 'calcul'
+            result = compute_fn()
+            if not isinstance(result, dict) or result.get('available', True):
+                self._store(key, result)
+        
+        with self._lock:
+            if source == 'calcul':
+                self.misses += 1
+            else:
+                self.hits += 1
+        
+        return result, {'source': source, 'seconds': time.perf_counter() - start, 'key': key}
+    
+    def clear(self):
+        """Vide le cache mémoire"""
+        with self._lock:
+            self._memory.clear()
+    
+    def _lookup(self, key):
+        """Mémoire puis disque; (None, None) si absent"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key], 'mémoire'
+        
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    result = pickle.load(f)
+            except Exception as e:
+                print(f"⚠️ Backtest en cache illisible ({path}): {e}")
+                return None, None
+            # Dernière utilisation → protégé du nettoyage
+            os.utime(path)
+            self._remember(key, result)
+            return result, 'disque'
+        
+        return None, None
+    
+    def _store(self, key, result):
+        """Écrit un résultat en mémoire et sur disque (écriture atomique)"""
+        self._remember(key, result)
+        
+        path = self._path(key)
+        if path:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._prune()
+    
+    def _remember(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+    
+    def _path(self, key):
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+    
+    def _prune(self):
+        files = sorted(
+            (os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.pkl')),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        for path in files[self.max_files:]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_backtest_cache():
+    """Instance partagée du cache (une par process)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = BacktestCache()
+        return _cache
+
+
+def cached_ml_backtest(df_full, model, features, test_size=0.3, train_end=None, cache=None):
+    """
+    calculate_ml_backtest avec cache (mêmes arguments, même résultat)
+    
+    Returns:
+        (backtest, report): cf. BacktestCache.get_or_compute
+    """
+    from src.analysis.ml_backtesting import calculate_ml_backtest
+    
+    cache = cache or get_backtest_cache()
+    key = backtest_key('ml', model, df_full, {
+        'features': list(features),
+        'test_size': round(test_size, 6),
+        'train_end': None if train_end is None else str(train_end),
+    })
+    return cache.get_or_compute(key, lambda: calculate_ml_backtest(df_full, model, features, test_size=test_size,
+                                                                   train_end=train_end))
+
+
+if __name__ == "__main__":
+    import tempfile
+    
+    import numpy as np
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
+    
+    print("🧪 Test cache de backtest...")
+    
+    rng = np.random.default_rng(42)
+    n_hours = 24 * 120
+    df_full = pd.DataFrame({
+        'timestamp': pd.date_range('2025-01-01', periods=n_hours, freq='h'),
+        'temperature_c': rng.normal(10, 6, n_hours),
+        'demand_gw': rng.normal(55, 6, n_hours),
+    })
+    df_full['price_eur_mwh'] = 40 + 0.8 * df_full['demand_gw'] - df_full['temperature_c'] + rng.normal(0, 5, n_hours)
+    features = ['temperature_c', 'demand_gw', 'hour']
+    
+    from src.features.pipeline import build_features, feature_matrix
+    X = feature_matrix(build_features(df_full, features), features)
+    model = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=42).fit(X, df_full['price_eur_mwh'])
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = BacktestCache(cache_dir=cache_dir)
+        
+        for label in ['1er rendu', 'rerun']:
+            start = time.perf_counter()
+            result, report = cached_ml_backtest(df_full, model, features, cache=cache)
+            elapsed = time.perf_counter() - start
+            print(f"   {label}: {report['source']} en {elapsed * 1e6:.0f} µs, clé comprise "
+                  f"(cache {report['seconds'] * 1e6:.0f} µs, P&L {result['total_pnl']:.0f})")
+        assert report['source'] == 'mémoire'
+        
+        # Nouveau process: cache mémoire vide, lecture disque
+        _, report = cached_ml_backtest(df_full, model, features, cache=BacktestCache(cache_dir=cache_dir))
+        print(f"   redémarrage: {report['source']} en {report['seconds'] * 1e3:.1f} ms")
+        assert report['source'] == 'disque'
+        
+        # Invalidation: nouvelle heure de données, modèle réentraîné, autre paramètre
+        df_new = df_full.copy()
+        df_new.loc[df_new.index[-1], 'price_eur_mwh'] += 1
+        retrained = RandomForestRegressor(n_estimators=100, max_depth=10, random_state=0).fit(X, df_full['price_eur_mwh'])
+        for label, args in [('données', (df_new, model, features)), ('modèle', (df_full, retrained, features))]:
+            _, report = cached_ml_backtest(*args, cache=cache)
+            assert report['source'] == 'calcul', label
+        _, report = cached_ml_backtest(df_full, model, features, test_size=0.2, cache=cache)
+        assert report['source'] == 'calcul'
+        
+        # Copie identique des données (rerun Streamlit): toujours un hit
+        _, report = cached_ml_backtest(df_full.copy(), model, features, cache=cache)
+        assert report['source'] == 'mémoire'
+        print(f"✅ Invalidation uniquement sur changement (hits {cache.hits}, calculs {cache.misses})")
@@ -0,0 +1,224 @@
+"""
+Noyau de backtesting vectorisé (commun au backtest ML et au backtest réel)
+Stratégie: chaque jour, ACHAT des N heures prédites les moins chères,
+VENTE des N heures prédites les plus chères, P&L mesuré contre le prix
+réel moyen du jour.
+- Rang dans chaque jour par groupby().rank(method='first'): mêmes heures
+  que nsmallest/nlargest(keep='first'), sans boucle sur les jours
+- P&L par opérations sur colonnes, agrégé par jour en un groupby
+"""
+
+import numpy as np
+import pandas as pd
+
+
+TOP_N = 5               # Heures achetées / vendues par jour
+MIN_HOURS_PER_DAY = 10  # Jours incomplets ignorés
+
+
+def daily_top_n_backtest(timestamps, predicted, actual, n=TOP_N, min_hours=MIN_HOURS_PER_DAY):
+    """
+    Simule la stratégie top N achat / top N vente sur chaque jour
+    
+    Args:
+        timestamps: Heures (ordre chronologique)
+        predicted: Prix prédits
+        actual: Prix réels
+        n: Heures achetées et vendues par jour
+        min_hours: Heures minimum pour trader un jour
+    
+    Returns:
+        (df_daily, df_details):
+        - df_daily: date, pnl, buy_pnl, sell_pnl, n_actions (un jour par ligne)
+        - df_details: date, timestamp, action, predicted, actual, pnl, success
+    """
+    frame = pd.DataFrame({
+        'timestamp': pd.to_datetime(pd.Series(timestamps)).reset_index(drop=True),
+        'predicted': np.asarray(predicted, dtype=float),
+        'actual': np.asarray(actual, dtype=float),
+    })
+    
+    # Jours numérotés dans l'ordre d'apparition (= df['date'].unique())
+    day, dates = pd.factorize(frame['timestamp'].dt.date)
+    frame['day'] = day
+    
+    by_day = frame.groupby('day', sort=False)['actual']
+    frame['day_avg'] = by_day.transform('mean')
+    frame = frame[by_day.transform('size') >= min_hours]
+    
+    if frame.empty:
+        return (pd.DataFrame(columns=['date', 'pnl', 'buy_pnl', 'sell_pnl', 'n_actions']),
+                pd.DataFrame(columns=['date', 'timestamp', 'action', 'predicted', 'actual', 'pnl', 'success']))
+    
+    # Rang dans le jour; 'first' départage les ex-aequo par ordre d'apparition
+    ranks = frame.groupby('day', sort=False)['predicted']
+    buy_rank = ranks.rank(method='first', ascending=True)
+    sell_rank = ranks.rank(method='first', ascending=False)
+    
+    buys = frame[buy_rank <= n].assign(action='ACHAT', side=0, rank=buy_rank)
+    buys['pnl'] = buys['day_avg'] - buys['actual']
+    sells = frame[sell_rank <= n].assign(action='VENTE', side=1, rank=sell_rank)
+    sells['pnl'] = sells['actual'] - sells['day_avg']
+    
+    # Même ordre que la boucle: par jour, achats (prix croissant) puis ventes (prix décroissant)
+    details = pd.concat([buys, sells]).sort_values(['day', 'side', 'rank'], kind='stable')
+    details['date'] = dates[details['day'].to_numpy()]
+    details['success'] = details['pnl'] > 0
+    
+    # P&L par jour (jours tradables sans prédiction: P&L nul)
+    traded_days = pd.unique(frame['day'])
+    pnl = details.pivot_table(index='day', columns='side', values='pnl', aggfunc='sum')
+    pnl = pnl.reindex(index=traded_days, columns=[0, 1]).fillna(0.0)
+    
+    df_daily = pd.DataFrame({
+        'date': dates[traded_days],
+        'pnl': pnl[0].to_numpy() + pnl[1].to_numpy(),
+        'buy_pnl': pnl[0].to_numpy(),
+        'sell_pnl': pnl[1].to_numpy(),
+        'n_actions': 2 * n,
+    })
+    df_details = details[['date', 'timestamp', 'action', 'predicted', 'actual', 'pnl', 'success']].reset_index(drop=True)
+    
+    return df_daily, df_details
+
+
+def backtest_metrics(df_daily, df_details):
+    """
+    Métriques P&L communes aux backtests
+    
+    Returns:
+        Dict (total_pnl, cumulative_pnl, win_rate, sharpe_ratio, details...)
+    """
+    total_pnl = df_daily['pnl'].sum()
+    cumulative_pnl = df_daily['pnl'].cumsum()
+    
+    winning_days = (df_daily['pnl'] > 0).sum()
+    total_days = len(df_daily)
+    win_rate = (winning_days / total_days * 100) if total_days > 0 else 0
+    
+    avg_win = df_daily[df_daily['pnl'] > 0]['pnl'].mean() if winning_days > 0 else 0
+    avg_loss = df_daily[df_daily['pnl'] < 0]['pnl'].mean() if (total_days - winning_days) > 0 else 0
+    
+    sharpe = (df_daily['pnl'].mean() / df_daily['pnl'].std()) if df_daily['pnl'].std() > 0 else 0
+    
+    # Statistiques actions
+    total_actions = len(df_details)
+    successful_actions = (df_details['pnl'] > 0).sum()
+    action_success_rate = (successful_actions / total_actions * 100) if total_actions > 0 else 0
+    
+    return {
+        'available': True,
+        'total_pnl': total_pnl,
+        'cumulative_pnl': cumulative_pnl.tolist(),
+        'dates': df_daily['date'].tolist(),
+        'daily_pnl': df_daily['pnl'].tolist(),
+        'win_rate': win_rate,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'sharpe_ratio': sharpe,
+        'total_days': total_days,
+        'winning_days': winning_days,
+        'losing_days': total_days - winning_days,
+        'action_success_rate': action_success_rate,
+        'total_actions': total_actions,
+        'successful_actions': successful_actions,
+        'details': df_details.tail(10).to_dict('records'),  # 10 dernières transactions
+        'best_day': df_daily.nlargest(1, 'pnl').iloc[0].to_dict() if not df_daily.empty else None,
+        'worst_day': df_daily.nsmallest(1, 'pnl').iloc[0].to_dict() if not df_daily.empty else None,
+    }
+
+
+if __name__ == "__main__":
+    import time
+    
+    # Ancienne implémentation (boucle par jour), référence d'équivalence
+    def loop_backtest(df, n=TOP_N, min_hours=MIN_HOURS_PER_DAY):
+        df = df.copy()
+        df['date'] = df['timestamp'].dt.date
+        daily_pnl, daily_details = [], []
+        
+        for date in df['date'].unique():
+            day_data = df[df['date'] == date]
+            if len(day_data) < min_hours:
+                continue
+            
+            top_buy = day_data.nsmallest(n, 'predicted_price')
+            top_sell = day_data.nlargest(n, 'predicted_price')
+            day_avg = day_data['actual_price'].mean()
+            
+            buy_pnl = 0
+            for _, row in top_buy.iterrows():
+                gain = day_avg - row['actual_price']
+                buy_pnl += gain
+                daily_details.append({'date': date, 'timestamp': row['timestamp'], 'action': 'ACHAT',
+                                      'predicted': row['predicted_price'], 'actual': row['actual_price'],
+                                      'pnl': gain, 'success': gain > 0})
+            
+            sell_pnl = 0
+            for _, row in top_sell.iterrows():
+                gain = row['actual_price'] - day_avg
+                sell_pnl += gain
+                daily_details.append({'date': date, 'timestamp': row['timestamp'], 'action': 'VENTE',
+                                      'predicted': row['predicted_price'], 'actual': row['actual_price'],
+                                      'pnl': gain, 'success': gain > 0})
+            
+            daily_pnl.append({'date': date, 'pnl': buy_pnl + sell_pnl, 'buy_pnl': buy_pnl,
+                              'sell_pnl': sell_pnl, 'n_actions': 2 * n})
+        
+        return pd.DataFrame(daily_pnl), pd.DataFrame(daily_details)
+    
+    def check_equivalent(df):
+        expected = backtest_metrics(*loop_backtest(df))
+        daily, details = daily_top_n_backtest(df['timestamp'], df['predicted_price'], df['actual_price'])
+        result = backtest_metrics(daily, details)
+        
+        assert result['dates'] == expected['dates']
+        np.testing.assert_allclose(result['daily_pnl'], expected['daily_pnl'], rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(result['cumulative_pnl'], expected['cumulative_pnl'], rtol=1e-9, atol=1e-9)
+        for key in ['total_days', 'winning_days', 'losing_days', 'total_actions', 'successful_actions']:
+            assert result[key] == expected[key], key
+        for key in ['total_pnl', 'win_rate', 'avg_win', 'avg_loss', 'sharpe_ratio', 'action_success_rate']:
+            assert np.isclose(result[key], expected[key], rtol=1e-9, atol=1e-9), key
+        
+        _, expected_details = loop_backtest(df)
+        pd.testing.assert_series_equal(details['timestamp'], expected_details['timestamp'], check_names=False)
+        assert details['action'].tolist() == expected_details['action'].tolist()
+        return daily, details
+    
+    print("🧪 Test équivalence noyau vectorisé vs boucle par jour...")
+    
+    rng = np.random.default_rng(42)
+    
+    def make_history(n_hours, start='2020-01-01'):
+        timestamps = pd.date_range(start, periods=n_hours, freq='h')
+        actual = 60 + 20 * np.sin(timestamps.hour / 24 * 2 * np.pi) + rng.normal(0, 10, n_hours)
+        return pd.DataFrame({
+            'timestamp': timestamps,
+            'predicted_price': actual + rng.normal(0, 8, n_hours),
+            'actual_price': actual,
+        })
+    
+    # Cas limites: ex-aequo (prix arrondis), jours incomplets (trous), jour de 10h pile
+    ties = make_history(24 * 30)
+    ties['predicted_price'] = ties['predicted_price'].round(-1)
+    gaps = make_history(24 * 30).drop(index=rng.choice(24 * 30, 300, replace=False))
+    short_day = make_history(10, start='2020-03-01 05:00')
+    
+    for name, df in [('aléatoire', make_history(24 * 60)), ('ex-aequo', ties),
+                     ('trous', gaps), ('jour 10h', short_day)]:
+        check_equivalent(df.reset_index(drop=True))
+        print(f"   ✅ {name}")
+    
+    # Benchmark: 5 ans horaires
+    df = make_history(24 * 365 * 5 + 24)
+    print(f"\n⚡ Benchmark {len(df)} heures ({len(df) // 24} jours)")
+    
+    start = time.perf_counter()
+    loop_backtest(df)
+    loop_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    daily_top_n_backtest(df['timestamp'], df['predicted_price'], df['actual_price'])
+    kernel_seconds = time.perf_counter() - start
+    
+    print(f"   Boucle: {loop_seconds:.2f}s, noyau: {kernel_seconds * 1000:.0f} ms → ×{loop_seconds / kernel_seconds:.0f}")
@@ -0,0 +1,338 @@
+"""
+Balayage des paramètres des règles de trading sur l'historique stocké
+- Grille de paramètres par stratégie (top N par jour, seuils TradingSignals,
+  seuils AdvancedTradingAdvisor rejoués heure par heure)
+- Une tranche = un paramètre balayé, les autres fixés: toutes les valeurs
+  balayées évaluées en une passe vectorisée (matrices heures × configs)
+- Tranches réparties sur un pool de process, historique en mémoire partagée
+- Tableau classé: P&L, Sharpe, taux de réussite
+
+P&L d'une heure (comme le noyau de backtest): achat = moyenne réelle du
+jour - prix réel, vente = prix réel - moyenne réelle du jour.
+
+Usage:
+    python -m src.analysis.parameter_sweep --days 365 --sort sharpe
+"""
+
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.models.multi_market import _attach, _to_shared
+from src.trading.advanced_recommendations import ADVISOR_THRESHOLDS, advisor_rules, advisor_windows
+
+
+# ===== STRATÉGIES =====
+# Chaque stratégie: positions(data, fixed, name, values) → (achats, ventes, jours valides)
+# achats/ventes: booléens (heures × valeurs balayées); jours valides: (jours × valeurs) ou None
+
+def _top_n_positions(data, fixed, name, values):
+    """Top N heures prédites les moins chères / les plus chères de chaque jour"""
+    params = [{**fixed, name: v} for v in values]
+    n = np.array([p['n'] for p in params])[None, :]
+    min_hours = np.array([p['min_hours'] for p in params])[None, :]
+    
+    buys = data['buy_rank'][:, None] <= n
+    sells = data['sell_rank'][:, None] <= n
+    valid = data['day_size'][:, None] >= min_hours  # Jours trop courts: ni trade ni P&L
+    return buys & valid, sells & valid, data['day_hours'][:, None] >= min_hours
+
+
+def _threshold_positions(data, fixed, name, values):
+    """Seuils absolus TradingSignals: achat sous low_threshold, vente au-dessus de high_threshold"""
+    params = [{**fixed, name: v} for v in values]
+    low = np.array([p['low_threshold'] for p in params])[None, :]
+    high = np.array([p['high_threshold'] for p in params])[None, :]
+    
+    predicted = data['predicted'][:, None]
+    return predicted < low, predicted > high, None
+
+
+def _advisor_positions(data, fixed, name, values):
+    """AdvancedTradingAdvisor rejoué: achat sur BUY, vente sur SELL (seuils non balayés: défauts)"""
+    params = [{**ADVISOR_THRESHOLDS, **fixed, name: v} for v in values]
+    thresholds = {key: np.array([p[key] for p in params])[None, :] for key in ADVISOR_THRESHOLDS}
+    
+    # Fenêtres (heures × 1) diffusées sur les configurations (1 × valeurs)
+    windows = {key[len('advisor_'):]: array[:, None] for key, array in data.items() if key.startswith('advisor_')}
+    action = advisor_rules(windows, thresholds)['action']
+    return action == 'BUY', action == 'SELL', None
+
+
+STRATEGIES = {
+    'top_n': _top_n_positions,
+    'thresholds': _threshold_positions,
+    'advisor': _advisor_positions,
+}
+
+# Configurations cohérentes par stratégie (les autres ne sont ni évaluées ni classées)
+# thresholds: low ≥ high = zone d'achat et de vente qui se chevauchent
+CONSTRAINTS = {
+    'thresholds': lambda p: p['low_threshold'] < p['high_threshold'],
+}
+
+# Grilles par défaut (dernier paramètre = paramètre balayé dans chaque tranche)
+DEFAULT_GRIDS = {
+    'top_n': {'min_hours': [10, 16, 20, 24], 'n': list(range(1, 13))},
+    'thresholds': {'high_threshold': list(range(70, 131)), 'low_threshold': list(range(20, 81))},
+    'advisor': {
+        'band_sigma': [0.25, 0.5, 0.75, 1.0],
+        'high_volatility_ratio': [1.4, 1.8, 2.2],
+        'strong_trend_pct': list(np.arange(4.0, 16.5, 0.5)),
+    },
+}
+
+
+# ===== ÉVALUATION =====
+
+def score_positions(buys, sells, edge, day_starts, valid_days=None):
+    """
+    Métriques de chaque configuration (colonne)
+    
+    Args:
+        buys, sells: Booléens (heures × configs)
+        edge: Moyenne réelle du jour - prix réel (heures)
+        day_starts: Première ligne de chaque jour (lignes triées par jour)
+        valid_days: Jours comptés dans le Sharpe (jours × configs), défaut: tous
+    
+    Returns:
+        Dict d'arrays (configs): total_pnl, sharpe, hit_rate, win_rate, n_actions, n_days
+    """
+    edge = edge[:, None]
+    pnl = (buys.astype(float) - sells) * edge
+    daily = np.add.reduceat(pnl, day_starts, axis=0)  # (jours × configs)
+    
+    if valid_days is None:
+        valid_days = np.ones(daily.shape, dtype=bool)
+    valid_days = np.broadcast_to(valid_days, daily.shape)
+    
+    n_days = valid_days.sum(axis=0)
+    daily = np.where(valid_days, daily, np.nan)
+    mean = np.nanmean(daily, axis=0) if daily.size else np.zeros(daily.shape[1])
+    std = np.nanstd(daily, axis=0, ddof=1) if len(daily) > 1 else np.zeros(daily.shape[1])
+    
+    n_actions = buys.sum(axis=0) + sells.sum(axis=0)
+    hits = (buys & (edge > 0)).sum(axis=0) + (sells & (edge < 0)).sum(axis=0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'total_pnl': np.nansum(daily, axis=0),
+            'sharpe': np.where(std > 0, mean / std, 0.0),
+            'hit_rate': np.where(n_actions > 0, hits / n_actions * 100, 0.0),
+            'win_rate': np.where(n_days > 0, (daily > 0).sum(axis=0) / n_days * 100, 0.0),
+            'n_actions': n_actions,
+            'n_days': n_days,
+        }
+
+
+def prepare_history(history):
+    """
+    Arrays de l'historique (triés par heure) utilisés par toutes les stratégies
+    
+    Args:
+        history: DataFrame timestamp, predicted_price, actual_price
+    
+    Returns:
+        Dict d'arrays numpy (predicted, edge, day_starts, rangs dans le jour...)
+    """
+    df = history.dropna(subset=['predicted_price', 'actual_price']).sort_values('timestamp').reset_index(drop=True)
+    
+    day = pd.factorize(df['timestamp'].dt.date)[0]
+    by_day = df.groupby(day, sort=False)
+    day_avg = by_day['actual_price'].transform('mean').to_numpy()
+    day_size = by_day['actual_price'].transform('size').to_numpy()
+    
+    ranks = df.groupby(day, sort=False)['predicted_price']
+    day_starts = np.flatnonzero(np.r_[True, day[1:] != day[:-1]])
+    
+    # Fenêtres 24h passées / prédictions suivantes de l'advisor (indépendantes des seuils)
+    windows = advisor_windows(df['actual_price'].to_numpy(dtype=float), df['predicted_price'].to_numpy(dtype=float))
+    
+    return {
+        **{f'advisor_{key}': array for key, array in windows.items()},
+        'predicted': df['predicted_price'].to_numpy(dtype=float),
+        'actual': df['actual_price'].to_numpy(dtype=float),
+        'edge': day_avg - df['actual_price'].to_numpy(dtype=float),
+        'buy_rank': ranks.rank(method='first', ascending=True).to_numpy(),
+        'sell_rank': ranks.rank(method='first', ascending=False).to_numpy(),
+        'day_size': day_size,
+        'day_hours': day_size[day_starts],
+        'day_starts': day_starts,
+    }
+
+
+def evaluate_slice(data, strategy, fixed, name, values):
+    """
+    Évalue toutes les valeurs d'un paramètre (les autres fixés) en une passe
+    
+    Returns:
+        DataFrame: une ligne par configuration
+    """
+    buys, sells, valid_days = STRATEGIES[strategy](data, fixed, name, values)
+    metrics = score_positions(buys, sells, data['edge'], data['day_starts'], valid_days)
+    
+    slice_df = pd.DataFrame({'strategy': strategy, **fixed, name: list(values)})
+    for key, column in metrics.items():
+        slice_df[key] = column
+    return slice_df
+
+
+def grid_slices(grids):
+    """
+    Tranches (stratégie, paramètres fixés, paramètre balayé, valeurs)
+    
+    Le dernier paramètre de chaque grille est balayé dans la tranche,
+    le produit cartésien des autres donne les tranches. Les valeurs qui
+    violent CONSTRAINTS sont retirées (tranche vide: omise).
+    """
+    for strategy, grid in grids.items():
+        names = list(grid)
+        swept, outer = names[-1], names[:-1]
+        constraint = CONSTRAINTS.get(strategy)
+        for combination in itertools.product(*(grid[n] for n in outer)):
+            fixed = dict(zip(outer, combination))
+            values = list(grid[swept])
+            if constraint is not None:
+                values = [v for v in values if constraint({**fixed, swept: v})]
+            if values:
+                yield strategy, fixed, swept, values
+
+
+# ===== CÔTÉ WORKER =====
+
+# Historique attaché une fois par process (initializer)
+_worker_data = {}
+
+
+def _init_worker(specs):
+    segments, data = [], {}
+    for key, spec in specs.items():
+        shm, array = _attach(spec)
+        segments.append(shm)
+        data[key] = array
+    _worker_data.update(segments=segments, data=data)
+
+
+def _evaluate_slices(slices):
+    return [evaluate_slice(_worker_data['data'], *s) for s in slices]
+
+
+# ===== ORCHESTRATION =====
+
+def sweep_parameters(history, grids=None, max_workers=None, sort_by='total_pnl', slices_per_task=8):
+    """
+    Évalue toutes les configurations des grilles sur l'historique
+    
+    Args:
+        history: DataFrame timestamp, predicted_price, actual_price (cf. load_history)
+        grids: Dict {stratégie: {paramètre: valeurs}} (défaut: DEFAULT_GRIDS)
+        max_workers: Process en parallèle (défaut: nombre de cœurs; 1 = sans pool)
+        sort_by: Colonne de classement ('total_pnl', 'sharpe', 'hit_rate')
+        slices_per_task: Tranches envoyées ensemble à un process
+    
+    Returns:
+        Dict avec results (DataFrame classé) et timing
+    """
+    start = time.time()
+    grids = grids or DEFAULT_GRIDS
+    data = prepare_history(history)
+    
+    slices = list(grid_slices(grids))
+    n_configs = sum(len(s[3]) for s in slices)
+    tasks = [slices[i:i + slices_per_task] for i in range(0, len(slices), slices_per_task)]
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks)))
+    
+    print(f"🧮 Balayage: {n_configs} configurations ({len(slices)} tranches) sur "
+          f"{len(data['edge'])} heures, {max_workers} process")
+    
+    frames = []
+    if max_workers == 1:
+        for task in tasks:
+            frames.extend(evaluate_slice(data, *s) for s in task)
+    else:
+        shared = {key: _to_shared(np.ascontiguousarray(array)) for key, array in data.items()}
+        try:
+            # spawn: pas de fork d'un process qui a déjà initialisé OpenMP
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                                     initargs=({key: spec for key, (_, spec) in shared.items()},)) as executor:
+                for future in as_completed([executor.submit(_evaluate_slices, task) for task in tasks]):
+                    frames.extend(future.result())
+        finally:
+            for shm, _ in shared.values():
+                shm.close()
+                shm.unlink()
+    
+    results = pd.concat(frames, ignore_index=True)
+    results = results.sort_values(sort_by, ascending=False).reset_index(drop=True)
+    results.insert(0, 'rank', np.arange(1, len(results) + 1))
+    
+    total_seconds = time.time() - start
+    print(f"✅ {len(results)} configurations en {total_seconds:.1f}s "
+          f"({total_seconds / max(1, len(results)) * 1000:.2f} ms/config)")
+    
+    return {
+        'results': results,
+        'timing': {'total_seconds': total_seconds, 'n_configs': len(results), 'workers': max_workers},
+    }
+
+
+def load_history(db, days=365):
+    """
+    Prédictions historiques et prix réels stockés (même source que le backtest réel)
+    
+    Returns:
+        DataFrame timestamp, predicted_price, actual_price
+    """
+    timeline = db.get_unified_timeline(lookback_hours=days * 24, lookahead_hours=0)
+    if timeline.empty or 'historical_predicted_price' not in timeline.columns:
+        return pd.DataFrame(columns=['timestamp', 'predicted_price', 'actual_price'])
+    
+    history = timeline[['timestamp', 'historical_predicted_price', 'actual_price']].dropna()
+    return history.rename(columns={'historical_predicted_price': 'predicted_price'})
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Balayage des seuils des règles de trading")
+    parser.add_argument('--db', default=None, help="Base SQLite (défaut: historique simulé)")
+    parser.add_argument('--days', type=int, default=365, help="Jours d'historique")
+    parser.add_argument('--workers', type=int, default=None, help="Process en parallèle")
+    parser.add_argument('--sort', default='total_pnl', choices=['total_pnl', 'sharpe', 'hit_rate'])
+    args = parser.parse_args()
+    
+    if args.db:
+        from src.data.database import PriceDatabase
+        history = load_history(PriceDatabase(args.db), days=args.days)
+    else:
+        print("🧪 Historique simulé")
+        rng = np.random.default_rng(42)
+        n_hours = 24 * args.days
+        timestamps = pd.date_range('2024-01-01', periods=n_hours, freq='h')
+        actual = 70 + 20 * np.sin(timestamps.hour / 24 * 2 * np.pi) + rng.normal(0, 12, n_hours)
+        history = pd.DataFrame({
+            'timestamp': timestamps,
+            'predicted_price': actual + rng.normal(0, 8, n_hours),
+            'actual_price': actual,
+        })
+    
+    sweep = sweep_parameters(history, max_workers=args.workers, sort_by=args.sort)
+    results = sweep['results']
+    
+    for strategy, ranked in results.groupby('strategy', sort=False):
+        print(f"\n🏆 {strategy}")
+        print(ranked.dropna(axis=1, how='all').head(5).to_string(index=False))
+    
+    # Cohérence avec le noyau de backtest (top 5, 10h minimum)
+    from src.analysis.backtest_kernel import backtest_metrics, daily_top_n_backtest
+    reference = backtest_metrics(*daily_top_n_backtest(history['timestamp'], history['predicted_price'],
+                                                       history['actual_price']))
+    row = results[(results['strategy'] == 'top_n') & (results['n'] == 5) & (results['min_hours'] == 10)].iloc[0]
+    assert np.isclose(row['total_pnl'], reference['total_pnl']) and np.isclose(row['sharpe'], reference['sharpe_ratio'])
+    print(f"\n✅ Top 5 identique au noyau de backtest: P&L {row['total_pnl']:.1f}, Sharpe {row['sharpe']:.3f}")
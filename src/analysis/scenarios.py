@@ -0,0 +1,322 @@
+"""
+Scénarios de prix Monte Carlo
+Chemins de prix corrélés (scénario × zone × heure) autour des prévisions:
+- erreur de prévision AR(1) par zone (persistance heure à heure)
+- innovations corrélées entre zones (Cholesky de la matrice de corrélation)
+- statistiques estimées sur les résidus historiques (réel - prédit)
+
+Un seul array partagé par les recommandations, l'arbitrage et les contrats.
+"""
+
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+
+N_SCENARIOS = 10_000
+
+# Sans historique de résidus: écart-type = ancien intervalle fixe ±8 €/MWh
+DEFAULT_SIGMA = 8.0
+DEFAULT_AR = 0.8
+DEFAULT_CORRELATION = 0.5
+
+# Résidus minimum pour estimer les statistiques d'une zone
+MIN_RESIDUALS = 48
+
+
+def residual_statistics(residuals, min_residuals=MIN_RESIDUALS):
+    """
+    Statistiques des erreurs de prévision par zone
+    
+    Args:
+        residuals: Dict {zone: Series réel - prédit, indexée par timestamp horaire}
+        min_residuals: Taille minimum (sinon valeurs par défaut pour la zone)
+    
+    Returns:
+        Dict avec sigma {zone: float}, ar {zone: float}, correlation (DataFrame zone × zone),
+        estimated (zones estimées sur leurs résidus; les autres ont les valeurs par défaut)
+    """
+    sigma, ar, innovations = {}, {}, {}
+    
+    for zone, series in residuals.items():
+        series = series.dropna().sort_index()
+        if len(series) < min_residuals:
+            sigma[zone], ar[zone] = DEFAULT_SIGMA, DEFAULT_AR
+            continue
+        
+        sigma[zone] = float(series.std())
+        phi = float(series.autocorr(lag=1))
+        ar[zone] = float(np.clip(phi, 0.0, 0.99)) if np.isfinite(phi) else DEFAULT_AR
+        # Innovations AR(1): ce qui reste après la persistance (corrélées entre zones)
+        innovations[zone] = series - ar[zone] * series.shift(1)
+    
+    zones = list(residuals)
+    default = np.full((len(zones), len(zones)), DEFAULT_CORRELATION)
+    np.fill_diagonal(default, 1.0)
+    correlation = pd.DataFrame(default, index=zones, columns=zones)
+    
+    if len(innovations) >= 2:
+        # Paires sans heures communes: corrélation par défaut conservée
+        estimated = pd.DataFrame(innovations).corr(min_periods=min_residuals)
+        correlation.update(estimated)
+    
+    return {'sigma': sigma, 'ar': ar, 'correlation': correlation, 'estimated': sorted(innovations)}
+
+
+def residuals_from_db(db, zone='FR', days=90):
+    """
+    Résidus réel - prédit stockés en base (dernière prédiction par heure)
+    
+    Returns:
+        Dict {zone: Series}
+    """
+    end = pd.Timestamp.now()
+    history = db.get_historical_predictions(start_date=end - pd.Timedelta(days=days), end_date=end, zone=zone)
+    if history.empty:
+        return {}
+    
+    history = history.dropna(subset=['actual_price'])
+    history = history.sort_values('prediction_timestamp').groupby('target_timestamp').last()
+    return {zone: history['actual_price'] - history['predicted_price']}
+
+
+def _nearest_correlation(correlation):
+    """Matrice de corrélation définie positive (valeurs propres planchers) → Cholesky possible"""
+    values, vectors = np.linalg.eigh(correlation)
+    fixed = vectors @ np.diag(np.clip(values, 1e-6, None)) @ vectors.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+
+class PriceScenarios:
+    """Chemins de prix simulés: paths[scénario, zone, heure]"""
+    
+    def __init__(self, paths, zones, timestamps, forecast):
+        """
+        Args:
+            paths: Array (n_scenarios × n_zones × n_hours)
+            zones: Codes zone (axe 1)
+            timestamps: DatetimeIndex (axe 2)
+            forecast: Prévision centrale (n_zones × n_hours)
+        """
+        self.paths = paths
+        self.zones = list(zones)
+        self.timestamps = pd.DatetimeIndex(timestamps)
+        self.forecast = forecast
+    
+    @property
+    def n_scenarios(self):
+        return self.paths.shape[0]
+    
+    def __contains__(self, zone):
+        return zone in self.zones
+    
+    def zone_paths(self, zone, timestamps=None):
+        """
+        Chemins d'une zone (n_scenarios × n_hours)
+        
+        Args:
+            zone: Code zone
+            timestamps: Heures voulues (défaut: toutes); absentes → colonnes NaN
+        """
+        paths = self.paths[:, self.zones.index(zone), :]
+        if timestamps is None:
+            return paths
+        
+        positions = self.timestamps.get_indexer(pd.DatetimeIndex(timestamps))
+        selected = paths[:, np.clip(positions, 0, None)].astype(float)
+        selected[:, positions < 0] = np.nan
+        return selected
+    
+    def quantiles(self, q=(0.05, 0.5, 0.95)):
+        """
+        Quantiles par zone et par heure
+        
+        Returns:
+            DataFrame tidy: zone, timestamp, p5, p50, p95...
+        """
+        values = np.quantile(self.paths, q, axis=0)  # (len(q) × zones × heures)
+        
+        frames = []
+        for z, zone in enumerate(self.zones):
+            df = pd.DataFrame({'zone': zone, 'timestamp': self.timestamps})
+            for i, level in enumerate(q):
+                df[f'p{round(level * 100)}'] = values[i, z]
+            frames.append(df)
+        
+        return pd.concat(frames, ignore_index=True)
+    
+    def spread(self, buy_zone, sell_zone):
+        """Écart de prix vente - achat par scénario et par heure (n_scenarios × n_hours)"""
+        return self.paths[:, self.zones.index(sell_zone), :] - self.paths[:, self.zones.index(buy_zone), :]
+
+
+def generate_price_scenarios(forecasts, stats=None, n_scenarios=N_SCENARIOS, seed=42, price_floor=None):
+    """
+    Tire n_scenarios chemins de prix corrélés autour des prévisions
+    
+    Args:
+        forecasts: Dict {zone: DataFrame timestamp, predicted_price}
+        stats: residual_statistics() (défaut: sigma 8 €/MWh, AR 0.8, corrélation 0.5)
+        n_scenarios: Nombre de chemins
+        seed: Graine du Generator NumPy (reproductible)
+        price_floor: Prix plancher (None = pas de plancher, prix négatifs possibles)
+    
+    Returns:
+        PriceScenarios (heures communes à toutes les zones)
+    """
+    forecasts = {z: df for z, df in forecasts.items() if df is not None and not df.empty}
+    zones = list(forecasts)
+    if not zones:
+        return None
+    
+    timestamps = reduce(
+        lambda a, b: a.intersection(b),
+        [pd.DatetimeIndex(df['timestamp']) for df in forecasts.values()]
+    ).sort_values()
+    
+    # Prévision centrale (zones × heures)
+    forecast = np.stack([
+        forecasts[z].drop_duplicates('timestamp').set_index('timestamp')['predicted_price']
+        .reindex(timestamps).to_numpy(dtype=float)
+        for z in zones
+    ])
+    
+    stats = stats or {}
+    sigma = np.array([stats.get('sigma', {}).get(z, DEFAULT_SIGMA) for z in zones])
+    phi = np.array([stats.get('ar', {}).get(z, DEFAULT_AR) for z in zones])
+    
+    correlation = np.full((len(zones), len(zones)), DEFAULT_CORRELATION)
+    np.fill_diagonal(correlation, 1.0)
+    if stats.get('correlation') is not None:
+        known = [z for z in zones if z in stats['correlation'].index]
+        idx = [zones.index(z) for z in known]
+        correlation[np.ix_(idx, idx)] = stats['correlation'].loc[known, known].to_numpy()
+    cholesky = np.linalg.cholesky(_nearest_correlation(correlation))
+    
+    rng = np.random.default_rng(seed)
+    n_hours = len(timestamps)
+    
+    # Innovations corrélées entre zones: (scénario × heure × zone) @ Lᵀ
+    shocks = rng.standard_normal((n_scenarios, n_hours, len(zones))) @ cholesky.T
+    
+    # AR(1) stationnaire: e_t = φ e_{t-1} + √(1-φ²) σ ε_t  (variance σ² à chaque heure)
+    errors = np.empty_like(shocks)
+    errors[:, 0] = shocks[:, 0] * sigma
+    innovation_scale = np.sqrt(1 - phi ** 2) * sigma
+    for t in range(1, n_hours):
+        errors[:, t] = phi * errors[:, t - 1] + innovation_scale * shocks[:, t]
+    
+    # (scénario × zone × heure)
+    paths = forecast[None, :, :] + errors.transpose(0, 2, 1)
+    if price_floor is not None:
+        np.maximum(paths, price_floor, out=paths)
+    
+    return PriceScenarios(paths, zones, timestamps, forecast)
+
+
+def scenario_bands(forecasts, stats=None, level=0.95, n_scenarios=N_SCENARIOS, seed=42):
+    """
+    Intervalles de confiance par zone tirés des quantiles des scénarios
+    
+    Chaque zone est simulée seule: la loi marginale ne dépend pas des corrélations
+    et les heures propres à une zone sont conservées.
+    
+    Args:
+        forecasts: Dict {zone: DataFrame timestamp, predicted_price}
+        stats: residual_statistics() (zones absentes: sigma 8 €/MWh, AR 0.8)
+        level: Niveau de l'intervalle (0.95 → quantiles 2.5% et 97.5%)
+    
+    Returns:
+        Dict {zone: DataFrame timestamp, confidence_lower, confidence_upper}
+    """
+    q = ((1 - level) / 2, (1 + level) / 2)
+    bands = {}
+    
+    for zone, df in forecasts.items():
+        scenarios = generate_price_scenarios({zone: df}, stats, n_scenarios=n_scenarios, seed=seed)
+        if scenarios is None:
+            continue
+        lower, upper = np.quantile(scenarios.paths[:, 0, :], q, axis=0)
+        bands[zone] = pd.DataFrame({
+            'timestamp': scenarios.timestamps,
+            'confidence_lower': lower,
+            'confidence_upper': upper,
+        })
+    
+    return bands
+
+
+def contract_risk(contracts_df, scenarios, zone='FR'):
+    """
+    Marge des contrats si l'énergie est achetée au spot sur l'horizon simulé
+    
+    Args:
+        contracts_df: Contrats actifs (volume_mwh, guaranteed_price_eur_mwh)
+        scenarios: PriceScenarios
+        zone: Zone d'approvisionnement
+    
+    Returns:
+        DataFrame: une ligne par contrat avec expected_margin_eur,
+        margin_p5_eur (VaR 95%), prob_loss
+    """
+    if contracts_df.empty or scenarios is None or zone not in scenarios:
+        return pd.DataFrame()
+    
+    # Prix d'achat moyen sur l'horizon, par scénario
+    average_price = scenarios.zone_paths(zone).mean(axis=1)  # (n_scenarios,)
+    
+    guaranteed = contracts_df['guaranteed_price_eur_mwh'].to_numpy(dtype=float)
+    volume = contracts_df['volume_mwh'].to_numpy(dtype=float)
+    margins = (guaranteed[:, None] - average_price[None, :]) * volume[:, None]  # (contrats × scénarios)
+    
+    risk = contracts_df.copy()
+    risk['expected_margin_eur'] = margins.mean(axis=1)
+    risk['margin_p5_eur'] = np.percentile(margins, 5, axis=1)
+    risk['prob_loss'] = (margins < 0).mean(axis=1)
+    
+    return risk
+
+
+if __name__ == "__main__":
+    import time
+    
+    print("🧪 Test scénarios Monte Carlo...")
+    
+    timestamps = pd.date_range('2025-06-01', periods=48, freq='h')
+    forecasts = {
+        zone: pd.DataFrame({
+            'timestamp': timestamps,
+            'predicted_price': level + 15 * np.sin(np.arange(48) / 24 * 2 * np.pi)
+        })
+        for zone, level in [('FR', 70), ('DE', 80), ('ES', 65), ('IT', 95), ('GB', 85)]
+    }
+    
+    # Résidus simulés: AR(1) 0.7, corrélés entre zones
+    rng = np.random.default_rng(0)
+    common = rng.standard_normal(2000)
+    residuals = {}
+    for zone in forecasts:
+        noise = 0.6 * common + 0.8 * rng.standard_normal(2000)
+        values = np.zeros(2000)
+        for t in range(1, 2000):
+            values[t] = 0.7 * values[t - 1] + 5 * noise[t]
+        residuals[zone] = pd.Series(values, index=pd.date_range('2025-01-01', periods=2000, freq='h'))
+    
+    stats = residual_statistics(residuals)
+    print(f"σ: { {z: round(s, 1) for z, s in stats['sigma'].items()} }")
+    print(f"AR: { {z: round(a, 2) for z, a in stats['ar'].items()} }")
+    
+    start = time.perf_counter()
+    scenarios = generate_price_scenarios(forecasts, stats, n_scenarios=10_000)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {scenarios.paths.shape} (scénario × zone × heure) en {elapsed * 1000:.0f} ms")
+    
+    print(scenarios.quantiles().head())
+    
+    spread = scenarios.spread('FR', 'DE')
+    print(f"📊 P(DE - FR > 5 €/MWh) à 18h: {(spread[:, 18] > 5).mean():.0%}")
+    
+    contracts = pd.DataFrame({'client_name': ['Hôpital Nord'], 'volume_mwh': [100], 'guaranteed_price_eur_mwh': [75]})
+    print(contract_risk(contracts, scenarios)[['client_name', 'expected_margin_eur', 'margin_p5_eur', 'prob_loss']])
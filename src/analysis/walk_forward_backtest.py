@@ -0,0 +1,292 @@
+"""
+Backtesting walk-forward avec réentraînement
+- Folds chronologiques: fenêtre d'entraînement croissante (expanding) ou
+  glissante (sliding), test sur la période suivante, jamais de chevauchement
+- Chaque fold entraîné et prédit dans un process du pool
+- Matrice de features en mémoire partagée (cf. src/models/multi_market.py):
+  les workers lisent leurs lignes sans copie ni pickling des données
+- P&L (noyau top 5 achat / top 5 vente) et erreurs agrégés par fold
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.analysis.backtest_kernel import backtest_metrics, daily_top_n_backtest
+from src.features.pipeline import build_features, feature_matrix
+from src.models.multi_market import _attach, _to_shared
+from src.models.training import RF_PARAMS
+
+
+MODES = ('expanding', 'sliding')
+
+# Historique minimum avant le premier fold
+MIN_TRAIN_HOURS = 24 * 30
+
+
+def make_folds(timestamps, n_folds=5, mode='expanding', train_hours=None, min_train_hours=MIN_TRAIN_HOURS):
+    """
+    Découpe chronologique en folds train → test consécutifs
+    
+    Les périodes de test se suivent, couvrent la fin de l'historique et sont
+    coupées à minuit (jours calendaires entiers, même avec des heures manquantes):
+    le noyau top N par jour ne voit jamais un jour à cheval sur deux folds.
+    
+    Args:
+        timestamps: Heures des lignes (triées)
+        n_folds: Nombre de folds
+        mode: 'expanding' (tout le passé) ou 'sliding' (train_hours dernières heures)
+        train_hours: Taille de la fenêtre glissante (défaut: min_train_hours)
+        min_train_hours: Heures d'entraînement minimum avant le premier fold
+    
+    Returns:
+        Liste de dicts fold, train_start, train_stop, test_start, test_stop (positions de lignes)
+    """
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu: {mode} (attendu: {MODES})")
+    
+    days = pd.to_datetime(pd.Series(timestamps)).dt.normalize().to_numpy()
+    n_rows = len(days)
+    if n_rows == 0:
+        return []
+    
+    # Première ligne de chaque jour (+ fin de l'historique)
+    day_starts = np.append(np.flatnonzero(np.r_[True, days[1:] != days[:-1]]), n_rows)
+    
+    # Jours testables: commencent après min_train_hours lignes d'entraînement
+    first_day = int(np.searchsorted(day_starts[:-1], min_train_hours))
+    days_per_fold = (len(day_starts) - 1 - first_day) // n_folds
+    if days_per_fold < 1:
+        return []
+    
+    train_hours = train_hours or min_train_hours
+    first_test_day = len(day_starts) - 1 - n_folds * days_per_fold
+    
+    folds = []
+    for k in range(n_folds):
+        test_start = int(day_starts[first_test_day + k * days_per_fold])
+        test_stop = int(day_starts[first_test_day + (k + 1) * days_per_fold])
+        # Fenêtre glissante: débute elle aussi à minuit
+        sliding_start = int(day_starts[np.searchsorted(day_starts, test_start - train_hours)])
+        folds.append({
+            'fold': k,
+            'train_start': 0 if mode == 'expanding' else sliding_start,
+            'train_stop': test_start,
+            'test_start': test_start,
+            'test_stop': test_stop,
+        })
+    
+    return folds
+
+
+# ===== CÔTÉ WORKER =====
+
+# Segments attachés une fois par process (initializer)
+_worker_data = {}
+
+
+def _init_worker(X_spec, y_spec, params, n_threads):
+    shm_X, X = _attach(X_spec)
+    shm_y, y = _attach(y_spec)
+    _worker_data.update(segments=(shm_X, shm_y), X=X, y=y, params=params, n_threads=n_threads)
+
+
+def _run_fold(fold):
+    """
+    Entraîne sur les lignes train du fold, prédit les lignes test
+    
+    Returns:
+        Dict fold + prédictions test + durée
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    
+    # Vues sur la mémoire partagée: aucune copie des données
+    X, y = _worker_data['X'], _worker_data['y']
+    
+    start = time.perf_counter()
+    model = RandomForestRegressor(**_worker_data['params'], n_jobs=_worker_data['n_threads'])
+    model.fit(X[fold['train_start']:fold['train_stop']], y[fold['train_start']:fold['train_stop']])
+    fit_seconds = time.perf_counter() - start
+    
+    return {
+        **fold,
+        'predictions': model.predict(X[fold['test_start']:fold['test_stop']]),
+        'fit_seconds': fit_seconds,
+        'pid': os.getpid(),
+    }
+
+
+# ===== ORCHESTRATION =====
+
+def _fold_report(result, timestamps, y):
+    """Erreurs et P&L d'un fold"""
+    test = slice(result['test_start'], result['test_stop'])
+    actual = y[test]
+    predicted = result['predictions']
+    
+    daily, details = daily_top_n_backtest(timestamps.iloc[test], predicted, actual)
+    
+    return {
+        'fold': result['fold'],
+        'train_from': timestamps.iloc[result['train_start']],
+        'test_from': timestamps.iloc[result['test_start']],
+        'test_to': timestamps.iloc[result['test_stop'] - 1],
+        'train_hours': result['train_stop'] - result['train_start'],
+        'test_hours': result['test_stop'] - result['test_start'],
+        'mae': float(np.mean(np.abs(actual - predicted))),
+        'rmse': float(np.sqrt(np.mean((actual - predicted) ** 2))),
+        'pnl': float(daily['pnl'].sum()),
+        'win_rate': float((daily['pnl'] > 0).mean() * 100) if len(daily) else 0.0,
+        'fit_seconds': result['fit_seconds'],
+    }
+
+
+def walk_forward_backtest(df_full, features, n_folds=5, mode='expanding', train_hours=None,
+                          params=None, max_workers=None):
+    """
+    Backtest walk-forward: un modèle réentraîné par fold, évalué hors échantillon
+    
+    Args:
+        df_full: DataFrame historique (timestamp, price_eur_mwh, colonnes de base)
+        features: Features du modèle
+        n_folds: Nombre de folds
+        mode: 'expanding' ou 'sliding'
+        train_hours: Fenêtre glissante (mode 'sliding')
+        params: Paramètres RandomForest (défaut: RF_PARAMS)
+        max_workers: Process en parallèle (défaut: nombre de cœurs)
+    
+    Returns:
+        Dict comme calculate_ml_backtest (métriques P&L sur l'ensemble des
+        périodes de test) + folds (DataFrame par fold) + timing
+    """
+    start = time.time()
+    params = dict(params or RF_PARAMS)
+    
+    if 'price_eur_mwh' not in df_full.columns:
+        return {'available': False, 'message': "Pas de prix dans l'historique."}
+    
+    df = build_features(df_full.sort_values('timestamp').reset_index(drop=True), features)
+    df = df.dropna(subset=['price_eur_mwh'] + list(features)).reset_index(drop=True)
+    
+    folds = make_folds(df['timestamp'], n_folds, mode, train_hours)
+    if not folds:
+        return {
+            'available': False,
+            'message': f"Pas assez de données ({len(df)} heures) pour {n_folds} folds "
+                       f"après {MIN_TRAIN_HOURS} heures d'entraînement."
+        }
+    
+    X = feature_matrix(df, features).to_numpy(dtype=np.float32)
+    y = df['price_eur_mwh'].to_numpy(dtype=np.float64)
+    timestamps = df['timestamp']
+    
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(folds)))
+    n_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    
+    print(f"🔁 Walk-forward ({mode}): {len(folds)} folds de {folds[0]['test_stop'] - folds[0]['test_start']}h de test, "
+          f"{len(X)} lignes × {len(features)} features, {max_workers} process")
+    
+    results = []
+    shm_X, X_spec = _to_shared(X)
+    shm_y, y_spec = _to_shared(y)
+    try:
+        # spawn: pas de fork d'un process qui a déjà initialisé OpenMP
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(X_spec, y_spec, params, n_threads)) as executor:
+            # Plus gros entraînements d'abord: meilleur équilibrage entre process
+            futures = [
+                executor.submit(_run_fold, fold)
+                for fold in sorted(folds, key=lambda f: f['train_start'] - f['train_stop'])
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                print(f"   ✅ Fold {result['fold']}: {result['train_stop'] - result['train_start']}h train, "
+                      f"{result['fit_seconds']:.1f}s")
+    finally:
+        shm_X.close()
+        shm_X.unlink()
+        shm_y.close()
+        shm_y.unlink()
+    
+    results.sort(key=lambda r: r['fold'])
+    report = pd.DataFrame([_fold_report(r, timestamps, y) for r in results])
+    
+    # Toutes les périodes de test mises bout à bout (hors échantillon)
+    test_rows = np.concatenate([np.arange(r['test_start'], r['test_stop']) for r in results])
+    predicted = np.concatenate([r['predictions'] for r in results])
+    actual = y[test_rows]
+    
+    daily, details = daily_top_n_backtest(timestamps.iloc[test_rows], predicted, actual)
+    if daily.empty:
+        return {'available': False, 'message': "Pas assez de jours complets dans les périodes de test."}
+    
+    total_seconds = time.time() - start
+    fit_seconds = float(report['fit_seconds'].sum())
+    timing = {
+        'total_seconds': total_seconds,
+        'fit_seconds': fit_seconds,
+        'workers': max_workers,
+        # Temps de fit cumulé / (temps réel × process): taux d'occupation du pool
+        'pool_utilization': fit_seconds / (total_seconds * max_workers),
+    }
+    
+    print(f"✅ Walk-forward: {len(report)} folds en {total_seconds:.1f}s "
+          f"(fit cumulé {fit_seconds:.1f}s sur {max_workers} process)")
+    
+    return {
+        **backtest_metrics(daily, details),
+        # Métriques ML hors échantillon
+        'mae': float(np.mean(np.abs(actual - predicted))),
+        'rmse': float(np.sqrt(np.mean((actual - predicted) ** 2))),
+        'r2': float(1 - np.sum((actual - predicted) ** 2) / np.sum((actual - actual.mean()) ** 2)),
+        'test_size': len(test_rows),
+        'total_hours': len(df),
+        'mode': mode,
+        'folds': report,
+        'timing': timing,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Backtest walk-forward avec réentraînement")
+    parser.add_argument('--days', type=int, default=365, help="Jours d'historique simulé")
+    parser.add_argument('--folds', type=int, default=6, help="Nombre de folds")
+    parser.add_argument('--mode', choices=MODES, default='expanding')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1],
+                        help="Process à comparer (scalabilité)")
+    args = parser.parse_args()
+    
+    print("🧪 Test backtest walk-forward")
+    
+    rng = np.random.default_rng(42)
+    n_hours = 24 * args.days
+    hours = np.arange(n_hours)
+    df_test = pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n_hours, freq='h'),
+        'temperature_c': 12 + 8 * np.sin(hours / (24 * 365) * 2 * np.pi) + rng.normal(0, 3, n_hours),
+        'wind_speed_kmh': rng.gamma(2, 8, n_hours),
+        'demand_gw': rng.normal(55, 8, n_hours),
+    })
+    df_test['price_eur_mwh'] = (
+        40 + 0.8 * df_test['demand_gw'] - 0.5 * df_test['wind_speed_kmh']
+        + 15 * df_test['timestamp'].dt.hour.between(18, 20) + rng.normal(0, 5, n_hours)
+    )
+    features = ['temperature_c', 'wind_speed_kmh', 'demand_gw', 'hour', 'is_peak_hour']
+    
+    small_params = {**RF_PARAMS, 'n_estimators': 50}
+    for workers in dict.fromkeys(args.workers):
+        result = walk_forward_backtest(df_test, features, n_folds=args.folds, mode=args.mode,
+                                       params=small_params, max_workers=workers)
+        print(f"   {workers} process: {result['timing']['total_seconds']:.1f}s, "
+              f"occupation {result['timing']['pool_utilization']:.0%}\n")
+    
+    print(result['folds'][['fold', 'train_hours', 'test_hours', 'mae', 'rmse', 'pnl', 'win_rate']])
+    print(f"\n💰 P&L hors échantillon: {result['total_pnl']:.0f} €/MWh, RMSE {result['rmse']:.2f}")
@@ -0,0 +1,240 @@
+"""
+Scénarios what-if sur le modèle de prix
+"Et si il fait 5 °C de moins ?", "et si le vent baisse de 30 % ?"
+- Grille de perturbations (produit cartésien) sur météo, demande, production
+- Une matrice empilée (scénario × heure) → un seul model.predict()
+- La production renouvelable suit la météo perturbée (cf. SeasonalProfile)
+"""
+
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.features.pipeline import feature_matrix
+from src.models.predict_future import build_forecast_inputs, get_seasonal_profile
+
+
+# Colonnes météo: la production est recalculée à partir des valeurs perturbées
+WEATHER_COLUMNS = ('temperature_c', 'wind_speed_kmh', 'solar_radiation_wm2')
+
+# Perturbations: 'add' = décalage (°C, GW...), 'scale' = facteur (0.7 = -30 %)
+OPERATIONS = ('add', 'scale')
+
+
+def perturbation_grid(spec):
+    """
+    Produit cartésien des perturbations
+    
+    Args:
+        spec: Dict {colonne: (opération, valeurs)}, ex:
+            {'temperature_c': ('add', [-5, 0, 5]), 'wind_speed_kmh': ('scale', [0.7, 1.0])}
+    
+    Returns:
+        DataFrame: une ligne par scénario, une colonne par perturbation
+        (opérations gardées dans attrs['operations'])
+    """
+    for column, (operation, _) in spec.items():
+        if operation not in OPERATIONS:
+            raise ValueError(f"Opération inconnue pour {column}: {operation} (attendu: {OPERATIONS})")
+    
+    columns = list(spec)
+    grid = pd.DataFrame(
+        list(itertools.product(*(spec[c][1] for c in columns))),
+        columns=columns
+    )
+    grid.attrs['operations'] = {c: spec[c][0] for c in columns}
+    return grid
+
+
+class WhatIfCube:
+    """Prix prédits par scénario et par heure: prices[scénario, heure]"""
+    
+    def __init__(self, prices, baseline, grid, timestamps):
+        """
+        Args:
+            prices: Array (n_scenarios × n_hours)
+            baseline: Prix sans perturbation (n_hours)
+            grid: Scénarios (perturbation_grid)
+            timestamps: Heures (axe 1)
+        """
+        self.prices = prices
+        self.baseline = baseline
+        self.grid = grid.reset_index(drop=True)
+        self.timestamps = pd.DatetimeIndex(timestamps)
+    
+    @property
+    def shape(self):
+        return self.prices.shape
+    
+    def summary(self):
+        """
+        Une ligne par scénario: perturbations, prix moyen/min/max, écart moyen à la référence
+        
+        Returns:
+            DataFrame
+        """
+        summary = self.grid.copy()
+        summary['mean_price'] = self.prices.mean(axis=1)
+        summary['min_price'] = self.prices.min(axis=1)
+        summary['max_price'] = self.prices.max(axis=1)
+        summary['delta_vs_base'] = summary['mean_price'] - self.baseline.mean()
+        return summary
+    
+    def to_frame(self):
+        """
+        Cube à plat (tidy)
+        
+        Returns:
+            DataFrame: scenario, timestamp, predicted_price
+        """
+        n_scenarios, n_hours = self.prices.shape
+        return pd.DataFrame({
+            'scenario': np.repeat(np.arange(n_scenarios), n_hours),
+            'timestamp': np.tile(self.timestamps, n_scenarios),
+            'predicted_price': self.prices.ravel(),
+        })
+
+
+def _apply(values, operation, amount):
+    return values + amount if operation == 'add' else values * amount
+
+
+def stack_scenarios(base, grid, profile=None):
+    """
+    Entrées brutes de tous les scénarios empilées (scénario-major)
+    
+    Args:
+        base: Entrées de référence (build_forecast_inputs), une ligne par heure
+        grid: perturbation_grid()
+        profile: SeasonalProfile (src/models/predict_future.py) pour recalculer la production depuis la météo perturbée
+    
+    Returns:
+        DataFrame (n_scenarios × n_hours lignes)
+    """
+    operations = grid.attrs.get('operations', {})
+    n_scenarios, n_hours = len(grid), len(base)
+    
+    # Base répétée par scénario; perturbation de chaque scénario répétée par heure
+    stacked = {col: np.tile(base[col].to_numpy(), n_scenarios) for col in base.columns}
+    amounts = {col: np.repeat(grid[col].to_numpy(dtype=float), n_hours) for col in grid.columns}
+    
+    for col in grid.columns:
+        if col in WEATHER_COLUMNS and col in stacked:
+            stacked[col] = _apply(stacked[col].astype(float), operations[col], amounts[col])
+    
+    stacked = pd.DataFrame(stacked)
+    
+    # Production dépendante de la météo (éolien, solaire) recalculée sur la météo perturbée
+    if profile is not None and any(col in WEATHER_COLUMNS for col in grid.columns):
+        production = profile.production_frame(stacked)
+        for col in production.columns:
+            stacked[col] = production[col].to_numpy()
+    
+    # Demande / production perturbées directement (le total suit les filières)
+    for col in grid.columns:
+        if col in WEATHER_COLUMNS or col not in stacked:
+            continue
+        before = stacked[col].to_numpy(dtype=float)
+        after = _apply(before, operations[col], amounts[col])
+        stacked[col] = after
+        if col.endswith('_production_gw') and col not in ('total_production_gw', 'renewable_production_gw') \
+                and 'total_production_gw' in stacked:
+            stacked['total_production_gw'] = stacked['total_production_gw'] + (after - before)
+    
+    # Parts renouvelables recalculées par le pipeline de features
+    return stacked.drop(columns=['renewable_production_gw', 'renewable_share'], errors='ignore')
+
+
+def what_if_sweep(model, feature_columns, historical_data, grid, days=2, forecast_weather=None):
+    """
+    Évalue tous les scénarios de la grille en un seul appel au modèle
+    
+    Args:
+        model: Modèle ML entraîné (ou LazyModel / RemoteModel)
+        feature_columns: Features du modèle
+        historical_data: DataFrame historique (patterns demande/production)
+        grid: perturbation_grid()
+        days: Horizon (jours)
+        forecast_weather: Prévisions météo déjà récupérées (défaut: téléchargées)
+    
+    Returns:
+        WhatIfCube (n_scenarios × n_hours), None sans prévisions météo
+    """
+    if forecast_weather is None:
+        from src.models.predict_future import fetch_weather_forecast
+        forecast_weather = fetch_weather_forecast(days=days)
+    
+    if forecast_weather.empty:
+        print("❌ Impossible de récupérer prévisions météo")
+        return None
+    
+    profile = get_seasonal_profile(historical_data)
+    base = build_forecast_inputs(historical_data, forecast_weather)
+    
+    start = time.perf_counter()
+    
+    # Scénario de référence (sans perturbation) en tête du lot
+    identity = {c: 0.0 if grid.attrs['operations'][c] == 'add' else 1.0 for c in grid.columns}
+    full_grid = pd.concat([pd.DataFrame([identity]), grid], ignore_index=True)
+    full_grid.attrs['operations'] = grid.attrs['operations']
+    
+    stacked = stack_scenarios(base, full_grid, profile)
+    X = feature_matrix(stacked, feature_columns)
+    predictions = np.asarray(model.predict(X), dtype=float).reshape(len(full_grid), len(base))
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ What-if: {len(grid)} scénarios × {len(base)} heures en {elapsed * 1000:.0f} ms")
+    
+    return WhatIfCube(predictions[1:], predictions[0], grid, base['timestamp'])
+
+
+if __name__ == "__main__":
+    from sklearn.ensemble import RandomForestRegressor
+    from src.features.pipeline import MODEL_FEATURES, build_features
+    
+    print("🧪 Test what-if...")
+    
+    rng = np.random.default_rng(42)
+    dates = pd.date_range('2025-01-01', periods=24 * 60, freq='h')
+    history = pd.DataFrame({
+        'timestamp': dates,
+        'temperature_c': rng.normal(10, 6, len(dates)),
+        'wind_speed_kmh': rng.gamma(2, 8, len(dates)),
+        'solar_radiation_wm2': np.clip(rng.normal(150, 120, len(dates)), 0, None),
+        'demand_gw': rng.normal(55, 6, len(dates)),
+        'nuclear_production_gw': rng.normal(40, 3, len(dates)),
+        'wind_production_gw': rng.uniform(2, 12, len(dates)),
+        'solar_production_gw': rng.uniform(0, 8, len(dates)),
+    })
+    history['total_production_gw'] = history[['nuclear_production_gw', 'wind_production_gw', 'solar_production_gw']].sum(axis=1)
+    history['price_eur_mwh'] = (
+        60 - 1.2 * history['temperature_c'] + 0.8 * (history['demand_gw'] - history['total_production_gw'])
+        + rng.normal(0, 5, len(dates))
+    )
+    
+    features = [f for f in MODEL_FEATURES if f != 'solar_radiation_wm2']
+    X = feature_matrix(build_features(history, features), features)
+    model = RandomForestRegressor(n_estimators=50, max_depth=10, n_jobs=-1, random_state=42)
+    model.fit(X, history['price_eur_mwh'])
+    
+    forecast_weather = pd.DataFrame({
+        'timestamp': pd.date_range('2025-03-02', periods=48, freq='h'),
+        'temperature_c': rng.normal(8, 3, 48),
+        'wind_speed_kmh': rng.gamma(2, 8, 48),
+        'solar_radiation_wm2': np.clip(rng.normal(150, 120, 48), 0, None),
+    })
+    
+    grid = perturbation_grid({
+        'temperature_c': ('add', np.arange(-10, 10.5, 0.5)),     # 41 valeurs
+        'wind_speed_kmh': ('scale', np.linspace(0.5, 1.5, 11)),  # 11 valeurs
+        'demand_gw': ('scale', [0.9, 1.0, 1.1]),
+        'nuclear_production_gw': ('add', [-5, 0]),
+    })
+    
+    cube = what_if_sweep(model, features, history, grid, forecast_weather=forecast_weather)
+    print(f"📦 Cube {cube.shape} (scénario × heure)")
+    
+    summary = cube.summary()
+    print(summary.sort_values('delta_vs_base').iloc[[0, -1]])
@@ -40,14 +40,16 @@ INTERCONNECTIONS.update(keys_to_add)
 class ArbitrageEngine:
     """Moteur de calcul d'opportunités d'arbitrage"""
     
-    def __init__(self, predictions_dict):
+    def __init__(self, predictions_dict, scenarios=None):
         """
         Initialise le moteur
         
         Args:
             predictions_dict: Dict {country_code: DataFrame avec predicted_price}
+            scenarios: PriceScenarios (src/analysis/scenarios.py) pour prob_profit
         """
         self.predictions = predictions_dict
+        self.scenarios = scenarios
         self.opportunities = []
     
     def calculate_all_opportunities(self, max_volume_per_trade=100):
@@ -116,6 +118,9 @@ class ArbitrageEngine:
                 merged['to_country'] = to_country
                 merged['transport_cost'] = transport_cost
                 
+                # Distribution du spread: probabilité de gain et spread pessimiste
+                merged = self._add_scenario_risk(merged, from_country, to_country, transport_cost)
+                
                 # Filtrer opportunités positives
                 merged = merged[merged['spread_net'] > 3]  # Min 3€/MWh pour être intéressant
                 
@@ -134,6 +139,30 @@ class ArbitrageEngine:
         self.opportunities = all_opps
         return all_opps
     
+    def _add_scenario_risk(self, merged, from_country, to_country, transport_cost):
+        """
+        Ajoute prob_profit (P[spread net > 0]) et spread_net_p5 par heure
+        
+        Sans scénarios (ou heure hors horizon simulé): NaN
+        """
+        merged['prob_profit'] = np.nan
+        merged['spread_net_p5'] = np.nan
+        
+        scenarios = self.scenarios
+        if scenarios is None or from_country not in scenarios or to_country not in scenarios:
+            return merged
+        
+        positions = scenarios.timestamps.get_indexer(pd.DatetimeIndex(merged['timestamp']))
+        known = positions >= 0
+        if not known.any():
+            return merged
+        
+        spread_net = scenarios.spread(from_country, to_country)[:, positions[known]] - transport_cost
+        merged.loc[known, 'prob_profit'] = (spread_net > 0).mean(axis=0)
+        merged.loc[known, 'spread_net_p5'] = np.percentile(spread_net, 5, axis=0)
+        
+        return merged
+    
     def get_top_opportunities(self, n=5, min_score=50):
         """
         Récupère les N meilleures opportunités
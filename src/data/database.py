@@ -9,6 +9,10 @@ from datetime import datetime
 import os
 
 
+# Zone des prédictions France (lignes antérieures à la colonne zone)
+DEFAULT_ZONE = 'FR'
+
+
 class PriceDatabase:
     """Gestion base de données prix électricité"""
     
@@ -119,14 +123,35 @@ class PriceDatabase:
         ''')
         
         self.conn.commit()
+        
+        self._migrate()
     
-    def store_predictions(self, predictions_df, model_version='v1'):
+    def _migrate(self):
+        """Migrations de schéma des bases existantes (idempotentes)"""
+        cursor = self.conn.cursor()
+        
+        # Prédictions multi-zones: zone + horizon (lignes existantes = France)
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(predictions)')}
+        if 'zone' not in columns:
+            cursor.execute(f"ALTER TABLE predictions ADD COLUMN zone TEXT NOT NULL DEFAULT '{DEFAULT_ZONE}'")
+        if 'lead_time_hours' not in columns:
+            cursor.execute('ALTER TABLE predictions ADD COLUMN lead_time_hours INTEGER')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_predictions_zone_target 
+            ON predictions(zone, target_timestamp)
+        ''')
+        
+        self.conn.commit()
+    
+    def store_predictions(self, predictions_df, model_version='v1', zone=DEFAULT_ZONE):
         """
         Stocke prédictions dans BDD
         
         Args:
             predictions_df: DataFrame avec colonnes timestamp, predicted_price
-            model_version: Version du modèle
+            model_version: Version du modèle (ex: ModelRegistry.tag() → 'rf_france:v3')
+            zone: Zone des prédictions
         """
         prediction_time = datetime.now()
         
@@ -138,7 +163,8 @@ class PriceDatabase:
                 'predicted_price': float(row['predicted_price']),
                 'confidence_lower': float(row.get('confidence_lower')) if pd.notna(row.get('confidence_lower')) else None,
                 'confidence_upper': float(row.get('confidence_upper')) if pd.notna(row.get('confidence_upper')) else None,
-                'model_version': model_version
+                'model_version': model_version,
+                'zone': zone
             })
         
         df = pd.DataFrame(records)
@@ -146,6 +172,58 @@ class PriceDatabase:
         
         return len(records)
     
+    def store_prediction_batch(self, predictions_df, model_version='v1', prediction_time=None):
+        """
+        Stocke un lot de prédictions multi-zones en une transaction
+        
+        Args:
+            predictions_df: DataFrame tidy (predict_prices_batch): zone, target_timestamp,
+                lead_time_hours, predicted_price, confidence_lower, confidence_upper
+            model_version: Version du modèle
+            prediction_time: Instant d'émission (défaut: maintenant)
+        
+        Returns:
+            Nombre de lignes insérées (hors lignes déjà stockées pour cette émission)
+        """
+        if predictions_df.empty:
+            return 0
+        
+        prediction_time = str(prediction_time or datetime.now())
+        n_rows = len(predictions_df)
+        
+        def optional(column):
+            if column not in predictions_df.columns:
+                return [None] * n_rows
+            values = predictions_df[column].astype(object)
+            return values.where(predictions_df[column].notna(), None).tolist()
+        
+        rows = zip(
+            [prediction_time] * n_rows,
+            predictions_df['target_timestamp'].astype(str).tolist(),
+            predictions_df['predicted_price'].astype(float).tolist(),
+            optional('confidence_lower'),
+            optional('confidence_upper'),
+            [model_version] * n_rows,
+            predictions_df['zone'].astype(str).tolist(),
+            optional('lead_time_hours'),
+        )
+        
+        # Même émission déjà stockée (rerun du dashboard, cycle relancé): lignes ignorées
+        changes = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO predictions (prediction_timestamp, target_timestamp, predicted_price,
+                                         confidence_lower, confidence_upper, model_version, zone, lead_time_hours)
+                SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM predictions
+                    WHERE zone = ?7 AND target_timestamp = ?2
+                      AND prediction_timestamp = ?1 AND model_version IS ?6
+                )
+            ''', rows)
+        
+        return self.conn.total_changes - changes
+    
     def store_actual_prices(self, prices_df, source='RTE'):
         """
         Stocke prix réels dans BDD
@@ -164,19 +242,22 @@ class PriceDatabase:
         
         df = pd.DataFrame(records)
         
-        # Insert or replace (upsert)
+        # Upsert en place: id stable pour une heure déjà stockée (suivi incrémental des
+        # erreurs par id, cf. get_prediction_residuals), ligne inchangée si même prix
         cursor = self.conn.cursor()
         for record in records:
             cursor.execute('''
-                INSERT OR REPLACE INTO actual_prices (timestamp, price, source)
+                INSERT INTO actual_prices (timestamp, price, source)
                 VALUES (?, ?, ?)
+                ON CONFLICT(timestamp) DO UPDATE SET price = excluded.price, source = excluded.source
+                WHERE actual_prices.price IS NOT excluded.price
             ''', (str(record['timestamp']), record['price'], record['source']))
         
         self.conn.commit()
         
         return len(records)
     
-    def get_predictions(self, start_date=None, end_date=None, hours_ahead=None):
+    def get_predictions(self, start_date=None, end_date=None, hours_ahead=None, zone=DEFAULT_ZONE):
         """
         Récupère prédictions
         
@@ -184,6 +265,7 @@ class PriceDatabase:
             start_date: Date début
             end_date: Date fin
             hours_ahead: Filtre par horizon (ex: 24 pour J+1)
+            zone: Zone (None = toutes)
         
         Returns:
             DataFrame avec prédictions
@@ -191,6 +273,10 @@ class PriceDatabase:
         query = 'SELECT * FROM predictions WHERE 1=1'
         params = []
         
+        if zone:
+            query += ' AND zone = ?'
+            params.append(zone)
+        
         if start_date:
             query += ' AND target_timestamp >= ?'
             params.append(start_date)
@@ -303,13 +389,14 @@ class PriceDatabase:
             'end_time': end_time
         }
     
-    def get_historical_predictions(self, start_date=None, end_date=None):
+    def get_historical_predictions(self, start_date=None, end_date=None, zone=DEFAULT_ZONE):
         """
         Récupère prédictions HISTORIQUES (qui ont été faites dans le passé)
         
         Args:
             start_date: Date début
             end_date: Date fin
+            zone: Zone (prix réels = France)
         
         Returns:
             DataFrame avec prédictions historiques et leurs vraies valeurs
@@ -322,9 +409,9 @@ class PriceDatabase:
                 a.price as actual_price
             FROM predictions p
             LEFT JOIN actual_prices a ON p.target_timestamp = a.timestamp
-            WHERE p.target_timestamp < datetime('now')
+            WHERE p.target_timestamp < datetime('now') AND p.zone = ?
         '''
-        params = []
+        params = [zone]
         
         if start_date:
             query += ' AND p.target_timestamp >= ?'
@@ -344,6 +431,57 @@ class PriceDatabase:
         
         return df
     
+    def get_prediction_residuals(self, zone=DEFAULT_ZONE, since=None):
+        """
+        Erreurs de prévision (réel - prédit) des prédictions dont le prix réel est connu
+        
+        Suivi incrémental par ordre d'insertion: une paire (prédiction, prix réel) déjà
+        lue a ses deux ids sous le watermark; elle devient nouvelle dès que la plus
+        récente des deux lignes arrive (prédiction émise après un prix day-ahead connu,
+        ou prix réel arrivé après la prédiction).
+        
+        Args:
+            zone: Zone (prix réels = France)
+            since: (prediction_id, actual_id) max déjà lus: ne renvoyer que les paires
+                dont l'une des deux lignes est plus récente
+        
+        Returns:
+            DataFrame: target_timestamp, lead_time_hours, predicted_price, actual_price, residual,
+            prediction_id, actual_id
+        """
+        query = '''
+            SELECT 
+                p.id as prediction_id,
+                a.id as actual_id,
+                p.target_timestamp,
+                p.prediction_timestamp,
+                p.lead_time_hours,
+                p.predicted_price,
+                a.price as actual_price
+            FROM predictions p
+            JOIN actual_prices a ON p.target_timestamp = a.timestamp
+            WHERE p.zone = ?
+        '''
+        params = [zone]
+        
+        if since is not None:
+            query += ' AND (p.id > ? OR a.id > ?)'
+            params.extend(int(i) for i in since)
+        
+        query += ' ORDER BY p.target_timestamp'
+        
+        df = pd.read_sql_query(query, self.conn, params=params)
+        
+        if not df.empty:
+            df['target_timestamp'] = pd.to_datetime(df['target_timestamp'])
+            prediction_time = pd.to_datetime(df.pop('prediction_timestamp'), format='ISO8601')
+            # Lignes antérieures à la colonne: horizon recalculé depuis l'instant d'émission
+            computed = ((df['target_timestamp'] - prediction_time.dt.floor('h')) / pd.Timedelta(hours=1)).round()
+            df['lead_time_hours'] = df['lead_time_hours'].fillna(computed).astype(int)
+            df['residual'] = df['actual_price'] - df['predicted_price']
+        
+        return df
+    
     def get_unified_timeline(self, lookback_hours=72, lookahead_hours=48):
         """
         Récupère timeline unifiée: historique + prédictions historiques + prédictions futures
@@ -7,10 +7,13 @@ Connecteurs APIs pour données réelles avec OAuth2
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
-import time
+from concurrent.futures import ThreadPoolExecutor
 import os
+import threading
 from dotenv import load_dotenv
 
+from src.data.weather_archive import read_archived_weather
+
 # Charger les credentials
 load_dotenv()
 
@@ -38,6 +41,19 @@ RTE_CREDENTIALS = {
     'forecast': get_secret('RTE_FORECAST_CREDENTIALS'),
 }
 
+# Fenêtre max (jours) acceptée par requête pour chaque endpoint RTE.
+# Au-delà l'API répond en erreur → DataFrame vide → prix synthétiques.
+RTE_MAX_WINDOW_DAYS = {
+    'wholesale': 7,
+    'generation': 155,
+    'consumption': 186,
+}
+
+# Requêtes RTE simultanées max, tous endpoints et fenêtres confondus
+# (fetch_all_data interroge les endpoints en parallèle: un sémaphore commun les borne)
+RTE_MAX_WORKERS = 8
+_rte_slots = threading.BoundedSemaphore(RTE_MAX_WORKERS)
+
 def get_oauth_token(credential_base64):
     """
     Obtient un token OAuth2 avec les credentials Base64
@@ -70,10 +86,83 @@ def get_oauth_token(credential_base64):
         return None
 
 
+def split_date_range(start_date, end_date, max_days):
+    """
+    Découpe une période en fenêtres consécutives de max_days jours au plus
+    
+    Args:
+        start_date: Date début (YYYY-MM-DD, bornes incluses)
+        end_date: Date fin (YYYY-MM-DD)
+        max_days: Nombre de jours max par fenêtre
+    
+    Returns:
+        Liste de tuples (start, end) au format YYYY-MM-DD
+    """
+    start = pd.Timestamp(start_date).date()
+    end = pd.Timestamp(end_date).date()
+    
+    windows = []
+    while start <= end:
+        window_end = min(start + timedelta(days=max_days - 1), end)
+        windows.append((str(start), str(window_end)))
+        start = window_end + timedelta(days=1)
+    
+    return windows
+
+
+def _fetch_rte_windowed(endpoint, fetch_window, start_date, end_date):
+    """
+    Récupère une période quelconque en respectant la fenêtre max de l'endpoint
+    
+    Les fenêtres sont requêtées en parallèle (un seul token OAuth) puis fusionnées;
+    au plus RTE_MAX_WORKERS requêtes en vol dans le process, tous appels confondus.
+    
+    Args:
+        endpoint: Clé RTE ('wholesale', 'generation', 'consumption')
+        fetch_window: Fonction (token, start, end) -> DataFrame pour une fenêtre
+        start_date: Date début (YYYY-MM-DD)
+        end_date: Date fin (YYYY-MM-DD)
+    
+    Returns:
+        DataFrame fusionné trié par timestamp
+    """
+    token = get_oauth_token(RTE_CREDENTIALS[endpoint])
+    if not token:
+        print("❌ Impossible d'obtenir le token OAuth")
+        return pd.DataFrame()
+    
+    windows = split_date_range(start_date, end_date, RTE_MAX_WINDOW_DAYS[endpoint])
+    
+    if len(windows) > 1:
+        print(f"   ↳ {len(windows)} fenêtres de {RTE_MAX_WINDOW_DAYS[endpoint]} jours max")
+    
+    def fetch(window):
+        with _rte_slots:
+            return fetch_window(token, window[0], window[1])
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(RTE_MAX_WORKERS, len(windows)))) as executor:
+        frames = list(executor.map(fetch, windows))
+    
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame()
+    
+    df = pd.concat(frames, ignore_index=True)
+    
+    # Heures en bordure de fenêtre éventuellement présentes deux fois
+    df = df.drop_duplicates(subset='timestamp', keep='last')
+    df = df.sort_values('timestamp').reset_index(drop=True)
+    
+    return df
+
+
 def fetch_rte_wholesale_prices(start_date, end_date):
     """
     Récupère les prix EPEX Spot via API RTE avec OAuth2
     
+    Les périodes plus longues que RTE_MAX_WINDOW_DAYS['wholesale'] sont
+    découpées et récupérées en parallèle.
+    
     Args:
         start_date: Date début (YYYY-MM-DD)
         end_date: Date fin (YYYY-MM-DD)
@@ -83,12 +172,14 @@ def fetch_rte_wholesale_prices(start_date, end_date):
     """
     print(f"🔄 Récupération prix RTE ({start_date} à {end_date})...")
     
-    # Obtenir token
-    token = get_oauth_token(RTE_CREDENTIALS['wholesale'])
-    if not token:
-        print("❌ Impossible d'obtenir le token OAuth")
-        return pd.DataFrame()
+    df = _fetch_rte_windowed('wholesale', _fetch_wholesale_window, start_date, end_date)
     
+    print(f"✅ {len(df)} prix horaires récupérés")
+    return df
+
+
+def _fetch_wholesale_window(token, start_date, end_date):
+    """Prix EPEX Spot pour une fenêtre compatible avec la limite RTE"""
     url = f"{RTE_BASE_URL}/open_api/wholesale_market/v3/france_power_exchanges"
     
     headers = {
@@ -126,13 +217,12 @@ def fetch_rte_wholesale_prices(start_date, end_date):
                 df['timestamp'] = df['timestamp'].dt.floor('h')  # Arrondir à l'heure
                 df = df.groupby('timestamp').agg({'price_eur_mwh': 'mean'}).reset_index()
             
-            print(f"✅ {len(df)} prix horaires récupérés")
             return df
         else:
-            print(f"⚠️ Erreur API RTE: {response.status_code}")
+            print(f"⚠️ Erreur API RTE ({start_date} à {end_date}): {response.status_code}")
             print(f"Message: {response.text[:200]}")
             return pd.DataFrame()
-            
+    
     except Exception as e:
         print(f"❌ Erreur: {e}")
         return pd.DataFrame()
@@ -142,17 +232,23 @@ def fetch_rte_production(start_date, end_date):
     """
     Récupère la production par filière via API RTE avec OAuth2
     
+    Les périodes plus longues que RTE_MAX_WINDOW_DAYS['generation'] sont
+    découpées et récupérées en parallèle.
+    
     Returns:
         DataFrame avec: timestamp, nuclear_gw, wind_gw, solar_gw, etc.
     """
     print(f"🔄 Récupération production RTE...")
     
-    # Obtenir token
-    token = get_oauth_token(RTE_CREDENTIALS['generation'])
-    if not token:
-        print("❌ Impossible d'obtenir le token OAuth")
-        return pd.DataFrame()
+    df = _fetch_rte_windowed('generation', _fetch_production_window, start_date, end_date)
     
+    if not df.empty:
+        print(f"✅ {len(df)} points de production récupérés")
+    return df
+
+
+def _fetch_production_window(token, start_date, end_date):
+    """Production par filière pour une fenêtre compatible avec la limite RTE"""
     url = f"{RTE_BASE_URL}/open_api/actual_generation/v1/actual_generations_per_production_type"
     
     headers = {
@@ -203,6 +299,7 @@ def fetch_rte_production(start_date, end_date):
                     values='production_gw',
                     aggfunc='mean'  # Moyenne des 4 tranches de 15min
                 ).reset_index()
+                df_pivot.columns.name = None
                 
                 # Renommer TOUTES les colonnes de production
                 rename_map = {
@@ -226,15 +323,14 @@ def fetch_rte_production(start_date, end_date):
                 }
                 df_pivot = df_pivot.rename(columns=rename_map)
                 
-                print(f"✅ {len(df_pivot)} points de production récupérés")
                 return df_pivot
             else:
                 return pd.DataFrame()
         else:
-            print(f"⚠️ Erreur API Production: {response.status_code}")
+            print(f"⚠️ Erreur API Production ({start_date} à {end_date}): {response.status_code}")
             print(f"Message: {response.text[:200]}")
             return pd.DataFrame()
-            
+    
     except Exception as e:
         print(f"❌ Erreur: {e}")
         return pd.DataFrame()
@@ -244,17 +340,22 @@ def fetch_rte_consumption(start_date, end_date):
     """
     Récupère la consommation via API RTE avec OAuth2
     
+    Les périodes plus longues que RTE_MAX_WINDOW_DAYS['consumption'] sont
+    découpées et récupérées en parallèle.
+    
     Returns:
         DataFrame avec: timestamp, demand_gw
     """
     print(f"🔄 Récupération consommation RTE...")
     
-    # Obtenir token
-    token = get_oauth_token(RTE_CREDENTIALS['consumption'])
-    if not token:
-        print("❌ Impossible d'obtenir le token OAuth")
-        return pd.DataFrame()
+    df = _fetch_rte_windowed('consumption', _fetch_consumption_window, start_date, end_date)
     
+    print(f"✅ {len(df)} points horaires de consommation récupérés")
+    return df
+
+
+def _fetch_consumption_window(token, start_date, end_date):
+    """Consommation pour une fenêtre compatible avec la limite RTE"""
     url = f"{RTE_BASE_URL}/open_api/consumption/v1/short_term"
     
     headers = {
@@ -293,13 +394,12 @@ def fetch_rte_consumption(start_date, end_date):
                 df['timestamp'] = df['timestamp'].dt.floor('h')
                 df = df.groupby('timestamp').agg({'demand_gw': 'mean'}).reset_index()
             
-            print(f"✅ {len(df)} points horaires de consommation récupérés")
             return df
         else:
-            print(f"⚠️ Erreur API Consommation: {response.status_code}")
+            print(f"⚠️ Erreur API Consommation ({start_date} à {end_date}): {response.status_code}")
             print(f"Message: {response.text[:200]}")
             return pd.DataFrame()
-            
+    
     except Exception as e:
         print(f"❌ Erreur: {e}")
         return pd.DataFrame()
@@ -334,6 +434,20 @@ def fetch_meteo_data(latitude=48.8566, longitude=2.3522, start_date=None, end_da
         if isinstance(end_date, str):
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
     
+    # Archive locale d'abord (python -m src.data.weather_archive): pas de réseau
+    archived = read_archived_weather(latitude, longitude, start_date, end_date)
+    if not archived.empty and archived['timestamp'].min().date() <= start_date:
+        covered_until = archived['timestamp'].max()
+        if covered_until >= pd.Timestamp(end_date) + pd.Timedelta(hours=23):
+            print(f"✅ {len(archived)} points météo lus depuis l'archive ({start_date} à {end_date})")
+            return archived
+        
+        # Complément via l'API pour les derniers jours (dernier jour partiel re-téléchargé)
+        start_date = covered_until.date()
+        archived = archived[archived['timestamp'] < pd.Timestamp(start_date)]
+    else:
+        archived = pd.DataFrame()
+    
     url = "https://archive-api.open-meteo.com/v1/archive"
     
     params = {
@@ -363,14 +477,16 @@ def fetch_meteo_data(latitude=48.8566, longitude=2.3522, start_date=None, end_da
             })
             
             print(f"✅ {len(df)} points météo récupérés")
+            if not archived.empty:
+                df = pd.concat([archived, df], ignore_index=True)
             return df
         else:
             print(f"⚠️ Erreur Open-Meteo: {response.status_code}")
-            return pd.DataFrame()
-            
+            return archived
+    
     except Exception as e:
         print(f"❌ Erreur: {e}")
-        return pd.DataFrame()
+        return archived
 
 
 # ====================
@@ -381,6 +497,9 @@ def fetch_all_data(start_date, end_date):
     """
     Récupère toutes les données et les fusionne
     
+    Les périodes longues (plusieurs mois) sont acceptées: chaque endpoint RTE
+    découpe la période selon sa fenêtre max (RTE_MAX_WINDOW_DAYS).
+    
     Returns:
         DataFrame fusionné avec toutes les colonnes
     """
@@ -388,20 +507,17 @@ def fetch_all_data(start_date, end_date):
     print("📊 RÉCUPÉRATION DONNÉES RÉELLES (OAuth2)")
     print("=" * 60)
     
-    # Météo
-    df_meteo = fetch_meteo_data(start_date=start_date, end_date=end_date)
-    time.sleep(1)  # Pause courtoise
-    
-    # Prix RTE
-    df_prices = fetch_rte_wholesale_prices(start_date, end_date)
-    time.sleep(1)
-    
-    # Production RTE
-    df_production = fetch_rte_production(start_date, end_date)
-    time.sleep(1)
-    
-    # Consommation RTE
-    df_consumption = fetch_rte_consumption(start_date, end_date)
+    # Météo + 3 endpoints RTE en parallèle (chacun découpé en fenêtres si besoin)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        future_meteo = executor.submit(fetch_meteo_data, start_date=start_date, end_date=end_date)
+        future_prices = executor.submit(fetch_rte_wholesale_prices, start_date, end_date)
+        future_production = executor.submit(fetch_rte_production, start_date, end_date)
+        future_consumption = executor.submit(fetch_rte_consumption, start_date, end_date)
+        
+        df_meteo = future_meteo.result()
+        df_prices = future_prices.result()
+        df_production = future_production.result()
+        df_consumption = future_consumption.result()
     
     print("\n" + "=" * 60)
     print("🔗 FUSION DES DATASETS")
@@ -445,6 +561,8 @@ def fetch_all_data(start_date, end_date):
             from src.features.generate_prices import generate_realistic_prices
         
         df['price_eur_mwh'] = generate_realistic_prices(df)
+        # Prix simulés: jamais stockés comme prix réels (cf. training.store_recent_prices)
+        df.attrs['synthetic_prices'] = True
         print(f"✅ {df['price_eur_mwh'].notna().sum()} prix générés")
         print(f"   Moyenne: {df['price_eur_mwh'].mean():.2f} €/MWh")
         print(f"   Min/Max: {df['price_eur_mwh'].min():.2f} / {df['price_eur_mwh'].max():.2f} €/MWh")
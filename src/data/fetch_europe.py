@@ -7,7 +7,19 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from src.data.entsoe_api import EntsoeClient
-import requests
+from src.data.open_meteo import OpenMeteoClient, to_frames
+from src.data.weather_service import get_weather_service
+from src.data.weather_grid import fetch_zone_weather
+
+
+# Coordonnées capitales (point météo de référence par pays)
+CITIES = {
+    'FR': {'lat': 48.8566, 'lon': 2.3522, 'name': 'Paris'},
+    'DE': {'lat': 52.5200, 'lon': 13.4050, 'name': 'Berlin'},
+    'ES': {'lat': 40.4168, 'lon': -3.7038, 'name': 'Madrid'},
+    'IT': {'lat': 41.9028, 'lon': 12.4964, 'name': 'Rome'},
+    'GB': {'lat': 51.5074, 'lon': -0.1278, 'name': 'Londres'},
+}
 
 
 def fetch_european_prices(countries=['FR', 'DE', 'ES', 'IT', 'GB'], days=7):
@@ -100,6 +112,8 @@ def generate_fallback_prices(country, start_date, end_date):
         'price_eur_mwh': prices,
         'country': country
     })
+    # Prix simulés: affichage seulement, jamais d'entraînement (cf. multi_market.build_zone_panel)
+    df.attrs['synthetic_prices'] = True
     
     print(f"   ⚠️ Utilisation prix simulés (moyenne {base}€/MWh)")
     
@@ -108,82 +122,67 @@ def generate_fallback_prices(country, start_date, end_date):
 
 def fetch_weather_multi_cities():
     """
-    Récupère météo pour capitales européennes
+    Récupère météo pour capitales européennes (une seule requête Open-Meteo)
     
     Returns:
         Dict {country: DataFrame}
     """
-    # Coordonnées capitales
-    CITIES = {
-        'FR': {'lat': 48.8566, 'lon': 2.3522, 'name': 'Paris'},
-        'DE': {'lat': 52.5200, 'lon': 13.4050, 'name': 'Berlin'},
-        'ES': {'lat': 40.4168, 'lon': -3.7038, 'name': 'Madrid'},
-        'IT': {'lat': 41.9028, 'lon': 12.4964, 'name': 'Rome'},
-        'GB': {'lat': 51.5074, 'lon': -0.1278, 'name': 'Londres'},
-    }
+    countries = list(CITIES)
     
-    weather_data = {}
+    times, values = OpenMeteoClient().fetch_hourly(
+        [CITIES[c]['lat'] for c in countries],
+        [CITIES[c]['lon'] for c in countries],
+        past_days=7,
+        forecast_days=0
+    )
     
-    for country, city in CITIES.items():
-        try:
-            # Historique 7 jours
-            url_historical = "https://api.open-meteo.com/v1/forecast"
-            params_hist = {
-                'latitude': city['lat'],
-                'longitude': city['lon'],
-                'hourly': 'temperature_2m,windspeed_10m,shortwave_radiation',
-                'past_days': 7,
-                'forecast_days': 0,
-                'timezone': 'Europe/Paris'
-            }
-            
-            response = requests.get(url_historical, params=params_hist, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                hourly = data.get('hourly', {})
-                
-                df = pd.DataFrame({
-                    'timestamp': pd.to_datetime(hourly['time']),
-                    'temperature_c': hourly['temperature_2m'],
-                    'wind_speed_kmh': hourly['windspeed_10m'],
-                    'solar_radiation_wm2': hourly['shortwave_radiation']
-                })
-                
-                df['country'] = country
-                weather_data[country] = df
-                print(f"✅ Météo {city['name']}: {len(df)} heures")
-            
-        except Exception as e:
-            print(f"❌ Météo {city['name']}: {e}")
+    weather_data = to_frames(countries, times, values)
+    
+    for country, df in weather_data.items():
+        df['country'] = country
+        print(f"✅ Météo {CITIES[country]['name']}: {len(df)} heures")
     
     return weather_data
 
 
-def predict_prices_europe(historical_prices, weather_data, forecast_hours=48):
+def predict_prices_europe(historical_prices, weather_data, forecast_hours=48, residual_stats=None):
     """
     Prédit prix futurs pour chaque pays
-    Utilise formules simplifiées basées sur mix énergétique
+    Modèle de la zone s'il est publié au registre, sinon formules
+    simplifiées basées sur mix énergétique
+    
+    Intervalles de confiance: quantiles des scénarios Monte Carlo (src/analysis/scenarios.py).
+    Zones sans résidus historiques: statistiques par défaut (σ 8 €/MWh, AR 0.8).
     
     Args:
         historical_prices: Dict {country: DataFrame prix historiques}
         weather_data: Dict {country: DataFrame météo}
         forecast_hours: Heures à prédire
+        residual_stats: residual_statistics() des erreurs de prévision (défaut: valeurs par défaut)
     
     Returns:
         Dict {country: DataFrame avec prédictions}
     """
     predictions = {}
     
-    # Récupérer prévisions météo futures
+    countries = list(historical_prices.keys())
+    forecasts = fetch_zone_forecasts(countries, days=2)
+    
+    # Modèles par zone publiés (src/models/multi_market.py): formules en secours
+    zone_models = _load_zone_models(countries)
+    
     for country in historical_prices.keys():
         try:
             # Météo future
-            weather_forecast = fetch_weather_forecast(country, days=2)
+            weather_forecast = forecasts.get(country, pd.DataFrame())
             
             if weather_forecast.empty:
                 continue
             
+            if country in zone_models:
+                predictions[country] = _predict_with_zone_model(zone_models[country], weather_forecast)
+                continue
+            
             # Prix historique récent (pour baseline)
             recent_prices = historical_prices[country].tail(48)
             avg_price = recent_prices['price_eur_mwh'].mean()
@@ -241,60 +240,87 @@ def predict_prices_europe(historical_prices, weather_data, forecast_hours=48):
                 predicted_prices.append(price)
             
             weather_forecast['predicted_price'] = predicted_prices
-            weather_forecast['confidence_lower'] = weather_forecast['predicted_price'] * 0.9
-            weather_forecast['confidence_upper'] = weather_forecast['predicted_price'] * 1.1
-            
-            predictions[country] = weather_forecast[['timestamp', 'predicted_price', 'confidence_lower', 'confidence_upper']]
             
+            predictions[country] = weather_forecast[['timestamp', 'predicted_price']]
+        
         except Exception as e:
             print(f"❌ Prédiction {country}: {e}")
     
-    return predictions
+    return _with_scenario_bands(predictions, residual_stats)
 
 
-def fetch_weather_forecast(country, days=2):
-    """Récupère prévisions météo futures pour un pays"""
-    CITIES = {
-        'FR': {'lat': 48.8566, 'lon': 2.3522},
-        'DE': {'lat': 52.5200, 'lon': 13.4050},
-        'ES': {'lat': 40.4168, 'lon': -3.7038},
-        'IT': {'lat': 41.9028, 'lon': 12.4964},
-        'GB': {'lat': 51.5074, 'lon': -0.1278},
+def _with_scenario_bands(predictions, residual_stats=None):
+    """Ajoute confidence_lower/upper (quantiles des scénarios de prix) à chaque zone"""
+    from src.analysis.scenarios import scenario_bands
+    
+    bands = scenario_bands(predictions, residual_stats)
+    return {
+        country: df.merge(bands[country], on='timestamp', how='left') if country in bands else df
+        for country, df in predictions.items()
     }
+
+
+def _load_zone_models(countries):
+    """Modèles de zone courants du registre ({} si aucun ou registre illisible)"""
+    try:
+        from src.models.multi_market import load_zone_models
+        return load_zone_models(countries)
+    except Exception as e:
+        print(f"⚠️ Modèles par zone indisponibles: {e}")
+        return {}
+
+
+def _predict_with_zone_model(model, weather_forecast):
+    """Prédiction d'une zone avec son modèle (features météo + calendrier)"""
+    from src.features.pipeline import build_features, feature_matrix
     
-    city = CITIES.get(country)
-    if not city:
-        return pd.DataFrame()
-    
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        'latitude': city['lat'],
-        'longitude': city['lon'],
-        'hourly': 'temperature_2m,windspeed_10m,shortwave_radiation',
-        'forecast_days': days,
-        'timezone': 'Europe/Paris'
-    }
+    df = build_features(weather_forecast, model.features)
+    df['predicted_price'] = model.predict(feature_matrix(df, model.features))
     
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            hourly = data.get('hourly', {})
-            
-            df = pd.DataFrame({
-                'timestamp': pd.to_datetime(hourly['time']),
-                'temperature_c': hourly['temperature_2m'],
-                'wind_speed_kmh': hourly['windspeed_10m'],
-                'solar_radiation_wm2': hourly['shortwave_radiation']
-            })
-            
-            return df
+    return df[['timestamp', 'predicted_price']]
+
+
+def fetch_zone_forecasts(countries, days=2):
+    """
+    Prévisions météo futures par zone: grille pondérée (tous les points en
+    une requête), capitale en secours pour les zones sans grille
     
-    except Exception as e:
-        print(f"❌ Météo forecast {country}: {e}")
+    Returns:
+        Dict {country: DataFrame}
+    """
+    forecasts = fetch_zone_weather(countries, days=days)
+    forecasts.update(fetch_weather_forecasts([c for c in countries if c not in forecasts], days=days))
+    return forecasts
+
+
+def fetch_weather_forecasts(countries, days=2):
+    """
+    Récupère prévisions météo futures pour plusieurs pays en une requête
     
-    return pd.DataFrame()
+    Args:
+        countries: Liste codes pays
+        days: Nombre de jours à prévoir
+    
+    Returns:
+        Dict {country: DataFrame}
+    """
+    countries = [c for c in countries if c in CITIES]
+    if not countries:
+        return {}
+    
+    # Cache partagé avec predict_future: un seul téléchargement par run météo
+    times, values = get_weather_service().get_forecasts(
+        [CITIES[c]['lat'] for c in countries],
+        [CITIES[c]['lon'] for c in countries],
+        days=days
+    )
+    
+    return to_frames(countries, times, values)
+
+
+def fetch_weather_forecast(country, days=2):
+    """Récupère prévisions météo futures pour un pays"""
+    return fetch_weather_forecasts([country], days=days).get(country, pd.DataFrame())
 
 
 if __name__ == "__main__":
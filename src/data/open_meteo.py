@@ -0,0 +1,156 @@
+"""
+Client Open-Meteo multi-localisations
+Une seule requête HTTP pour N points × M variables, décodée en array
+(localisation × temps × variable)
+"""
+
+import numpy as np
+import pandas as pd
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+# Variables horaires Open-Meteo → colonnes MétéoTrader
+HOURLY_VARIABLES = {
+    'temperature_2m': 'temperature_c',
+    'windspeed_10m': 'wind_speed_kmh',
+    'shortwave_radiation': 'solar_radiation_wm2',
+}
+
+# Au-delà, l'URL devient trop longue: on découpe en requêtes parallèles
+MAX_LOCATIONS_PER_REQUEST = 200
+
+
+class OpenMeteoClient:
+    """Client batch pour les APIs forecast et archive d'Open-Meteo"""
+    
+    def __init__(self, timezone='Europe/Paris', timeout=30):
+        """
+        Args:
+            timezone: Fuseau horaire des timestamps retournés
+            timeout: Timeout HTTP (secondes)
+        """
+        self.timezone = timezone
+        self.timeout = timeout
+    
+    def fetch_hourly(self, latitudes, longitudes, variables=None, url=FORECAST_URL, **params):
+        """
+        Récupère des séries horaires pour plusieurs points en une requête
+        
+        Args:
+            latitudes: Liste de latitudes
+            longitudes: Liste de longitudes (même longueur)
+            variables: Variables Open-Meteo (défaut: HOURLY_VARIABLES)
+            url: FORECAST_URL ou ARCHIVE_URL
+            **params: Paramètres API supplémentaires (forecast_days, past_days,
+                start_date, end_date...)
+        
+        Returns:
+            (timestamps, values): DatetimeIndex commun et array float
+            (localisation × temps × variable). Timestamps vides si erreur.
+        """
+        variables = list(variables or HOURLY_VARIABLES)
+        latitudes = list(latitudes)
+        longitudes = list(longitudes)
+        
+        chunks = [
+            (latitudes[i:i + MAX_LOCATIONS_PER_REQUEST], longitudes[i:i + MAX_LOCATIONS_PER_REQUEST])
+            for i in range(0, len(latitudes), MAX_LOCATIONS_PER_REQUEST)
+        ]
+        
+        if len(chunks) == 1:
+            results = [self._fetch_chunk(chunks[0][0], chunks[0][1], variables, url, params)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+                results = list(executor.map(
+                    lambda c: self._fetch_chunk(c[0], c[1], variables, url, params), chunks
+                ))
+        
+        if any(len(times) == 0 for times, _ in results):
+            return pd.DatetimeIndex([]), np.empty((len(latitudes), 0, len(variables)))
+        
+        times = results[0][0]
+        values = np.concatenate([v for _, v in results], axis=0)
+        
+        return times, values
+    
+    def _fetch_chunk(self, latitudes, longitudes, variables, url, params):
+        """Une requête HTTP pour un groupe de points"""
+        query = {
+            'latitude': ','.join(f'{lat:.4f}' for lat in latitudes),
+            'longitude': ','.join(f'{lon:.4f}' for lon in longitudes),
+            'hourly': ','.join(variables),
+            'timezone': self.timezone,
+            **params
+        }
+        
+        try:
+            response = requests.get(url, params=query, timeout=self.timeout)
+            
+            if response.status_code != 200:
+                print(f"⚠️ Erreur Open-Meteo: {response.status_code}")
+                print(f"Message: {response.text[:200]}")
+                return pd.DatetimeIndex([]), None
+            
+            payload = response.json()
+            # Un seul point → objet, plusieurs points → liste d'objets
+            if isinstance(payload, dict):
+                payload = [payload]
+            
+            times = pd.DatetimeIndex(pd.to_datetime(payload[0]['hourly']['time']))
+            values = np.empty((len(payload), len(times), len(variables)))
+            
+            for i, location in enumerate(payload):
+                hourly = location['hourly']
+                for j, var in enumerate(variables):
+                    # None (valeur manquante) → NaN
+                    values[i, :, j] = np.asarray(hourly[var], dtype=float)
+            
+            return times, values
+        
+        except Exception as e:
+            print(f"❌ Erreur Open-Meteo: {e}")
+            return pd.DatetimeIndex([]), None
+
+
+def to_frame(times, location_values, variables=None):
+    """
+    Convertit les valeurs d'un point (temps × variable) en DataFrame MétéoTrader
+    
+    Args:
+        times: DatetimeIndex retourné par fetch_hourly
+        location_values: Array (temps × variable)
+        variables: Variables Open-Meteo dans l'ordre de la dernière dimension
+    
+    Returns:
+        DataFrame avec: timestamp, temperature_c, wind_speed_kmh, solar_radiation_wm2
+    """
+    variables = list(variables or HOURLY_VARIABLES)
+    
+    df = pd.DataFrame({'timestamp': times})
+    for j, var in enumerate(variables):
+        df[HOURLY_VARIABLES.get(var, var)] = location_values[:, j]
+    
+    return df
+
+
+def to_frames(keys, times, values, variables=None):
+    """
+    Convertit un array (localisation × temps × variable) en dict de DataFrames
+    
+    Args:
+        keys: Clé de chaque localisation (ex: codes pays), même ordre que values
+        times: DatetimeIndex retourné par fetch_hourly
+        values: Array (localisation × temps × variable)
+        variables: Variables Open-Meteo
+    
+    Returns:
+        Dict {key: DataFrame}
+    """
+    if len(times) == 0:
+        return {}
+    
+    return {key: to_frame(times, values[i], variables) for i, key in enumerate(keys)}
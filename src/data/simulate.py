@@ -164,6 +164,8 @@ def generate_realistic_data(days=365, seed=42):
 def add_lag_features(df, target='price_eur_mwh', lags=[1, 24, 168]):
     """
     Ajoute des features de lag (valeurs précédentes)
+    Version incrémentale (heure par heure): StreamingFeatureState
+    dans src/features/streaming.py
     
     Args:
         df: DataFrame avec column 'target'
@@ -0,0 +1,387 @@
+"""
+Archive météo historique (multi-années, horaire) pour l'entraînement
+Stockage colonnaire append-only en NumPy memory-mappé:
+- un fichier par variable, float32, lignes = heures, colonnes = points
+- lecture sans copie (np.memmap) pour l'entraînement
+- lecteurs en lecture seule (n_rows de meta.json), un seul écrivain à la
+  fois (verrou fichier), fin de fichier non validée tronquée par l'écrivain
+
+Ingestion incrémentale:
+    python -m src.data.weather_archive --start 2019-01-01
+"""
+
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.data.open_meteo import OpenMeteoClient, ARCHIVE_URL, HOURLY_VARIABLES
+from src.data.weather_grid import ZoneGrid, ZONE_GRID_POINTS
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-process
+    fcntl = None
+
+
+ARCHIVE_DIR = 'data/weather_archive'
+ARCHIVE_START_DATE = '2019-01-01'
+
+# Une requête Open-Meteo archive par tranche (tous les points d'un coup)
+ARCHIVE_CHUNK_DAYS = 92
+
+# Données archive disponibles avec quelques jours de retard
+ARCHIVE_LAG_DAYS = 2
+
+# Timestamps stockés en UTC, convertis en heure de Paris à la lecture
+LOCAL_TIMEZONE = 'Europe/Paris'
+
+
+def configured_points(grid_points=None):
+    """
+    Liste à plat des points météo configurés (toutes zones)
+    
+    Returns:
+        Liste de dicts {zone, name, lat, lon}
+    """
+    grid_points = grid_points or ZONE_GRID_POINTS
+    return [
+        {'zone': zone, 'name': p['name'], 'lat': p['lat'], 'lon': p['lon']}
+        for zone, points in grid_points.items()
+        for p in points
+    ]
+
+
+class WeatherArchive:
+    """Archive météo colonnaire memory-mappée, extensible par la fin"""
+    
+    def __init__(self, archive_dir=ARCHIVE_DIR, points=None, variables=None):
+        """
+        Args:
+            archive_dir: Dossier de l'archive
+            points: Points à archiver (défaut: configured_points())
+            variables: Variables Open-Meteo (défaut: HOURLY_VARIABLES)
+        """
+        self.archive_dir = archive_dir
+        self.meta_path = os.path.join(archive_dir, 'meta.json')
+        self._writer_depth = 0
+        
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+            
+            if points is not None and [(p['lat'], p['lon']) for p in points] != \
+                    [(p['lat'], p['lon']) for p in self.meta['points']]:
+                raise ValueError(
+                    f"Les points configurés ne correspondent pas à l'archive {archive_dir}. "
+                    "Utilisez un autre dossier ou supprimez l'archive pour la reconstruire."
+                )
+        else:
+            self.meta = {
+                'points': points or configured_points(),
+                'variables': list(variables or HOURLY_VARIABLES),
+                'n_rows': 0,
+                'dtype': 'float32',
+            }
+    
+    # ===== ÉCRITURE =====
+    
+    def ingest(self, start_date=ARCHIVE_START_DATE, end_date=None, client=None):
+        """
+        Complète l'archive jusqu'à end_date (reprend après la dernière heure stockée)
+        
+        Args:
+            start_date: Début si l'archive est vide (YYYY-MM-DD)
+            end_date: Fin (défaut: aujourd'hui - ARCHIVE_LAG_DAYS)
+            client: OpenMeteoClient (défaut: client UTC)
+        
+        Returns:
+            Nombre d'heures ajoutées
+        """
+        with self._writer():
+            return self._ingest(start_date, end_date, client)
+    
+    def _ingest(self, start_date, end_date, client):
+        client = client or OpenMeteoClient(timezone='GMT', timeout=120)
+        end = pd.Timestamp(end_date or (datetime.now().date() - timedelta(days=ARCHIVE_LAG_DAYS)))
+        
+        last = self.last_timestamp()
+        start = pd.Timestamp(start_date) if last is None else (last + pd.Timedelta(hours=1)).normalize()
+        
+        if start > end:
+            print(f"✅ Archive météo à jour (dernière heure: {last})")
+            return 0
+        
+        points = self.meta['points']
+        print(f"🔄 Ingestion archive météo: {len(points)} points, {start.date()} → {end.date()}")
+        
+        added = 0
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + pd.Timedelta(days=ARCHIVE_CHUNK_DAYS - 1), end)
+            
+            times, values = client.fetch_hourly(
+                [p['lat'] for p in points],
+                [p['lon'] for p in points],
+                variables=self.meta['variables'],
+                url=ARCHIVE_URL,
+                start_date=str(chunk_start.date()),
+                end_date=str(chunk_end.date())
+            )
+            
+            if len(times) == 0:
+                print(f"❌ Échec ingestion {chunk_start.date()} → {chunk_end.date()}, arrêt")
+                break
+            
+            added += self.append(times, values)
+            print(f"   ✅ {chunk_start.date()} → {chunk_end.date()}: {len(times)} heures")
+            
+            chunk_start = chunk_end + pd.Timedelta(days=1)
+        
+        print(f"✅ {added} heures ajoutées ({self.meta['n_rows']} au total)")
+        return added
+    
+    def append(self, times, values):
+        """
+        Ajoute des heures en fin d'archive (heures déjà présentes ignorées)
+        
+        Args:
+            times: DatetimeIndex UTC (naïf)
+            values: Array (points × temps × variable)
+        
+        Returns:
+            Nombre d'heures ajoutées
+        """
+        with self._writer():
+            return self._append(times, values)
+    
+    def _append(self, times, values):
+        times = pd.DatetimeIndex(times)
+        last = self.last_timestamp()
+        keep = np.ones(len(times), dtype=bool) if last is None else np.asarray(times > last)
+        
+        # Heures sans aucune donnée (fin d'archive pas encore publiée)
+        keep &= ~np.isnan(values).all(axis=(0, 2))
+        if not keep.any():
+            return 0
+        
+        dtype = np.dtype(self.meta['dtype'])
+        
+        with open(self._path('times'), 'ab') as f:
+            f.write(np.asarray(times[keep], dtype='datetime64[ns]').view(np.int64).tobytes())
+        
+        for j, var in enumerate(self.meta['variables']):
+            # (temps × points), contigu par ligne: append = écriture séquentielle
+            block = np.ascontiguousarray(values[:, keep, j].T, dtype=dtype)
+            with open(self._path(var), 'ab') as f:
+                f.write(block.tobytes())
+        
+        # meta.json fait foi: écrit en dernier
+        self.meta['n_rows'] += int(keep.sum())
+        self._write_meta()
+        
+        return int(keep.sum())
+    
+    # ===== LECTURE =====
+    
+    def __len__(self):
+        return self.meta['n_rows']
+    
+    def last_timestamp(self):
+        """Dernière heure stockée (UTC) ou None"""
+        if self.meta['n_rows'] == 0:
+            return None
+        return pd.Timestamp(int(self.raw_times()[-1]))
+    
+    def raw_times(self):
+        """Timestamps UTC en int64 (ns), memory-mappés"""
+        return self._memmap('times', np.int64, (self.meta['n_rows'],))
+    
+    def variable(self, var):
+        """
+        Valeurs d'une variable, sans copie
+        
+        Args:
+            var: Variable Open-Meteo
+        
+        Returns:
+            np.memmap lecture seule (temps × points)
+        """
+        return self._memmap(var, np.dtype(self.meta['dtype']), (self.meta['n_rows'], len(self.meta['points'])))
+    
+    def time_slice(self, start_date=None, end_date=None):
+        """Indices [i0, i1) des heures entre start_date et end_date (heure de Paris, bornes incluses)"""
+        times = self.raw_times()
+        i0, i1 = 0, len(times)
+        if start_date is not None:
+            start = _local_to_utc(pd.Timestamp(start_date))
+            i0 = int(np.searchsorted(times, start.value, side='left'))
+        if end_date is not None:
+            end = _local_to_utc(pd.Timestamp(end_date) + pd.Timedelta(hours=23))
+            i1 = int(np.searchsorted(times, end.value, side='right'))
+        return i0, i1
+    
+    def point_index(self, latitude, longitude, tolerance=0.05):
+        """Indice du point archivé le plus proche (None si aucun à moins de tolerance degrés)"""
+        lats = np.array([p['lat'] for p in self.meta['points']])
+        lons = np.array([p['lon'] for p in self.meta['points']])
+        if len(lats) == 0:
+            return None
+        
+        distance = np.abs(lats - latitude) + np.abs(lons - longitude)
+        i = int(np.argmin(distance))
+        return i if distance[i] <= tolerance else None
+    
+    def point_frame(self, latitude, longitude, start_date=None, end_date=None):
+        """
+        Séries horaires d'un point au format fetch_meteo_data
+        
+        Returns:
+            DataFrame avec: timestamp, temperature_c, wind_speed_kmh, solar_radiation_wm2
+            (vide si point non archivé)
+        """
+        i = self.point_index(latitude, longitude)
+        if i is None or len(self) == 0:
+            return pd.DataFrame()
+        
+        i0, i1 = self.time_slice(start_date, end_date)
+        df = pd.DataFrame({'timestamp': self._local_times(i0, i1)})
+        for var in self.meta['variables']:
+            df[HOURLY_VARIABLES.get(var, var)] = self.variable(var)[i0:i1, i]
+        
+        return df
+    
+    def zone_frame(self, zone, start_date=None, end_date=None):
+        """
+        Séries horaires d'une zone (moyenne pondérée de la grille, cf. weather_grid)
+        
+        Returns:
+            DataFrame avec: timestamp, temperature_c, wind_speed_kmh, solar_radiation_wm2
+        """
+        columns = [i for i, p in enumerate(self.meta['points']) if p['zone'] == zone]
+        if not columns or len(self) == 0:
+            return pd.DataFrame()
+        
+        grid = ZoneGrid.from_points([zone])
+        first, last = columns[0], columns[-1] + 1
+        i0, i1 = self.time_slice(start_date, end_date)
+        
+        df = pd.DataFrame({'timestamp': self._local_times(i0, i1)})
+        for var in self.meta['variables']:
+            # Bloc contigu de colonnes de la zone → (points × temps × 1) pour ZoneGrid.reduce
+            block = self.variable(var)[i0:i1, first:last].T[:, :, None]
+            df[HOURLY_VARIABLES.get(var, var)] = grid.reduce(block, [var])[0, :, 0]
+        
+        return df
+    
+    # ===== INTERNE =====
+    
+    def _local_times(self, i0, i1):
+        times = pd.DatetimeIndex(self.raw_times()[i0:i1].astype('datetime64[ns]'))
+        return times.tz_localize('UTC').tz_convert(LOCAL_TIMEZONE).tz_localize(None)
+    
+    def _path(self, name):
+        return os.path.join(self.archive_dir, f'{name}.bin')
+    
+    def _memmap(self, name, dtype, shape):
+        if shape[0] == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode='r', shape=shape)
+    
+    def _write_meta(self):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+    
+    @contextmanager
+    def _writer(self):
+        """
+        Section d'écriture: verrou exclusif (un seul écrivain, tous process confondus),
+        meta.json relu (autre écrivain passé entre-temps), fin non validée tronquée
+        """
+        if self._writer_depth:
+            self._writer_depth += 1
+            try:
+                yield
+            finally:
+                self._writer_depth -= 1
+            return
+        
+        os.makedirs(self.archive_dir, exist_ok=True)
+        with open(os.path.join(self.archive_dir, 'writer.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._writer_depth = 1
+            try:
+                if os.path.exists(self.meta_path):
+                    with open(self.meta_path) as f:
+                        self.meta = json.load(f)
+                self._truncate_to_meta()
+                yield
+            finally:
+                self._writer_depth = 0
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _truncate_to_meta(self):
+        """
+        Supprime une fin de fichier écrite sans mise à jour de meta.json (ingestion interrompue)
+        
+        Écrivain seulement (cf. _writer): un lecteur couperait les lignes qu'un écrivain vient d'ajouter.
+        """
+        n_rows = self.meta['n_rows']
+        row_sizes = {'times': 8}
+        row_sizes.update({
+            var: len(self.meta['points']) * np.dtype(self.meta['dtype']).itemsize
+            for var in self.meta['variables']
+        })
+        
+        for name, row_size in row_sizes.items():
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > n_rows * row_size:
+                with open(path, 'r+b') as f:
+                    f.truncate(n_rows * row_size)
+
+
+def _local_to_utc(timestamp):
+    """Heure locale Paris (naïve) → UTC (naïve)"""
+    return timestamp.tz_localize(LOCAL_TIMEZONE, ambiguous=True, nonexistent='shift_forward') \
+        .tz_convert('UTC').tz_localize(None)
+
+
+def read_archived_weather(latitude, longitude, start_date, end_date, archive_dir=ARCHIVE_DIR):
+    """
+    Météo archivée pour un point, sans réseau
+    
+    Returns:
+        DataFrame (vide si pas d'archive ou point non archivé)
+    """
+    if not os.path.exists(os.path.join(archive_dir, 'meta.json')):
+        return pd.DataFrame()
+    
+    try:
+        return WeatherArchive(archive_dir).point_frame(latitude, longitude, start_date, end_date)
+    except Exception as e:
+        print(f"⚠️ Archive météo illisible: {e}")
+        return pd.DataFrame()
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Ingestion archive météo Open-Meteo")
+    parser.add_argument('--start', default=ARCHIVE_START_DATE, help="Début si archive vide (YYYY-MM-DD)")
+    parser.add_argument('--end', default=None, help="Fin (défaut: aujourd'hui - 2 jours)")
+    parser.add_argument('--dir', default=ARCHIVE_DIR, help="Dossier de l'archive")
+    args = parser.parse_args()
+    
+    archive = WeatherArchive(args.dir)
+    archive.ingest(start_date=args.start, end_date=args.end)
+    
+    print(f"\n📊 {len(archive)} heures × {len(archive.meta['points'])} points archivés")
+    if len(archive):
+        print(f"   Période: {pd.Timestamp(int(archive.raw_times()[0]))} → {archive.last_timestamp()} (UTC)")
@@ -0,0 +1,206 @@
+"""
+Grilles météo pondérées par zone
+Plusieurs points par pays (parcs éoliens, solaire, population) agrégés
+en features zone par somme pondérée vectorisée
+"""
+
+import numpy as np
+
+from src.data.open_meteo import HOURLY_VARIABLES, to_frames
+from src.data.weather_service import get_weather_service
+
+
+# Points météo par zone. Poids approximatifs par région:
+# - wind: capacité éolienne installée (GW)
+# - solar: capacité solaire installée (GW)
+# - population: habitants (millions), proxy de la demande (température)
+ZONE_GRID_POINTS = {
+    'FR': [
+        {'name': 'Paris', 'lat': 48.8566, 'lon': 2.3522, 'wind': 0.5, 'solar': 0.4, 'population': 12.3},
+        {'name': 'Hauts-de-France', 'lat': 50.30, 'lon': 2.80, 'wind': 5.5, 'solar': 0.7, 'population': 6.0},
+        {'name': 'Grand Est', 'lat': 48.80, 'lon': 5.60, 'wind': 4.2, 'solar': 1.2, 'population': 5.5},
+        {'name': 'Bretagne / Pays de la Loire', 'lat': 47.70, 'lon': -2.50, 'wind': 2.8, 'solar': 0.9, 'population': 7.2},
+        {'name': 'Nouvelle-Aquitaine', 'lat': 45.20, 'lon': 0.20, 'wind': 1.6, 'solar': 4.0, 'population': 6.0},
+        {'name': 'Occitanie', 'lat': 43.60, 'lon': 2.50, 'wind': 1.9, 'solar': 3.5, 'population': 6.0},
+        {'name': 'PACA', 'lat': 43.60, 'lon': 5.80, 'wind': 0.1, 'solar': 2.0, 'population': 5.1},
+        {'name': 'Auvergne-Rhône-Alpes', 'lat': 45.76, 'lon': 4.84, 'wind': 0.7, 'solar': 1.5, 'population': 8.1},
+    ],
+    'DE': [
+        {'name': 'Schleswig-Holstein', 'lat': 54.30, 'lon': 9.70, 'wind': 8.5, 'solar': 2.5, 'population': 2.9},
+        {'name': 'Niedersachsen', 'lat': 52.80, 'lon': 9.20, 'wind': 12.0, 'solar': 6.0, 'population': 8.0},
+        {'name': 'Berlin / Brandenburg', 'lat': 52.52, 'lon': 13.40, 'wind': 8.0, 'solar': 5.0, 'population': 6.3},
+        {'name': 'Mecklenburg-Vorpommern', 'lat': 53.80, 'lon': 12.50, 'wind': 3.6, 'solar': 3.0, 'population': 1.6},
+        {'name': 'Sachsen-Anhalt', 'lat': 51.90, 'lon': 11.70, 'wind': 5.3, 'solar': 3.5, 'population': 2.2},
+        {'name': 'Nordrhein-Westfalen', 'lat': 51.40, 'lon': 7.40, 'wind': 7.0, 'solar': 7.5, 'population': 17.9},
+        {'name': 'Bayern', 'lat': 48.80, 'lon': 11.50, 'wind': 2.6, 'solar': 20.0, 'population': 13.2},
+        {'name': 'Baden-Württemberg', 'lat': 48.60, 'lon': 9.00, 'wind': 1.7, 'solar': 9.0, 'population': 11.1},
+        {'name': 'Offshore Mer du Nord', 'lat': 54.20, 'lon': 6.50, 'wind': 7.0, 'solar': 0.0, 'population': 0.0},
+        {'name': 'Offshore Baltique', 'lat': 54.60, 'lon': 13.80, 'wind': 1.5, 'solar': 0.0, 'population': 0.0},
+    ],
+    'ES': [
+        {'name': 'Madrid', 'lat': 40.4168, 'lon': -3.7038, 'wind': 0.0, 'solar': 0.3, 'population': 6.8},
+        {'name': 'Castilla y León', 'lat': 41.80, 'lon': -4.70, 'wind': 6.5, 'solar': 3.0, 'population': 2.4},
+        {'name': 'Castilla-La Mancha', 'lat': 39.40, 'lon': -3.00, 'wind': 3.9, 'solar': 5.5, 'population': 2.1},
+        {'name': 'Andalucía', 'lat': 37.50, 'lon': -5.00, 'wind': 3.6, 'solar': 7.0, 'population': 8.5},
+        {'name': 'Extremadura', 'lat': 38.90, 'lon': -6.30, 'wind': 0.0, 'solar': 6.0, 'population': 1.1},
+        {'name': 'Aragón', 'lat': 41.60, 'lon': -0.90, 'wind': 5.0, 'solar': 3.5, 'population': 1.3},
+        {'name': 'Galicia', 'lat': 42.90, 'lon': -8.00, 'wind': 3.9, 'solar': 0.1, 'population': 2.7},
+        {'name': 'Cataluña', 'lat': 41.40, 'lon': 2.17, 'wind': 1.3, 'solar': 1.2, 'population': 7.8},
+        {'name': 'Comunitat Valenciana', 'lat': 39.47, 'lon': -0.38, 'wind': 1.3, 'solar': 2.0, 'population': 5.1},
+    ],
+    'IT': [
+        {'name': 'Lombardia', 'lat': 45.46, 'lon': 9.19, 'wind': 0.0, 'solar': 3.0, 'population': 10.0},
+        {'name': 'Veneto / Emilia-Romagna', 'lat': 45.00, 'lon': 11.50, 'wind': 0.1, 'solar': 5.0, 'population': 9.3},
+        {'name': 'Roma / Lazio', 'lat': 41.9028, 'lon': 12.4964, 'wind': 0.1, 'solar': 1.8, 'population': 5.7},
+        {'name': 'Campania', 'lat': 40.85, 'lon': 14.27, 'wind': 1.9, 'solar': 1.0, 'population': 5.6},
+        {'name': 'Puglia', 'lat': 41.10, 'lon': 16.20, 'wind': 2.8, 'solar': 3.2, 'population': 3.9},
+        {'name': 'Basilicata / Calabria', 'lat': 39.50, 'lon': 16.30, 'wind': 2.5, 'solar': 0.9, 'population': 2.4},
+        {'name': 'Sicilia', 'lat': 37.60, 'lon': 14.00, 'wind': 2.0, 'solar': 2.0, 'population': 4.8},
+        {'name': 'Sardegna', 'lat': 40.00, 'lon': 9.00, 'wind': 1.1, 'solar': 1.0, 'population': 1.6},
+    ],
+    'GB': [
+        {'name': 'Londres', 'lat': 51.5074, 'lon': -0.1278, 'wind': 0.1, 'solar': 1.5, 'population': 15.0},
+        {'name': 'Midlands', 'lat': 52.50, 'lon': -1.90, 'wind': 0.5, 'solar': 2.5, 'population': 10.0},
+        {'name': 'Nord Angleterre', 'lat': 53.50, 'lon': -2.20, 'wind': 1.5, 'solar': 1.5, 'population': 15.0},
+        {'name': 'Sud-Ouest', 'lat': 50.70, 'lon': -3.50, 'wind': 0.5, 'solar': 4.0, 'population': 5.7},
+        {'name': 'Pays de Galles', 'lat': 52.30, 'lon': -3.70, 'wind': 1.2, 'solar': 1.0, 'population': 3.1},
+        {'name': 'Écosse', 'lat': 56.50, 'lon': -4.00, 'wind': 9.0, 'solar': 0.5, 'population': 5.4},
+        {'name': 'Offshore Dogger / Hornsea', 'lat': 54.00, 'lon': 1.80, 'wind': 8.0, 'solar': 0.0, 'population': 0.0},
+        {'name': 'Offshore East Anglia', 'lat': 52.60, 'lon': 2.00, 'wind': 4.0, 'solar': 0.0, 'population': 0.0},
+        {'name': 'Offshore Mer d\'Irlande', 'lat': 53.80, 'lon': -3.60, 'wind': 2.5, 'solar': 0.0, 'population': 0.0},
+        {'name': 'Offshore Moray Firth', 'lat': 58.20, 'lon': -2.80, 'wind': 2.0, 'solar': 0.0, 'population': 0.0},
+    ],
+}
+
+WEIGHT_KINDS = ('wind', 'solar', 'population')
+
+# Poids utilisé pour agréger chaque variable Open-Meteo
+VARIABLE_WEIGHTS = {
+    'temperature_2m': 'population',
+    'windspeed_10m': 'wind',
+    'shortwave_radiation': 'solar',
+}
+
+
+class ZoneGrid:
+    """
+    Points météo de plusieurs zones stockés en arrays plats
+    
+    Les points d'une même zone sont contigus: la réduction zone se fait
+    avec un seul np.add.reduceat, quel que soit le nombre de points.
+    """
+    
+    def __init__(self, zones, zone_starts, latitudes, longitudes, weights):
+        """
+        Args:
+            zones: Codes zone, dans l'ordre des blocs de points
+            zone_starts: Indice du premier point de chaque zone
+            latitudes: Array (points,)
+            longitudes: Array (points,)
+            weights: Array (points × 3) dans l'ordre WEIGHT_KINDS
+        """
+        self.zones = list(zones)
+        self.zone_starts = np.asarray(zone_starts, dtype=np.intp)
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+    
+    @classmethod
+    def from_points(cls, zones=None, grid_points=None):
+        """
+        Construit la grille depuis un dict {zone: [points]}
+        
+        Args:
+            zones: Zones à inclure (défaut: toutes)
+            grid_points: Dict de points (défaut: ZONE_GRID_POINTS)
+        
+        Returns:
+            ZoneGrid
+        """
+        grid_points = grid_points or ZONE_GRID_POINTS
+        zones = [z for z in (zones or grid_points) if grid_points.get(z)]
+        
+        points = [p for z in zones for p in grid_points[z]]
+        sizes = [len(grid_points[z]) for z in zones]
+        
+        return cls(
+            zones=zones,
+            zone_starts=np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp) if zones else [],
+            latitudes=[p['lat'] for p in points],
+            longitudes=[p['lon'] for p in points],
+            weights=[[p[k] for k in WEIGHT_KINDS] for p in points]
+        )
+    
+    def __len__(self):
+        return len(self.latitudes)
+    
+    def variable_weights(self, variables):
+        """
+        Poids de chaque point pour chaque variable
+        
+        Args:
+            variables: Variables Open-Meteo
+        
+        Returns:
+            Array (points × variables)
+        """
+        columns = [WEIGHT_KINDS.index(VARIABLE_WEIGHTS.get(v, 'population')) for v in variables]
+        return self.weights[:, columns]
+    
+    def reduce(self, values, variables=None):
+        """
+        Agrège les séries des points en séries zone (moyenne pondérée)
+        
+        Les valeurs manquantes (NaN) sont ignorées: les poids restants
+        sont renormalisés.
+        
+        Args:
+            values: Array (points × temps × variable)
+            variables: Variables Open-Meteo (défaut: HOURLY_VARIABLES)
+        
+        Returns:
+            Array (zones × temps × variable)
+        """
+        variables = list(variables or HOURLY_VARIABLES)
+        weights = self.variable_weights(variables)[:, None, :]
+        
+        valid = ~np.isnan(values)
+        weighted = np.where(valid, values, 0.0) * weights
+        
+        numerator = np.add.reduceat(weighted, self.zone_starts, axis=0)
+        denominator = np.add.reduceat(valid * weights, self.zone_starts, axis=0)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def fetch_zone_weather(zones, days=2, variables=None, grid=None):
+    """
+    Prévisions météo zone (agrégées sur la grille pondérée)
+    
+    Tous les points de toutes les zones sont récupérés en une requête
+    (via le cache partagé WeatherService).
+    
+    Args:
+        zones: Liste codes zone
+        days: Nombre de jours à prévoir
+        variables: Variables Open-Meteo (défaut: HOURLY_VARIABLES)
+        grid: ZoneGrid (défaut: construite depuis ZONE_GRID_POINTS)
+    
+    Returns:
+        Dict {zone: DataFrame avec timestamp, temperature_c, wind_speed_kmh, solar_radiation_wm2}
+    """
+    variables = list(variables or HOURLY_VARIABLES)
+    grid = grid or ZoneGrid.from_points(zones)
+    
+    if len(grid) == 0:
+        return {}
+    
+    times, values = get_weather_service().get_forecasts(
+        grid.latitudes, grid.longitudes, days=days, variables=variables
+    )
+    
+    if len(times) == 0:
+        return {}
+    
+    return to_frames(grid.zones, times, grid.reduce(values, variables), variables)
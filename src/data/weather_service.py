@@ -0,0 +1,268 @@
+"""
+Service météo partagé: prévisions Open-Meteo avec cache LRU + disque
+Chaque run de modèle météo n'est téléchargé qu'une fois par process;
+un téléchargement (points × temps × variable) est gardé comme un seul bloc
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from src.data.open_meteo import OpenMeteoClient, HOURLY_VARIABLES, to_frame
+
+
+CACHE_DIR = 'data/cache/weather'
+
+# Horizon max Open-Meteo: on télécharge tout, puis on tranche selon 'days'
+FORECAST_DAYS = 16
+
+# Runs des modèles globaux à 00/06/12/18 UTC, publiés ~4h plus tard
+MODEL_RUN_HOURS = 6
+MODEL_RUN_DELAY_HOURS = 4
+
+
+def current_model_run(now=None):
+    """
+    Identifiant du dernier run de modèle météo publié
+    
+    Args:
+        now: Instant de référence (défaut: maintenant, UTC)
+    
+    Returns:
+        String 'YYYYMMDDHH' (UTC)
+    """
+    now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+    if now.tzinfo is None:
+        now = now.tz_localize('UTC')
+    
+    published = now.tz_convert('UTC') - pd.Timedelta(hours=MODEL_RUN_DELAY_HOURS)
+    run = published.floor(f'{MODEL_RUN_HOURS}h')
+    
+    return run.strftime('%Y%m%d%H')
+
+
+class WeatherService:
+    """
+    Prévisions météo par blocs, un cache par run de modèle météo
+    
+    Un bloc = un téléchargement (points × temps × variable) gardé tel quel,
+    en mémoire (LRU) et dans un seul .npz par bloc. Chaque point est
+    retrouvé par un index (point, variables) → (bloc, ligne).
+    """
+    
+    def __init__(self, cache_dir=CACHE_DIR, max_entries=256, client=None):
+        """
+        Args:
+            cache_dir: Dossier du cache disque (None = mémoire seulement)
+            max_entries: Nombre max de points gardés en mémoire (tous blocs confondus)
+            client: OpenMeteoClient (défaut: client standard)
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.client = client or OpenMeteoClient()
+        
+        self._blocks = OrderedDict()  # (variables, points) → (times, values) du run courant
+        self._index = {}              # (point, variables) → clé de bloc
+        self._lock = threading.Lock()
+        self._run = None
+        
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError as e:
+                print(f"⚠️ Cache météo disque désactivé ({cache_dir}): {e}")
+                self.cache_dir = None
+    
+    def get_forecast(self, latitude, longitude, days=2, variables=None):
+        """
+        Prévisions horaires pour un point
+        
+        Args:
+            latitude: Latitude
+            longitude: Longitude
+            days: Nombre de jours (à partir d'aujourd'hui 00h)
+            variables: Variables Open-Meteo (défaut: HOURLY_VARIABLES)
+        
+        Returns:
+            DataFrame avec: timestamp, temperature_c, wind_speed_kmh, solar_radiation_wm2
+        """
+        times, values = self.get_forecasts([latitude], [longitude], days=days, variables=variables)
+        
+        if len(times) == 0:
+            return pd.DataFrame()
+        
+        return to_frame(times, values[0], variables)
+    
+    def get_forecasts(self, latitudes, longitudes, days=2, variables=None):
+        """
+        Prévisions horaires pour plusieurs points
+        
+        Les points absents du cache sont téléchargés en une seule requête
+        et stockés ensemble comme un nouveau bloc.
+        
+        Args:
+            latitudes: Liste de latitudes
+            longitudes: Liste de longitudes
+            days: Nombre de jours (à partir d'aujourd'hui 00h)
+            variables: Variables Open-Meteo (défaut: HOURLY_VARIABLES)
+        
+        Returns:
+            (timestamps, values): DatetimeIndex et array (localisation × temps × variable)
+        """
+        variables = tuple(variables or HOURLY_VARIABLES)
+        run = current_model_run()
+        self._check_run(run)
+        
+        points = [(round(float(lat), 4), round(float(lon), 4)) for lat, lon in zip(latitudes, longitudes)]
+        
+        # Point → (times, values du bloc, ligne): références gardées même si le bloc est évincé
+        found = {}
+        with self._lock:
+            for point in set(points):
+                block_key = self._index.get((point, variables))
+                if block_key is not None:
+                    self._blocks.move_to_end(block_key)
+                    times, block_values = self._blocks[block_key]
+                    found[point] = (times, block_values, block_key[1].index(point))
+        
+        missing = tuple(sorted(set(points) - set(found)))
+        if missing:
+            times, values = self.client.fetch_hourly(
+                [p[0] for p in missing],
+                [p[1] for p in missing],
+                variables=variables,
+                forecast_days=FORECAST_DAYS
+            )
+            
+            if len(times) == 0:
+                return pd.DatetimeIndex([]), np.empty((len(points), 0, len(variables)))
+            
+            self._store(run, (variables, missing), times, values)
+            for row, point in enumerate(missing):
+                found[point] = (times, values, row)
+        
+        # Fenêtre demandée: aujourd'hui 00h (heure de Paris) + days jours
+        start = pd.Timestamp.now(tz=self.client.timezone).normalize().tz_localize(None)
+        window = pd.date_range(start, periods=days * 24, freq='h')
+        
+        # Positions calculées une fois par bloc, lignes d'un même bloc copiées ensemble
+        by_block = {}
+        for i, point in enumerate(points):
+            times, block_values, row = found[point]
+            entry = by_block.setdefault(id(block_values), (times, block_values, [], []))
+            entry[2].append(i)
+            entry[3].append(row)
+        
+        values = np.full((len(points), len(window), len(variables)), np.nan)
+        for times, block_values, targets, rows in by_block.values():
+            positions = pd.DatetimeIndex(times).get_indexer(window)
+            ok = positions >= 0
+            values[np.ix_(targets, np.flatnonzero(ok))] = block_values[np.ix_(rows, positions[ok])]
+        
+        return window, values
+    
+    def clear(self):
+        """Vide le cache mémoire"""
+        with self._lock:
+            self._blocks.clear()
+            self._index.clear()
+    
+    def _check_run(self, run):
+        """Nouveau run publié → blocs des runs précédents supprimés, blocs disque du run rechargés"""
+        with self._lock:
+            if run == self._run:
+                return
+            
+            self._run = run
+            self._blocks.clear()
+            self._index.clear()
+        
+        if not self.cache_dir:
+            return
+        
+        try:
+            names = sorted(os.listdir(self.cache_dir))
+        except OSError as e:
+            print(f"⚠️ Cache météo illisible ({self.cache_dir}): {e}")
+            return
+        
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            if not name.endswith('.npz'):
+                continue
+            if not name.startswith(run):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            
+            try:
+                with np.load(path) as data:
+                    points = tuple(zip(data['latitudes'].tolist(), data['longitudes'].tolist()))
+                    block_key = (tuple(data['variables'].tolist()), points)
+                    self._remember(block_key, pd.DatetimeIndex(data['times']), data['values'])
+            except Exception as e:
+                print(f"⚠️ Cache météo illisible ({path}): {e}")
+    
+    def _store(self, run, block_key, times, values):
+        """Écrit un bloc en mémoire et sur disque (un .npz par bloc)"""
+        self._remember(block_key, times, values)
+        
+        path = self._path(run, block_key)
+        if not path:
+            return
+        
+        variables, points = block_key
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    latitudes=np.array([p[0] for p in points]),
+                    longitudes=np.array([p[1] for p in points]),
+                    variables=np.array(variables),
+                    times=np.asarray(times, dtype='datetime64[ns]'),
+                    values=values
+                )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Écriture cache météo impossible ({path}): {e}")
+    
+    def _remember(self, block_key, times, values):
+        variables, points = block_key
+        with self._lock:
+            self._blocks[block_key] = (times, values)
+            self._blocks.move_to_end(block_key)
+            for point in points:
+                self._index[(point, variables)] = block_key
+            
+            # Éviction des blocs les plus anciens (au moins le dernier bloc gardé)
+            while len(self._blocks) > 1 and sum(len(k[1]) for k in self._blocks) > self.max_entries:
+                old_key, _ = self._blocks.popitem(last=False)
+                for point in old_key[1]:
+                    if self._index.get((point, old_key[0])) == old_key:
+                        del self._index[(point, old_key[0])]
+    
+    def _path(self, run, block_key):
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(repr(block_key).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f'{run}_{digest}.npz')
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_weather_service():
+    """Instance partagée du service (une par process)"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WeatherService()
+        return _service
@@ -6,6 +6,8 @@ Utilise les VRAIES données de production et consommation
 import pandas as pd
 import numpy as np
 
+from src.features.pipeline import PRICE_FEATURES, build_features
+
 
 def generate_realistic_prices(df):
     """
@@ -111,14 +113,9 @@ def add_price_features(df):
     
     # Features additionnelles pour analyse
     if 'timestamp' in df.columns:
-        # Prix moyens par heure (rolling average)
+        # Moyennes mobiles, variation et volatilité (pipeline de features)
         df = df.sort_values('timestamp')
-        df['price_ma_3h'] = df['price_eur_mwh'].rolling(window=3, min_periods=1).mean()
-        df['price_ma_12h'] = df['price_eur_mwh'].rolling(window=12, min_periods=1).mean()
-        
-        # Variation de prix (pour détecter volatilité)
-        df['price_change_1h'] = df['price_eur_mwh'].diff()
-        df['price_volatility_3h'] = df['price_eur_mwh'].rolling(window=3, min_periods=1).std()
+        df = build_features(df, PRICE_FEATURES)
     
     return df
 
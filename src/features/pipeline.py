@@ -0,0 +1,283 @@
+"""
+Pipeline de features unique pour entraînement, prédiction et backtesting
+Features déclarées une fois, calculées à la demande (colonne par colonne)
+et mises en cache par hash des données d'entrée
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Features du modèle de prix (ordre = ordre des colonnes de X)
+MODEL_FEATURES = [
+    'temperature_c', 'wind_speed_kmh', 'solar_radiation_wm2',
+    'nuclear_production_gw', 'total_production_gw', 'demand_gw',
+    'hour', 'day_of_week', 'month', 'is_weekend', 'is_peak_hour',
+    'temp_extreme', 'renewable_share', 'production_demand_gap'
+]
+
+PRICE_FEATURES = ['price_ma_3h', 'price_ma_12h', 'price_change_1h', 'price_volatility_3h']
+
+# Heures de pointe (soir) et seuils de température extrême (°C)
+PEAK_HOURS = (18, 20)
+TEMP_COLD = 5
+TEMP_HOT = 25
+
+CACHE_SIZE = 32
+
+# Registre: nom → fonction(FeatureFrame) → array/Series
+FEATURES = {}
+
+
+def feature(name):
+    """Décorateur: déclare une feature calculée"""
+    def register(func):
+        FEATURES[name] = func
+        return func
+    return register
+
+
+class FeatureFrame:
+    """
+    Vue paresseuse sur un DataFrame: une colonne de base est lue telle quelle,
+    une feature déclarée est calculée au premier accès puis mémorisée.
+    Les dépendances se résolvent d'elles-mêmes (frame['hour'] dans is_peak_hour...).
+    """
+    
+    def __init__(self, df):
+        self.df = df
+        self._computed = {}
+    
+    def __getitem__(self, name):
+        if name in self.df.columns:
+            return self.df[name]
+        
+        if name not in self._computed:
+            if name not in FEATURES:
+                raise KeyError(name)
+            values = FEATURES[name](self)
+            self._computed[name] = pd.Series(np.asarray(values), index=self.df.index, name=name)
+        
+        return self._computed[name]
+    
+    def __contains__(self, name):
+        """Colonne présente ou calculable à partir des colonnes disponibles"""
+        try:
+            self[name]
+            return True
+        except KeyError:
+            return False
+    
+    @property
+    def columns(self):
+        return self.df.columns
+    
+    def computed(self, names):
+        """Features calculées disponibles parmi names (colonnes de base exclues)"""
+        return {n: self._computed[n] for n in names if n not in self.df.columns and n in self}
+
+
+# ===== FEATURES TEMPORELLES =====
+
+@feature('hour')
+def _hour(f):
+    return f['timestamp'].dt.hour
+
+
+@feature('day_of_week')
+def _day_of_week(f):
+    return f['timestamp'].dt.dayofweek
+
+
+@feature('month')
+def _month(f):
+    return f['timestamp'].dt.month
+
+
+@feature('is_weekend')
+def _is_weekend(f):
+    return (f['day_of_week'] >= 5).astype(int)
+
+
+@feature('is_peak_hour')
+def _is_peak_hour(f):
+    return ((f['hour'] >= PEAK_HOURS[0]) & (f['hour'] <= PEAK_HOURS[1])).astype(int)
+
+
+# ===== FEATURES MÉTÉO / SYSTÈME =====
+
+@feature('temp_extreme')
+def _temp_extreme(f):
+    return ((f['temperature_c'] < TEMP_COLD) | (f['temperature_c'] > TEMP_HOT)).astype(int)
+
+
+@feature('renewable_production_gw')
+def _renewable_production(f):
+    renewable_cols = [
+        c for c in f.columns
+        if 'production_gw' in c and c != 'total_production_gw'
+        and ('wind' in c.lower() or 'solar' in c.lower())
+    ]
+    if not renewable_cols:
+        raise KeyError('renewable_production_gw')
+    return f.df[renewable_cols].sum(axis=1)
+
+
+@feature('renewable_share')
+def _renewable_share(f):
+    return (f['renewable_production_gw'] / f['total_production_gw'].replace(0, np.nan)).fillna(0)
+
+
+@feature('production_demand_gap')
+def _production_demand_gap(f):
+    return f['demand_gw'] - f['total_production_gw']
+
+
+# ===== FEATURES PRIX (données triées par timestamp) =====
+
+@feature('price_ma_3h')
+def _price_ma_3h(f):
+    return f['price_eur_mwh'].rolling(window=3, min_periods=1).mean()
+
+
+@feature('price_ma_12h')
+def _price_ma_12h(f):
+    return f['price_eur_mwh'].rolling(window=12, min_periods=1).mean()
+
+
+@feature('price_change_1h')
+def _price_change_1h(f):
+    return f['price_eur_mwh'].diff()
+
+
+@feature('price_volatility_3h')
+def _price_volatility_3h(f):
+    return f['price_eur_mwh'].rolling(window=3, min_periods=1).std()
+
+
+# ===== CACHE =====
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def frame_hash(df):
+    """Empreinte du contenu d'un DataFrame (valeurs, index, noms de colonnes)"""
+    digest = hashlib.sha1(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def clear_cache():
+    """Vide le cache des matrices de features"""
+    with _cache_lock:
+        _cache.clear()
+
+
+def _compute(df, names):
+    """Features calculées pour df (cache par hash des données d'entrée)"""
+    key = (frame_hash(df), tuple(names))
+    
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    
+    computed = FeatureFrame(df).computed(names)
+    
+    with _cache_lock:
+        _cache[key] = computed
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    
+    return computed
+
+
+# ===== API =====
+
+def build_features(df, names=None):
+    """
+    Ajoute les features demandées à un DataFrame
+    
+    Les features non calculables (colonne source absente) sont ignorées.
+    
+    Args:
+        df: DataFrame avec au moins 'timestamp'
+        names: Features voulues (défaut: MODEL_FEATURES)
+    
+    Returns:
+        Copie de df enrichie
+    """
+    names = list(names or MODEL_FEATURES)
+    computed = _compute(df, names)
+    
+    df = df.copy()
+    for name, values in computed.items():
+        df[name] = values.values
+    
+    return df
+
+
+def available_features(df, names=None):
+    """Features de names présentes ou calculables pour df (ordre conservé)"""
+    names = list(names or MODEL_FEATURES)
+    computed = _compute(df, names)
+    return [n for n in names if n in df.columns or n in computed]
+
+
+def feature_matrix(df, feature_columns, fill_value=0):
+    """
+    Matrice X dans l'ordre exact des features du modèle
+    
+    Même code à l'entraînement et en prédiction: pas de décalage
+    entre les deux. Les features absentes valent fill_value.
+    
+    Args:
+        df: DataFrame (colonnes de base et/ou features déjà calculées)
+        feature_columns: Features attendues par le modèle
+        fill_value: Valeur des features manquantes et des NaN
+    
+    Returns:
+        DataFrame (len(df) × len(feature_columns))
+    """
+    computed = _compute(df, feature_columns)
+    
+    X = pd.DataFrame(index=df.index)
+    for name in feature_columns:
+        if name in df.columns:
+            X[name] = df[name]
+        elif name in computed:
+            X[name] = computed[name]
+        else:
+            X[name] = fill_value
+    
+    return X.fillna(fill_value)
+
+
+if __name__ == "__main__":
+    import time
+    
+    print("🧪 Test pipeline de features...")
+    
+    dates = pd.date_range(start='2025-01-01', periods=24 * 365, freq='h')
+    test_df = pd.DataFrame({
+        'timestamp': dates,
+        'temperature_c': np.random.normal(12, 8, len(dates)),
+        'wind_production_gw': np.random.uniform(2, 15, len(dates)),
+        'solar_production_gw': np.random.uniform(0, 10, len(dates)),
+        'nuclear_production_gw': np.random.uniform(35, 50, len(dates)),
+        'demand_gw': np.random.normal(55, 8, len(dates)),
+    })
+    test_df['total_production_gw'] = test_df[['wind_production_gw', 'solar_production_gw', 'nuclear_production_gw']].sum(axis=1)
+    
+    features = available_features(test_df)
+    print(f"✅ Features disponibles: {features}")
+    
+    for label in ["Calcul", "Cache"]:
+        start = time.perf_counter()
+        X = feature_matrix(test_df, features)
+        print(f"   {label}: {(time.perf_counter() - start) * 1000:.1f} ms ({X.shape})")
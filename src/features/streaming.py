@@ -0,0 +1,240 @@
+"""
+Features de lag / rolling incrémentales (buffer circulaire)
+Une nouvelle heure coûte O(nombre de features), quelle que soit la taille
+de l'historique. Mêmes valeurs que add_lag_features et PRICE_FEATURES
+(src/features/pipeline.py) calculés sur tout le DataFrame.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class _RollingWindow:
+    """Moyenne / écart-type glissants (Welford avec retrait), NaN ignorés"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+    
+    def add(self, x):
+        if np.isnan(x):
+            return
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+    
+    def remove(self, x):
+        if np.isnan(x):
+            return
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.n * self.mean - x) / (self.n - 1)
+        self.m2 = max(self.m2 - (x - self.mean) * (x - mean), 0.0)
+        self.mean = mean
+        self.n -= 1
+    
+    def values(self):
+        mean = self.mean if self.n > 0 else np.nan
+        std = np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan  # ddof=1 comme pandas
+        return mean, std
+    
+    def state(self):
+        return [self.n, self.mean, self.m2]
+
+
+class StreamingFeatureState:
+    """État incrémental des features de lag, moyennes mobiles, volatilité et variations"""
+    
+    def __init__(self, target='price_eur_mwh', lags=(1, 24, 168), mean_windows=(3, 12),
+                 std_windows=(3,), diffs=(1,), prefix=None):
+        """
+        Args:
+            target: Colonne suivie
+            lags: Lags en heures ({target}_lag_{lag}h)
+            mean_windows: Fenêtres des moyennes mobiles ({prefix}_ma_{w}h)
+            std_windows: Fenêtres de volatilité ({prefix}_volatility_{w}h)
+            diffs: Variations ({prefix}_change_{d}h)
+            prefix: Préfixe des features rolling (défaut: 'price' pour price_eur_mwh)
+        """
+        self.target = target
+        self.lags = tuple(lags)
+        self.mean_windows = tuple(mean_windows)
+        self.std_windows = tuple(std_windows)
+        self.diffs = tuple(diffs)
+        self.prefix = prefix or target.split('_')[0]
+        
+        # Assez d'heures pour le plus grand lag / la plus grande fenêtre
+        self.capacity = max(self.lags + self.diffs + self.mean_windows + self.std_windows) + 1
+        self.buffer = np.full(self.capacity, np.nan)
+        self.pos = 0          # Prochaine case à écrire
+        self.count = 0        # Heures reçues (plafonné à capacity)
+        self.last_timestamp = None
+        
+        self.windows = {w: _RollingWindow(w) for w in sorted(set(self.mean_windows + self.std_windows))}
+    
+    # ===== MISE À JOUR =====
+    
+    def update(self, value, timestamp=None):
+        """
+        Ajoute une nouvelle heure
+        
+        Les heures manquantes depuis le dernier timestamp sont comptées comme NaN,
+        pour que les lags restent alignés sur l'horloge.
+        
+        Args:
+            value: Valeur de target pour cette heure
+            timestamp: Heure de l'observation (optionnel)
+        
+        Returns:
+            Dict des features pour cette heure
+        """
+        if timestamp is not None:
+            timestamp = pd.Timestamp(timestamp)
+            if self.last_timestamp is not None:
+                gap = int((timestamp - self.last_timestamp) / pd.Timedelta(hours=1))
+                if gap < 1:
+                    raise ValueError(f"Timestamp {timestamp} antérieur ou égal à {self.last_timestamp}")
+                for _ in range(min(gap - 1, self.capacity)):
+                    self._push(np.nan)
+            self.last_timestamp = timestamp
+        
+        self._push(float(value) if value is not None else np.nan)
+        
+        return self.features()
+    
+    def _push(self, value):
+        for size, window in self.windows.items():
+            if self.count >= size:
+                # Valeur qui sort de la fenêtre
+                window.remove(self._back(size - 1))
+            window.add(value)
+        
+        self.buffer[self.pos] = value
+        self.pos = (self.pos + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def _back(self, k):
+        """Valeur k heures avant la dernière observation (k=0: dernière)"""
+        if k >= self.count:
+            return np.nan
+        return self.buffer[(self.pos - 1 - k) % self.capacity]
+    
+    # ===== LECTURE =====
+    
+    def features(self):
+        """Features de la dernière heure reçue"""
+        current = self._back(0)
+        features = {}
+        
+        for lag in self.lags:
+            features[f'{self.target}_lag_{lag}h'] = self._back(lag)
+        
+        for w in self.mean_windows:
+            features[f'{self.prefix}_ma_{w}h'] = self.windows[w].values()[0]
+        
+        for d in self.diffs:
+            features[f'{self.prefix}_change_{d}h'] = current - self._back(d)
+        
+        for w in self.std_windows:
+            features[f'{self.prefix}_volatility_{w}h'] = self.windows[w].values()[1]
+        
+        return features
+    
+    @classmethod
+    def from_history(cls, df, timestamp_col='timestamp', **kwargs):
+        """
+        Initialise l'état à partir d'un historique (seules les dernières heures sont lues)
+        
+        Args:
+            df: DataFrame trié par timestamp avec la colonne target
+            **kwargs: Paramètres de StreamingFeatureState
+        """
+        state = cls(**kwargs)
+        tail = df.tail(state.capacity)
+        
+        timestamps = tail[timestamp_col] if timestamp_col in tail.columns else [None] * len(tail)
+        for ts, value in zip(timestamps, tail[state.target]):
+            state.update(value, ts)
+        
+        return state
+    
+    # ===== PERSISTANCE =====
+    
+    def snapshot(self, path):
+        """Sauvegarde l'état sur disque (.npz)"""
+        sizes = sorted(self.windows)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                target=self.target, prefix=self.prefix,
+                lags=self.lags, mean_windows=self.mean_windows,
+                std_windows=self.std_windows, diffs=self.diffs,
+                buffer=self.buffer, cursor=[self.pos, self.count],
+                window_sizes=sizes,
+                window_states=np.array([self.windows[s].state() for s in sizes], dtype=float).reshape(len(sizes), 3),
+                last_timestamp=np.datetime64(self.last_timestamp if self.last_timestamp is not None else 'NaT', 'ns')
+            )
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def restore(cls, path):
+        """Recharge un état sauvegardé par snapshot()"""
+        with np.load(path) as data:
+            state = cls(
+                target=str(data['target']), prefix=str(data['prefix']),
+                lags=data['lags'].tolist(), mean_windows=data['mean_windows'].tolist(),
+                std_windows=data['std_windows'].tolist(), diffs=data['diffs'].tolist()
+            )
+            state.buffer = data['buffer'].copy()
+            state.pos, state.count = (int(v) for v in data['cursor'])
+            
+            for size, (n, mean, m2) in zip(data['window_sizes'].tolist(), data['window_states']):
+                window = state.windows[size]
+                window.n, window.mean, window.m2 = int(n), float(mean), float(m2)
+            
+            last = data['last_timestamp'][()]
+            state.last_timestamp = None if np.isnat(last) else pd.Timestamp(last)
+        
+        return state
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+    
+    from src.data.simulate import add_lag_features
+    from src.features.pipeline import PRICE_FEATURES, build_features
+    
+    print("🧪 Test features incrémentales...")
+    
+    dates = pd.date_range(start='2024-01-01', periods=24 * 60, freq='h')
+    df = pd.DataFrame({'timestamp': dates, 'price_eur_mwh': np.random.normal(80, 20, len(dates))})
+    
+    batch = build_features(add_lag_features(df), PRICE_FEATURES)
+    
+    state = StreamingFeatureState()
+    rows = [state.update(v, ts) for ts, v in zip(df['timestamp'], df['price_eur_mwh'])]
+    stream = pd.DataFrame(rows)
+    
+    columns = list(stream.columns)
+    assert np.allclose(stream[columns].values, batch[columns].values, equal_nan=True)
+    print(f"✅ Identique au calcul batch ({', '.join(columns)})")
+    
+    path = os.path.join(tempfile.mkdtemp(), 'state.npz')
+    state.snapshot(path)
+    restored = StreamingFeatureState.restore(path)
+    next_ts = dates[-1] + pd.Timedelta(hours=1)
+    assert restored.update(90.0, next_ts) == state.update(90.0, next_ts)
+    print("✅ Snapshot / restore")
+    
+    start = time.perf_counter()
+    for i in range(10000):
+        state.update(80.0 + i % 7)
+    print(f"⚡ {(time.perf_counter() - start) / 10000 * 1e6:.1f} µs par heure")
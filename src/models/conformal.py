@@ -0,0 +1,241 @@
+"""
+Intervalles de prédiction conformes (calibration en ligne)
+- Erreurs réel - prédit rangées par seau (horizon, heure de la journée)
+- Chaque seau = buffer trié de taille bornée (les plus anciennes erreurs sortent)
+- Nouveau prix réel: position trouvée par bisect, insertion dans la liste en O(n)
+  (décalage des éléments, n ≤ BUFFER_SIZE), bornes du seau lues par rang
+- Inférence: bornes lues dans une table (horizon × heure), un index par ligne
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+# Seaux d'horizon (heures): [1-6], [7-12], [13-24], [25-36], [37-48], > 48
+LEAD_EDGES = (6, 12, 24, 36, 48)
+
+COVERAGE = 0.95         # Couverture visée (cf. "Intervalle confiance (95%)" du dashboard)
+BUFFER_SIZE = 500       # Erreurs gardées par seau
+MIN_SAMPLES = 30        # En dessous: seau de l'horizon toutes heures confondues, puis défaut
+
+# Sans historique: ancien intervalle fixe ±8 €/MWh
+DEFAULT_INTERVAL = 8.0
+
+
+def lead_bucket(lead_time_hours):
+    """Index du seau d'horizon (scalaire ou array)"""
+    return np.searchsorted(LEAD_EDGES, np.maximum(lead_time_hours, 1), side='left')
+
+
+class _SortedBuffer:
+    """
+    Erreurs triées, taille bornée, ordre d'arrivée gardé pour l'éviction
+    
+    add() coûte O(n) (insort / del décalent la liste): négligeable à n ≤ BUFFER_SIZE.
+    """
+    
+    __slots__ = ('values', 'arrivals', 'size')
+    
+    def __init__(self, size):
+        self.values = []
+        self.arrivals = deque()
+        self.size = size
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def add(self, value):
+        if len(self.arrivals) == self.size:
+            oldest = self.arrivals.popleft()
+            del self.values[bisect_left(self.values, oldest)]
+        insort(self.values, value)
+        self.arrivals.append(value)
+    
+    def bounds(self, coverage):
+        """
+        Quantiles conformes (rang ⌈(n+1)(1-α/2)⌉, garantie en échantillon fini)
+        
+        Returns:
+            (borne basse, borne haute) de l'erreur
+        """
+        n = len(self.values)
+        alpha = 1 - coverage
+        upper = min(n, int(np.ceil((n + 1) * (1 - alpha / 2)))) - 1
+        lower = max(1, int(np.floor((n + 1) * alpha / 2))) - 1
+        return self.values[lower], self.values[upper]
+
+
+class ConformalCalibrator:
+    """Intervalles calibrés sur les erreurs stockées, par (horizon, heure)"""
+    
+    def __init__(self, coverage=COVERAGE, buffer_size=BUFFER_SIZE, min_samples=MIN_SAMPLES,
+                 default_interval=DEFAULT_INTERVAL):
+        """
+        Args:
+            coverage: Couverture visée (0.95 → quantiles 2.5% / 97.5% des erreurs)
+            buffer_size: Erreurs gardées par seau (fenêtre glissante)
+            min_samples: Erreurs minimum pour utiliser un seau
+            default_interval: Demi-largeur sans historique (€/MWh)
+        """
+        self.coverage = coverage
+        self.min_samples = min_samples
+        self.default_interval = default_interval
+        
+        n_leads = len(LEAD_EDGES) + 1
+        # Colonne 24 = toutes heures confondues (repli des seaux trop petits)
+        self.buffers = [[_SortedBuffer(buffer_size) for _ in range(25)] for _ in range(n_leads)]
+        # Heures encore servies par le repli (seau propre trop petit)
+        self.fallback = [set(range(24)) for _ in range(n_leads)]
+        
+        # Table lue à l'inférence: décalages des bornes (réel - prédit)
+        self.lower = np.full((n_leads, 24), -default_interval)
+        self.upper = np.full((n_leads, 24), default_interval)
+        
+        # Suivi incrémental de la BDD: (plus grand id de prédiction, plus grand id de prix réel) lus.
+        # Ordre d'insertion, pas heure cible: les prix day-ahead arrivent avant les heures qu'ils couvrent
+        self.watermark = None
+        self.n_updates = 0
+        self._lock = threading.Lock()
+    
+    # ===== MISE À JOUR =====
+    
+    def update(self, lead_time_hours, hour, residual):
+        """
+        Intègre une erreur réel - prédit (un nouveau prix réel)
+        
+        Args:
+            lead_time_hours: Horizon de la prédiction (heures)
+            hour: Heure de la journée de l'heure cible
+            residual: Réel - prédit (€/MWh)
+        """
+        lead = int(lead_bucket(lead_time_hours))
+        self.buffers[lead][hour].add(float(residual))
+        self.buffers[lead][24].add(float(residual))
+        self.n_updates += 1
+        
+        own = self.buffers[lead][hour]
+        if len(own) >= self.min_samples:
+            self.fallback[lead].discard(hour)
+            self.lower[lead, hour], self.upper[lead, hour] = own.bounds(self.coverage)
+        
+        # Heures sans seau propre: bornes du seau toutes heures (vide une fois l'historique rempli)
+        pooled = self.buffers[lead][24]
+        if len(pooled) >= self.min_samples and self.fallback[lead]:
+            lower, upper = pooled.bounds(self.coverage)
+            for h in self.fallback[lead]:
+                self.lower[lead, h], self.upper[lead, h] = lower, upper
+    
+    def update_many(self, residuals_df):
+        """
+        Intègre un lot d'erreurs (cf. PriceDatabase.get_prediction_residuals)
+        
+        Args:
+            residuals_df: DataFrame target_timestamp, lead_time_hours, residual
+                (+ prediction_id, actual_id pour le suivi incrémental)
+        
+        Returns:
+            Nombre d'erreurs intégrées
+        """
+        if residuals_df.empty:
+            return 0
+        
+        hours = pd.to_datetime(residuals_df['target_timestamp']).dt.hour.to_numpy()
+        for lead, hour, residual in zip(residuals_df['lead_time_hours'].to_numpy(), hours,
+                                        residuals_df['residual'].to_numpy()):
+            self.update(lead, hour, residual)
+        
+        if {'prediction_id', 'actual_id'} <= set(residuals_df.columns):
+            latest = (int(residuals_df['prediction_id'].max()), int(residuals_df['actual_id'].max()))
+            self.watermark = latest if self.watermark is None else tuple(map(max, self.watermark, latest))
+        return len(residuals_df)
+    
+    def sync(self, db, zone='FR'):
+        """
+        Intègre les erreurs arrivées en base depuis le dernier appel
+        
+        Returns:
+            Nombre de nouvelles erreurs
+        """
+        # Plusieurs sessions du dashboard partagent le calibrateur
+        with self._lock:
+            return self.update_many(db.get_prediction_residuals(zone=zone, since=self.watermark))
+    
+    # ===== INFÉRENCE =====
+    
+    def interval(self, predictions, lead_time_hours, hours):
+        """
+        Bornes calibrées des prédictions (une lecture de table par ligne)
+        
+        Args:
+            predictions: Prix prédits
+            lead_time_hours: Horizon de chaque prédiction (heures)
+            hours: Heure de la journée de chaque heure cible
+        
+        Returns:
+            (confidence_lower, confidence_upper) arrays
+        """
+        predictions = np.asarray(predictions, dtype=float)
+        leads = lead_bucket(np.asarray(lead_time_hours))
+        hours = np.asarray(hours, dtype=int)
+        return predictions + self.lower[leads, hours], predictions + self.upper[leads, hours]
+    
+    def summary(self):
+        """
+        Demi-largeur moyenne et taille par seau d'horizon
+        
+        Returns:
+            DataFrame: lead_bucket, n_residuals, mean_width
+        """
+        labels = [f"≤{edge}h" for edge in LEAD_EDGES] + [f">{LEAD_EDGES[-1]}h"]
+        return pd.DataFrame({
+            'lead_bucket': labels,
+            'n_residuals': [len(row[24]) for row in self.buffers],
+            'mean_width': (self.upper - self.lower).mean(axis=1),
+        })
+
+
+if __name__ == "__main__":
+    import time
+    
+    print("🧪 Test calibration conforme...")
+    
+    rng = np.random.default_rng(42)
+    n = 24 * 120
+    timestamps = pd.date_range('2025-01-01', periods=n, freq='h')
+    
+    # Erreurs plus larges aux heures de pointe et à long horizon
+    leads = rng.integers(1, 49, n)
+    peak = (timestamps.hour >= 18) & (timestamps.hour <= 20)
+    scale = 4 + 0.15 * leads + 6 * peak
+    residuals = pd.DataFrame({
+        'target_timestamp': timestamps,
+        'lead_time_hours': leads,
+        'residual': rng.standard_normal(n) * scale,
+    })
+    
+    calibrator = ConformalCalibrator()
+    split = int(n * 0.75)
+    
+    start = time.perf_counter()
+    calibrator.update_many(residuals.iloc[:split])
+    elapsed = time.perf_counter() - start
+    print(f"✅ {split} erreurs intégrées en {elapsed * 1000:.0f} ms ({elapsed / split * 1e6:.1f} µs/erreur)")
+    print(calibrator.summary())
+    
+    # Couverture hors échantillon: calibré vs ±8 fixe
+    test = residuals.iloc[split:]
+    predictions = np.zeros(len(test))
+    
+    start = time.perf_counter()
+    lower, upper = calibrator.interval(predictions, test['lead_time_hours'], test['target_timestamp'].dt.hour)
+    elapsed = time.perf_counter() - start
+    
+    actual = test['residual'].to_numpy()
+    covered = ((actual >= lower) & (actual <= upper)).mean()
+    fixed = (np.abs(actual) <= DEFAULT_INTERVAL).mean()
+    print(f"\n📊 Couverture: calibrée {covered:.1%} (visée {COVERAGE:.0%}), ±{DEFAULT_INTERVAL:.0f} fixe {fixed:.1%}")
+    print(f"⚡ {len(test)} intervalles en {elapsed * 1000:.2f} ms")
@@ -0,0 +1,320 @@
+"""
+Recherche d'hyperparamètres XGBoost
+- Validation croisée temporelle (TimeSeriesSplit: on ne prédit jamais le passé)
+- Essais en parallèle dans un pool de process, budget en temps réel
+  (vérifié à chaque itération de boosting: un essai qui le dépasse est abandonné)
+- Successive halving: beaucoup de configs avec peu d'arbres, puis
+  seules les meilleures reçoivent plus d'arbres
+- Early stopping dans chaque fold, sur la fin de la partie entraînement
+  (jamais sur les heures scorées: RMSE CV non biaisé par l'arrêt)
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import TimeSeriesSplit
+
+
+# Espace de recherche (paramètres du constructeur XGBoostPricePredictor)
+SEARCH_SPACE = {
+    'max_depth': ('int', 3, 10),
+    'learning_rate': ('log', 0.01, 0.3),
+    'subsample': ('float', 0.6, 1.0),
+    'colsample_bytree': ('float', 0.6, 1.0),
+}
+
+# Part finale (chronologique) de l'entraînement de chaque fold réservée à l'early stopping
+EARLY_STOPPING_FRACTION = 0.15
+
+# Configuration actuelle du constructeur: toujours évaluée comme référence
+DEFAULT_PARAMS = {'max_depth': 7, 'learning_rate': 0.1, 'subsample': 0.8, 'colsample_bytree': 0.8}
+
+
+def sample_configs(n_configs, space=None, random_state=42):
+    """
+    Tire des configurations au hasard dans l'espace de recherche
+    
+    Returns:
+        Liste de dicts (la première = DEFAULT_PARAMS)
+    """
+    space = space or SEARCH_SPACE
+    rng = np.random.default_rng(random_state)
+    
+    configs = [dict(DEFAULT_PARAMS)]
+    while len(configs) < n_configs:
+        config = {}
+        for name, (kind, low, high) in space.items():
+            if kind == 'int':
+                config[name] = int(rng.integers(low, high + 1))
+            elif kind == 'log':
+                config[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+            else:
+                config[name] = float(rng.uniform(low, high))
+        configs.append(config)
+    
+    return configs
+
+
+# ===== CÔTÉ WORKER =====
+
+# Données chargées une fois par process (initializer), pas à chaque essai
+_worker_data = {}
+
+
+def _init_worker(X, y, folds, n_threads):
+    _worker_data.update(X=X, y=y, folds=folds, n_threads=n_threads)
+
+
+def _deadline_callback(deadline):
+    """Callback XGBoost qui arrête l'entraînement une fois l'heure limite passée"""
+    import xgboost as xgb
+    
+    class DeadlineCallback(xgb.callback.TrainingCallback):
+        def after_iteration(self, model, epoch, evals_log):
+            return time.time() > deadline
+    
+    return DeadlineCallback()
+
+
+def _evaluate(config, n_estimators, early_stopping_rounds, deadline, random_state):
+    """
+    Évalue une configuration sur tous les folds
+    
+    Le budget est vérifié après chaque arbre: un fold interrompu par l'heure limite
+    invalide l'essai (score sur un modèle tronqué, pas comparable).
+    
+    Returns:
+        Dict résultat (rmse moyen, meilleures itérations, durée) ou None si budget dépassé
+    """
+    import xgboost as xgb
+    
+    X, y = _worker_data['X'], _worker_data['y']
+    start = time.perf_counter()
+    scores, iterations = [], []
+    
+    for fit_idx, stop_idx, val_idx in _worker_data['folds']:
+        if time.time() > deadline:
+            return None
+        
+        model = xgb.XGBRegressor(
+            n_estimators=n_estimators,
+            objective='reg:squarederror',
+            tree_method='hist',
+            early_stopping_rounds=early_stopping_rounds,
+            n_jobs=_worker_data['n_threads'],
+            random_state=random_state,
+            verbosity=0,
+            callbacks=[_deadline_callback(deadline)],
+            **config
+        )
+        # Arrêt choisi sur stop_idx, score sur val_idx (fold jamais vu)
+        model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[stop_idx], y[stop_idx])], verbose=False)
+        if time.time() > deadline:
+            return None
+        
+        y_pred = model.predict(X[val_idx])
+        scores.append(float(np.sqrt(np.mean((y[val_idx] - y_pred) ** 2))))
+        iterations.append(int(model.best_iteration) + 1)
+    
+    return {
+        'rmse': float(np.mean(scores)),
+        'rmse_std': float(np.std(scores)),
+        'best_iterations': iterations,
+        'fit_seconds': time.perf_counter() - start,
+    }
+
+
+# ===== RECHERCHE =====
+
+def _split_early_stopping(train_idx, fraction=EARLY_STOPPING_FRACTION):
+    """(lignes d'ajustement, lignes d'early stopping): les plus récentes réservées à l'arrêt"""
+    n_stop = max(1, int(len(train_idx) * fraction))
+    return train_idx[:-n_stop], train_idx[-n_stop:]
+
+
+def search_xgboost_params(X, y, n_configs=27, n_splits=4, time_budget=600,
+                          min_estimators=50, max_estimators=1000, eta=3,
+                          early_stopping_rounds=30, max_workers=None, random_state=42):
+    """
+    Recherche des meilleurs hyperparamètres XGBoost
+    
+    Args:
+        X: Features (DataFrame ou array), ordre chronologique
+        y: Cible
+        n_configs: Configurations tirées au départ
+        n_splits: Folds TimeSeriesSplit
+        time_budget: Budget total (secondes, temps réel). Appliqué pendant les fits
+            (arrêt au plus un arbre après l'heure limite), pas seulement entre les tours
+        min_estimators: Arbres au premier tour
+        max_estimators: Arbres max au dernier tour
+        eta: Facteur de halving (on garde 1/eta des configs, × eta arbres)
+        early_stopping_rounds: Early stopping dans chaque fold (sur EARLY_STOPPING_FRACTION de l'entraînement)
+        max_workers: Process en parallèle (défaut: nombre de cœurs)
+        random_state: Seed
+    
+    Returns:
+        Dict avec best_params (utilisables par XGBoostPricePredictor), best_rmse,
+        default_rmse, trials (DataFrame), timing
+    """
+    start = time.time()
+    deadline = start + time_budget
+    
+    feature_names = list(X.columns) if hasattr(X, 'columns') else None
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    y = np.asarray(y, dtype=np.float64)
+    
+    folds = [_split_early_stopping(train_idx) + (val_idx,)
+             for train_idx, val_idx in TimeSeriesSplit(n_splits=n_splits).split(X)]
+    configs = sample_configs(n_configs, random_state=random_state)
+    
+    # Un thread XGBoost par process: plus efficace que N threads sur un petit dataset
+    max_workers = max_workers or os.cpu_count() or 1
+    n_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    
+    # Tours de successive halving
+    n_rungs = max(1, int(math.floor(math.log(max_estimators / min_estimators, eta))) + 1)
+    rungs = [min(max_estimators, int(min_estimators * eta ** r)) for r in range(n_rungs)]
+    
+    print(f"🔍 Recherche XGBoost: {len(configs)} configs, {n_splits} folds, "
+          f"tours {rungs} arbres, {max_workers} process, budget {time_budget}s")
+    
+    trials = []
+    survivors = list(range(len(configs)))
+    previous, previous_estimators = {}, 0
+    cancelled = 0
+    
+    # spawn: pas de fork d'un process qui a déjà initialisé OpenMP
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                             initializer=_init_worker, initargs=(X, y, folds, n_threads)) as executor:
+        for rung, n_estimators in enumerate(rungs):
+            if time.time() > deadline:
+                break
+            
+            # Early stopping déclenché dans tous les folds au tour précédent:
+            # plus d'arbres ne changerait rien, résultat réutilisé
+            results = {
+                i: previous[i] for i in survivors
+                if i in previous and max(previous[i]['best_iterations']) + early_stopping_rounds <= previous_estimators
+            }
+            reused = set(results)
+            futures = {
+                executor.submit(_evaluate, configs[i], n_estimators, early_stopping_rounds, deadline, random_state): i
+                for i in survivors if i not in results
+            }
+            
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.time()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result is not None:
+                        results[futures[future]] = result
+                if time.time() > deadline:
+                    cancelled += sum(f.cancel() for f in pending)
+                    break
+            
+            for i, result in results.items():
+                trials.append({
+                    'config_id': i,
+                    'rung': rung,
+                    'n_estimators': n_estimators,
+                    **configs[i],
+                    'rmse': result['rmse'],
+                    'rmse_std': result['rmse_std'],
+                    'best_iteration': int(np.median(result['best_iterations'])),
+                    # Résultat repris du tour précédent: aucun fit, temps déjà compté
+                    'reused': i in reused,
+                    'fit_seconds': 0.0 if i in reused else result['fit_seconds'],
+                })
+            
+            print(f"   Tour {rung + 1}/{len(rungs)} ({n_estimators} arbres): "
+                  f"{len(results)}/{len(survivors)} essais ({len(reused)} repris), {time.time() - start:.0f}s")
+            
+            if not results:
+                break
+            
+            # Garder le meilleur 1/eta pour le tour suivant
+            ranked = sorted(results, key=lambda i: results[i]['rmse'])
+            survivors = ranked[:max(1, len(ranked) // eta)]
+            previous, previous_estimators = results, n_estimators
+        
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    if not trials:
+        print("❌ Aucun essai terminé dans le budget")
+        return {'best_params': None, 'trials': pd.DataFrame(), 'timing': {'total_seconds': time.time() - start}}
+    
+    trials = pd.DataFrame(trials)
+    
+    # Meilleur essai du tour le plus avancé (plus d'arbres = estimation plus fiable)
+    last_rung = trials[trials['rung'] == trials['rung'].max()]
+    best = last_rung.loc[last_rung['rmse'].idxmin()]
+    
+    best_params = {name: float(best[name]) for name in SEARCH_SPACE}
+    best_params['max_depth'] = int(best_params['max_depth'])
+    best_params['n_estimators'] = int(best['best_iteration'])
+    
+    default_trials = trials[(trials['config_id'] == 0) & (trials['rung'] == best['rung'])]
+    default_rmse = float(default_trials['rmse'].iloc[0]) if len(default_trials) else None
+    
+    total_seconds = time.time() - start
+    timing = {
+        'total_seconds': total_seconds,
+        'trials_completed': len(trials),
+        'trials_fitted': int((~trials['reused']).sum()),
+        'trials_cancelled': cancelled,
+        'fit_seconds': float(trials['fit_seconds'].sum()),
+        'workers': max_workers,
+        # Temps de fit cumulé / (temps réel × process): taux d'occupation du pool
+        # (chaque fit compté une fois, les essais repris valent 0)
+        'pool_utilization': float(trials['fit_seconds'].sum() / (total_seconds * max_workers)),
+    }
+    
+    print(f"✅ Meilleure config: {best_params} → RMSE CV {best['rmse']:.2f} €/MWh"
+          + (f" (défaut: {default_rmse:.2f})" if default_rmse is not None else ""))
+    print(f"   {len(trials)} essais en {total_seconds:.0f}s, occupation pool {timing['pool_utilization']:.0%}")
+    
+    return {
+        'best_params': best_params,
+        'best_rmse': float(best['rmse']),
+        'default_rmse': default_rmse,
+        'feature_names': feature_names,
+        'trials': trials,
+        'timing': timing,
+    }
+
+
+if __name__ == "__main__":
+    from src.models.xgboost_model import XGBoostPricePredictor
+    
+    print("🧪 Test recherche hyperparamètres")
+    
+    rng = np.random.default_rng(42)
+    n_samples = 5000
+    df_test = pd.DataFrame({
+        'temperature_c': rng.normal(15, 5, n_samples),
+        'wind_speed_kmh': rng.normal(20, 10, n_samples),
+        'demand_gw': rng.normal(50, 10, n_samples),
+        'nuclear_production_gw': rng.normal(40, 5, n_samples),
+        'hour': rng.integers(0, 24, n_samples),
+    })
+    df_test['price_eur_mwh'] = (
+        50 + df_test['demand_gw'] * 0.5 - df_test['nuclear_production_gw'] * 0.3
+        + 10 * np.sin(df_test['hour'] / 24 * 2 * np.pi) + rng.normal(0, 5, n_samples)
+    )
+    
+    X = df_test.drop(columns='price_eur_mwh')
+    y = df_test['price_eur_mwh']
+    
+    result = search_xgboost_params(X, y, n_configs=9, time_budget=120, max_estimators=450)
+    print(result['trials'].sort_values(['rung', 'rmse']).tail(5))
+    
+    model = XGBoostPricePredictor(**result['best_params'])
+    split = int(len(X) * 0.8)
+    model.train(X[:split], y[:split], X[split:], y[split:])
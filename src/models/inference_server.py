@@ -0,0 +1,601 @@
+"""
+Serveur de prédiction local (HTTP sur 127.0.0.1)
+Garde les modèles du registre chargés et regroupe les requêtes
+concurrentes en micro-lots: un seul predict() pour plusieurs appelants.
+Partagé par tous les process du dashboard et les jobs batch.
+
+Routes:
+    GET  /health                 état du serveur
+    GET  /metrics                latences, profondeur de file, taille des lots
+    GET  /models/<nom>?version=  métadonnées (features, importances...)
+    POST /predict                {"model", "version", "columns", "rows"}
+
+Usage:
+    python -m src.models.inference_server --port 8765
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from src.models.registry import REGISTRY_DIR, ModelRegistry
+
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8765
+SERVER_LOG_PATH = os.path.join(REGISTRY_DIR, 'inference_server.log')
+
+# Micro-lots: attente max après la première requête, lignes max par predict()
+MAX_WAIT_MS = 2
+MAX_BATCH_ROWS = 8192
+
+# Au-delà de N lignes, prédiction locale sur le modèle memory-mappé: le coût
+# JSON (float64 → texte → float64) dépasse celui du predict() lui-même
+LOCAL_PREDICT_ROWS = 2048
+
+# Version courante relue au plus toutes les N secondes (hot-swap après promotion)
+VERSION_REFRESH_SECONDS = 5
+
+# Version non courante sans requête depuis N secondes: déchargée
+STALE_BATCHER_SECONDS = 300
+
+# Requêtes récentes gardées pour les percentiles de latence
+LATENCY_WINDOW = 2000
+
+
+def server_url(host=SERVER_HOST, port=SERVER_PORT):
+    return f'http://{host}:{port}'
+
+
+# ===== MÉTRIQUES =====
+
+class ServerMetrics:
+    """Compteurs et latences récentes (thread-safe)"""
+    
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self._latency_ms = deque(maxlen=window)
+        self._queue_ms = deque(maxlen=window)
+        self._predict_ms = deque(maxlen=window)
+        self._batch_requests = deque(maxlen=window)
+    
+    def record_batch(self, n_requests, n_rows, predict_ms, queue_ms):
+        with self._lock:
+            self.batches += 1
+            self.requests += n_requests
+            self.rows += n_rows
+            self._predict_ms.append(predict_ms)
+            self._batch_requests.append(n_requests)
+            self._queue_ms.extend(queue_ms)
+    
+    def record_request(self, latency_ms, error=False):
+        with self._lock:
+            self._latency_ms.append(latency_ms)
+            self.errors += int(error)
+    
+    def record_queue_depth(self, depth):
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+    
+    def snapshot(self, queue_depth=0):
+        """
+        Returns:
+            Dict: compteurs, percentiles de latence (ms), profondeur de file
+        """
+        def percentiles(values):
+            if not values:
+                return None
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+        
+        with self._lock:
+            return {
+                'uptime_seconds': time.time() - self.started_at,
+                'requests': self.requests,
+                'errors': self.errors,
+                'rows': self.rows,
+                'batches': self.batches,
+                'mean_requests_per_batch': float(np.mean(self._batch_requests)) if self._batch_requests else None,
+                'queue_depth': queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'latency_ms': percentiles(list(self._latency_ms)),
+                'queue_wait_ms': percentiles(list(self._queue_ms)),
+                'predict_ms': percentiles(list(self._predict_ms)),
+            }
+
+
+# ===== MICRO-LOTS =====
+
+class _Request:
+    __slots__ = ('X', 'enqueued_at', 'done', 'result', 'error')
+    
+    def __init__(self, X):
+        self.X = X
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """File d'un modèle: les requêtes en attente partent en un seul predict()"""
+    
+    def __init__(self, model, metrics, max_wait_ms=MAX_WAIT_MS, max_batch_rows=MAX_BATCH_ROWS):
+        """
+        Args:
+            model: Modèle chargé (LazyModel du registre)
+            metrics: ServerMetrics partagé
+            max_wait_ms: Attente max d'autres requêtes après la première
+            max_batch_rows: Lignes max par predict()
+        """
+        self.model = model
+        self.metrics = metrics
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_rows = max_batch_rows
+        self._queue = queue.Queue()
+        self._closed = False
+        self._stopping = False
+        self._state_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+    
+    def submit(self, X):
+        """Prédiction de X (bloquant jusqu'au traitement du lot qui le contient)"""
+        request = _Request(X)
+        with self._state_lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put(request)
+        
+        # File fermée (version déchargée entre-temps): prédiction directe
+        if closed:
+            return np.asarray(self.model.predict(X), dtype=np.float64)
+        
+        self.metrics.record_queue_depth(self._queue.qsize())
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+    
+    def close(self):
+        """Arrête le thread après les requêtes déjà en file"""
+        with self._state_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+    
+    def _collect(self):
+        request = self._queue.get()
+        if request is None:
+            self._stopping = True
+            return [], 0
+        
+        batch = [request]
+        n_rows = len(request.X)
+        deadline = time.perf_counter() + self.max_wait
+        
+        while n_rows < self.max_batch_rows:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self._stopping = True
+                break
+            batch.append(request)
+            n_rows += len(request.X)
+        
+        return batch, n_rows
+    
+    def _run(self):
+        while not self._stopping:
+            batch, n_rows = self._collect()
+            if not batch:
+                break
+            started = time.perf_counter()
+            
+            try:
+                X = batch[0].X if len(batch) == 1 else np.concatenate([r.X for r in batch])
+                predictions = np.asarray(self.model.predict(X), dtype=np.float64)
+                
+                offset = 0
+                for request in batch:
+                    request.result = predictions[offset:offset + len(request.X)]
+                    offset += len(request.X)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            
+            predict_ms = (time.perf_counter() - started) * 1000
+            self.metrics.record_batch(
+                len(batch), n_rows, predict_ms,
+                [(started - r.enqueued_at) * 1000 for r in batch]
+            )
+            
+            for request in batch:
+                request.done.set()
+
+
+# ===== SERVICE =====
+
+class InferenceService:
+    """
+    Modèles chauds (un MicroBatcher par version) + résolution de la version courante
+    
+    Les versions qui ne sont plus courantes restent servies tant qu'un client les
+    demande, puis sont déchargées après STALE_BATCHER_SECONDS sans requête.
+    """
+    
+    def __init__(self, registry=None, max_wait_ms=MAX_WAIT_MS, max_batch_rows=MAX_BATCH_ROWS):
+        self.registry = registry or ModelRegistry()
+        self.metrics = ServerMetrics()
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_rows = max_batch_rows
+        self._batchers = {}
+        self._last_used = {}
+        self._current = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.time()
+    
+    def resolve(self, name, version=None):
+        """Version demandée, ou version courante (relue toutes les VERSION_REFRESH_SECONDS)"""
+        if version:
+            return version
+        
+        cached = self._current.get(name)
+        if cached is None or time.time() - cached[1] > VERSION_REFRESH_SECONDS:
+            current = self.registry.current_version(name)
+            if current is None:
+                raise KeyError(f"Aucune version enregistrée pour {name}")
+            self._current[name] = cached = (current, time.time())
+        
+        return cached[0]
+    
+    def batcher(self, name, version=None):
+        version = self.resolve(name, version)
+        key = (name, version)
+        
+        with self._lock:
+            if key not in self._batchers:
+                model = self.registry.load(name, version)
+                model.warm()
+                self._batchers[key] = MicroBatcher(model, self.metrics, self.max_wait_ms, self.max_batch_rows)
+                print(f"🔥 {name}:{version} chargé")
+            self._last_used[key] = time.time()
+            
+            if time.time() - self._last_eviction > VERSION_REFRESH_SECONDS:
+                self._evict_stale()
+            
+            return self._batchers[key]
+    
+    def _evict_stale(self):
+        """Décharge les versions non courantes inutilisées (appelé sous self._lock)"""
+        now = time.time()
+        self._last_eviction = now
+        
+        for name, version in list(self._batchers):
+            if now - self._last_used[(name, version)] < STALE_BATCHER_SECONDS:
+                continue
+            try:
+                if version == self.resolve(name):
+                    continue
+            except KeyError:
+                pass
+            
+            self._batchers.pop((name, version)).close()
+            del self._last_used[(name, version)]
+            self.registry.unload(name, version)
+            print(f"🧊 {name}:{version} déchargé (plus courant)")
+    
+    def predict(self, name, rows, columns=None, version=None):
+        """
+        Args:
+            name: Nom du modèle au registre
+            rows: Lignes de features (liste de listes ou array)
+            columns: Noms des colonnes de rows (défaut: ordre des features du modèle)
+            version: Version (défaut: courante)
+        
+        Returns:
+            (predictions, tag de la version utilisée)
+        """
+        batcher = self.batcher(name, version)
+        features = batcher.model.features
+        
+        X = np.asarray(rows, dtype=np.float64).reshape(-1, len(columns or features))
+        if columns is not None and list(columns) != list(features):
+            missing = [f for f in features if f not in columns]
+            if missing:
+                raise ValueError(f"Features manquantes: {missing}")
+            X = X[:, [list(columns).index(f) for f in features]]
+        
+        return batcher.submit(X), f'{name}:{batcher.model.version}'
+    
+    def model_info(self, name, version=None):
+        model = self.batcher(name, version).model
+        importances = getattr(model.model, 'feature_importances_', None)
+        return {
+            **model.metadata,
+            'feature_importances': None if importances is None else np.asarray(importances).tolist(),
+        }
+    
+    def snapshot(self):
+        with self._lock:
+            depth = sum(b.queue_depth for b in self._batchers.values())
+            loaded = [f'{n}:{v}' for n, v in self._batchers]
+        return {**self.metrics.snapshot(queue_depth=depth), 'loaded_models': loaded}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive: une connexion par client, pas de handshake TCP par requête
+    protocol_version = 'HTTP/1.1'
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self.server.service
+        
+        if url.path == '/health':
+            return self._reply(200, {'status': 'ok', 'pid': os.getpid()})
+        if url.path == '/metrics':
+            return self._reply(200, service.snapshot())
+        if url.path.startswith('/models/'):
+            version = parse_qs(url.query).get('version', [None])[0]
+            try:
+                return self._reply(200, service.model_info(url.path[len('/models/'):], version))
+            except (KeyError, ValueError) as e:
+                return self._reply(404, {'error': e.args[0] if e.args else str(e)})
+        
+        self._reply(404, {'error': f'Route inconnue: {url.path}'})
+    
+    def do_POST(self):
+        if urlparse(self.path).path != '/predict':
+            return self._reply(404, {'error': f'Route inconnue: {self.path}'})
+        
+        start = time.perf_counter()
+        service = self.server.service
+        error = False
+        
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            predictions, tag = service.predict(
+                body['model'], body['rows'], columns=body.get('columns'), version=body.get('version')
+            )
+            self._reply(200, {'predictions': predictions.tolist(), 'version': tag})
+        except (KeyError, ValueError) as e:
+            error = True
+            self._reply(400, {'error': e.args[0] if e.args else str(e)})
+        except Exception as e:
+            error = True
+            self._reply(500, {'error': str(e)})
+        finally:
+            service.metrics.record_request((time.perf_counter() - start) * 1000, error=error)
+    
+    def _reply(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass  # Une ligne par requête: trop verbeux
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, registry=None, max_wait_ms=MAX_WAIT_MS):
+    """Lance le serveur (bloquant)"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = InferenceService(registry, max_wait_ms=max_wait_ms)
+    
+    print(f"🚀 Serveur de prédiction sur {server_url(host, port)} (PID {os.getpid()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+# ===== CÔTÉ CLIENT =====
+
+def server_alive(url=None, timeout=0.5):
+    """True si un serveur répond sur url"""
+    import requests
+    
+    try:
+        return requests.get(f'{url or server_url()}/health', timeout=timeout).ok
+    except requests.RequestException:
+        return False
+
+
+def ensure_inference_server(port=SERVER_PORT):
+    """
+    Lance le serveur en arrière-plan s'il ne répond pas déjà
+    
+    Returns:
+        PID du serveur lancé, ou None s'il tournait déjà
+    """
+    if server_alive(server_url(port=port)):
+        return None
+    
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    
+    with open(SERVER_LOG_PATH, 'a') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'src.models.inference_server', '--port', str(port)],
+            cwd=project_root,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True  # Survit aux redémarrages du dashboard
+        )
+    
+    print(f"🚀 Serveur de prédiction lancé (PID {process.pid})")
+    return process.pid
+
+
+class RemoteModel:
+    """
+    Modèle servi par le serveur local, même interface que LazyModel
+    (predict, features, version, metadata, feature_importances_).
+    Serveur injoignable → repli sur le modèle du registre chargé dans ce process.
+    """
+    
+    def __init__(self, name, version=None, url=None, timeout=30, registry=None, max_batch_rows=MAX_BATCH_ROWS,
+                 local_rows=LOCAL_PREDICT_ROWS):
+        """
+        Args:
+            name: Nom du modèle au registre
+            version: Version (défaut: courante côté serveur)
+            url: URL du serveur (défaut: server_url())
+            timeout: Timeout HTTP (secondes)
+            registry: ModelRegistry du repli local
+            max_batch_rows: Lignes max par requête (un gros X part en plusieurs requêtes)
+            local_rows: Taille de X au-delà de laquelle on prédit en local (même version)
+        """
+        self.name = name
+        self.url = url or server_url()
+        self.timeout = timeout
+        self.max_batch_rows = max_batch_rows
+        self.local_rows = local_rows
+        self.registry = registry
+        self._version = version
+        self._info = None
+        self._local = None
+        self._sessions = threading.local()
+    
+    # ===== INTERFACE LazyModel =====
+    
+    @property
+    def metadata(self):
+        if self._info is None:
+            query = f'?version={self._version}' if self._version else ''
+            self._info = self._call('get', f'/models/{self.name}{query}')
+            if self._info is None:
+                self._info = dict(self._fallback().metadata)
+        return self._info
+    
+    @property
+    def version(self):
+        return self.metadata['version']
+    
+    @property
+    def features(self):
+        return self.metadata['features']
+    
+    @property
+    def feature_importances_(self):
+        importances = self.metadata.get('feature_importances')
+        if importances is None:
+            return self._fallback().feature_importances_
+        return np.asarray(importances)
+    
+    def warm(self):
+        """Modèle chargé côté serveur (ou en local si repli)"""
+        self.metadata
+        return self
+    
+    def predict(self, X):
+        """
+        Prédiction via le serveur (micro-lot partagé avec les autres clients)
+        
+        Les gros X (what-if, backtests) sont prédits en local sur la même version
+        du registre (arbres memory-mappés, partagés entre process par le page cache):
+        pas de sérialisation JSON ligne à ligne. Les autres sont découpés en requêtes
+        de max_batch_rows lignes.
+        """
+        if len(X) > self.local_rows:
+            self.metadata  # Version résolue côté serveur avant le chargement local
+            return self._fallback().predict(X)
+        
+        if hasattr(X, 'columns'):
+            rows = X[self.features].to_numpy(dtype=np.float64)
+        else:
+            rows = np.asarray(X, dtype=np.float64)
+        
+        predictions = []
+        for start in range(0, len(rows), self.max_batch_rows):
+            result = self._call('post', '/predict', json={
+                'model': self.name,
+                'version': self.version,
+                'columns': self.features,
+                'rows': rows[start:start + self.max_batch_rows].tolist(),
+            })
+            if result is None:
+                return self._fallback().predict(X)
+            predictions.append(np.asarray(result['predictions'], dtype=np.float64))
+        
+        return np.concatenate(predictions) if predictions else np.empty(0)
+    
+    # ===== INTERNE =====
+    
+    def _session(self):
+        import requests
+        
+        # Une session (connexion keep-alive) par thread
+        if not hasattr(self._sessions, 'session'):
+            self._sessions.session = requests.Session()
+        return self._sessions.session
+    
+    def _call(self, method, path, **kwargs):
+        """Réponse JSON, ou None si le serveur est injoignable"""
+        import requests
+        
+        try:
+            response = getattr(self._session(), method)(f'{self.url}{path}', timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            print(f"⚠️ Serveur de prédiction injoignable ({e}), modèle local")
+            return None
+        
+        if not response.ok:
+            raise ValueError(f"Serveur de prédiction: {response.json().get('error', response.status_code)}")
+        return response.json()
+    
+    def _fallback(self):
+        if self._local is None:
+            self._local = (self.registry or ModelRegistry()).load(self.name, self._version or (self._info or {}).get('version'))
+        return self._local
+
+
+def connect_model(name, version=None, url=None, registry=None):
+    """
+    Modèle du registre: servi par le serveur local s'il répond, sinon chargé ici
+    
+    Returns:
+        RemoteModel ou LazyModel (même interface)
+    """
+    if server_alive(url):
+        return RemoteModel(name, version, url=url, registry=registry)
+    return (registry or ModelRegistry()).load(name, version)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serveur de prédiction local MétéoTrader")
+    parser.add_argument('--host', default=SERVER_HOST, help="Adresse d'écoute (localhost par défaut)")
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help="Port")
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS, help="Attente max d'un micro-lot")
+    parser.add_argument('--registry', default=REGISTRY_DIR, help="Dossier du registre")
+    args = parser.parse_args()
+    
+    serve(args.host, args.port, ModelRegistry(args.registry), max_wait_ms=args.max_wait_ms)
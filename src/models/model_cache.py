@@ -0,0 +1,154 @@
+"""
+Cache disque des modèles entraînés
+Clé = empreinte (features, données d'entraînement, hyperparamètres):
+un modèle n'est réentraîné que si l'une des trois change
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from src.features.pipeline import frame_hash
+
+
+MODEL_CACHE_DIR = 'data/cache/models'
+MAX_CACHED_MODELS = 10
+
+
+def training_fingerprint(feature_columns, X, y, estimator, params):
+    """
+    Empreinte d'un entraînement
+    
+    Args:
+        feature_columns: Liste ordonnée des features
+        X: Features d'entraînement (DataFrame)
+        y: Cible d'entraînement (Series)
+        estimator: Classe du modèle (ex: RandomForestRegressor)
+        params: Hyperparamètres
+    
+    Returns:
+        String hexadécimale (16 caractères)
+    """
+    digest = hashlib.sha1()
+    digest.update(f'{estimator.__module__}.{estimator.__name__}'.encode())
+    digest.update(repr(list(feature_columns)).encode())
+    digest.update(repr(sorted(params.items())).encode())
+    digest.update(frame_hash(X).encode())
+    digest.update(frame_hash(pd.DataFrame({'y': y})).encode())
+    return digest.hexdigest()[:16]
+
+
+class ModelCache:
+    """Modèles picklés sur disque, indexés par empreinte d'entraînement"""
+    
+    def __init__(self, cache_dir=MODEL_CACHE_DIR, max_models=MAX_CACHED_MODELS):
+        """
+        Args:
+            cache_dir: Dossier du cache
+            max_models: Nombre de modèles conservés (les plus anciens sont supprimés)
+        """
+        self.cache_dir = cache_dir
+        self.max_models = max_models
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def get_or_train(self, fingerprint, train_fn):
+        """
+        Charge le modèle de cette empreinte, ou l'entraîne et le stocke
+        
+        Args:
+            fingerprint: Empreinte (training_fingerprint)
+            train_fn: Fonction sans argument qui retourne le modèle entraîné
+        
+        Returns:
+            (model, report): report = dict avec source ('cache' ou 'entraînement'),
+            load_seconds, train_seconds, fingerprint, trained_at
+        """
+        model, meta, load_seconds = self.load(fingerprint)
+        
+        if model is not None:
+            print(f"✅ Modèle {fingerprint} chargé depuis le cache en {load_seconds * 1000:.0f} ms")
+            return model, {
+                'source': 'cache',
+                'fingerprint': fingerprint,
+                'load_seconds': load_seconds,
+                'train_seconds': meta.get('train_seconds'),
+                'trained_at': meta.get('trained_at'),
+            }
+        
+        start = time.perf_counter()
+        model = train_fn()
+        train_seconds = time.perf_counter() - start
+        
+        trained_at = datetime.now().isoformat(timespec='seconds')
+        self.store(fingerprint, model, {'train_seconds': train_seconds, 'trained_at': trained_at})
+        print(f"✅ Modèle {fingerprint} entraîné en {train_seconds:.1f} s et mis en cache")
+        
+        return model, {
+            'source': 'entraînement',
+            'fingerprint': fingerprint,
+            'load_seconds': None,
+            'train_seconds': train_seconds,
+            'trained_at': trained_at,
+        }
+    
+    def load(self, fingerprint):
+        """
+        Returns:
+            (model, meta, load_seconds) ou (None, None, None) si absent/illisible
+        """
+        path = self._path(fingerprint, 'pkl')
+        if not os.path.exists(path):
+            return None, None, None
+        
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+        except Exception as e:
+            print(f"⚠️ Modèle en cache illisible ({path}): {e}")
+            return None, None, None
+        load_seconds = time.perf_counter() - start
+        
+        meta = {}
+        meta_path = self._path(fingerprint, 'json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        
+        # Dernière utilisation → protégé du nettoyage
+        os.utime(path)
+        
+        return model, meta, load_seconds
+    
+    def store(self, fingerprint, model, meta):
+        """Écrit modèle + métadonnées (écriture atomique), puis nettoie les plus anciens"""
+        for ext, write in (('pkl', lambda f: pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)),
+                           ('json', lambda f: f.write(json.dumps(meta, indent=2).encode()))):
+            path = self._path(fingerprint, ext)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        
+        self._prune()
+    
+    def _path(self, fingerprint, ext):
+        return os.path.join(self.cache_dir, f'{fingerprint}.{ext}')
+    
+    def _prune(self):
+        models = sorted(
+            (os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.pkl')),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        for path in models[self.max_models:]:
+            for old in (path, path[:-4] + '.json'):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
@@ -0,0 +1,355 @@
+"""
+Entraînement multi-marchés: un modèle de prix par zone
+- Panel stocké (prix ENTSO-E par zone + archive météo de la zone)
+  empilé en une seule matrice de features; prix simulés exclus
+- Matrice en mémoire partagée: les process du pool lisent leur bloc de
+  lignes sans copie ni pickling des données
+- Un process par zone (borné par le nombre de cœurs), publication directe
+  au registre (un nom de modèle par zone)
+
+Usage:
+    python -m src.models.multi_market --zones FR DE ES IT GB --days 365
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.features.pipeline import build_features, feature_matrix
+from src.models.model_cache import training_fingerprint
+from src.models.registry import REGISTRY_DIR, ModelRegistry
+from src.models.training import RF_PARAMS, TRAIN_FRACTION
+
+
+# Features disponibles pour toute zone (météo archivée + calendrier):
+# pas de production/consommation RTE hors France
+ZONE_FEATURES = [
+    'temperature_c', 'wind_speed_kmh', 'solar_radiation_wm2',
+    'hour', 'day_of_week', 'month', 'is_weekend', 'is_peak_hour', 'temp_extreme'
+]
+
+# Moins d'heures: modèle non entraîné pour la zone
+MIN_ZONE_HOURS = 24 * 14
+
+# Origine des prix d'entraînement, inscrite dans les métadonnées du registre:
+# les versions sans cette marque (antérieures, prix simulés possibles) ne sont pas servies
+PRICE_SOURCE = 'entsoe'
+
+
+def zone_model_name(zone):
+    """Nom du modèle d'une zone au registre (ex: 'rf_de')"""
+    return f'rf_{zone.lower()}'
+
+
+def build_zone_panel(prices, archive=None):
+    """
+    Panel long prix + météo, une ligne par (zone, heure)
+    
+    Les zones aux prix simulés (attrs['synthetic_prices'], cf.
+    fetch_europe.generate_fallback_prices) sont ignorées.
+    
+    Args:
+        prices: Dict {zone: DataFrame timestamp, price_eur_mwh} (ex: fetch_european_prices)
+        archive: WeatherArchive (défaut: archive standard)
+    
+    Returns:
+        DataFrame avec: zone, timestamp, price_eur_mwh, variables météo
+    """
+    from src.data.weather_archive import WeatherArchive
+    
+    archive = archive or WeatherArchive()
+    frames = []
+    
+    for zone, df_prices in prices.items():
+        if df_prices is None or df_prices.empty:
+            continue
+        if df_prices.attrs.get('synthetic_prices'):
+            print(f"⚠️ {zone}: prix simulés (ENTSO-E indisponible), zone ignorée")
+            continue
+        
+        df_prices = df_prices[['timestamp', 'price_eur_mwh']].copy()
+        df_prices['timestamp'] = pd.to_datetime(df_prices['timestamp'])
+        
+        weather = archive.zone_frame(zone, df_prices['timestamp'].min(), df_prices['timestamp'].max())
+        if weather.empty:
+            print(f"⚠️ {zone}: pas de météo archivée, zone ignorée")
+            continue
+        
+        df = df_prices.merge(weather, on='timestamp', how='inner')
+        df.insert(0, 'zone', zone)
+        frames.append(df.sort_values('timestamp'))
+    
+    if not frames:
+        return pd.DataFrame()
+    
+    return pd.concat(frames, ignore_index=True)
+
+
+# ===== MÉMOIRE PARTAGÉE =====
+
+def _to_shared(array):
+    """Copie un array en mémoire partagée → (segment, spec pour les workers)"""
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+# ===== CÔTÉ WORKER =====
+
+# Segments attachés une fois par process (initializer)
+_worker_data = {}
+
+
+def _init_worker(X_spec, y_spec, feature_columns, registry_root, n_threads):
+    shm_X, X = _attach(X_spec)
+    shm_y, y = _attach(y_spec)
+    _worker_data.update(
+        segments=(shm_X, shm_y), X=X, y=y, feature_columns=feature_columns,
+        registry=ModelRegistry(registry_root), n_threads=n_threads
+    )
+
+
+def _train_zone(zone, start, stop, split, fingerprint, data_window):
+    """
+    Entraîne et publie le modèle d'une zone (lignes start:stop de la matrice partagée)
+    
+    Returns:
+        Dict résultat (métriques, durée, version)
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    
+    # Vues sur la mémoire partagée: aucune copie des données
+    X = _worker_data['X'][start:stop]
+    y = _worker_data['y'][start:stop]
+    
+    fit_start = time.perf_counter()
+    model = RandomForestRegressor(**RF_PARAMS, n_jobs=_worker_data['n_threads'])
+    model.fit(X[:split], y[:split])
+    fit_seconds = time.perf_counter() - fit_start
+    
+    y_pred = model.predict(X[split:])
+    metrics = {
+        'mae': float(np.mean(np.abs(y[split:] - y_pred))),
+        'rmse': float(np.sqrt(np.mean((y[split:] - y_pred) ** 2))),
+    }
+    
+    version = _worker_data['registry'].register(
+        zone_model_name(zone), model, _worker_data['feature_columns'],
+        metrics=metrics,
+        data_window=data_window,
+        params=RF_PARAMS,
+        fingerprint=fingerprint,
+        info={'zone': zone, 'train_seconds': fit_seconds, 'price_source': PRICE_SOURCE},
+        promote=True
+    )
+    
+    return {
+        'zone': zone,
+        'source': 'entraînement',
+        'version': version,
+        'fit_seconds': fit_seconds,
+        'pid': os.getpid(),
+        **metrics,
+    }
+
+
+# ===== ORCHESTRATION =====
+
+def _zone_blocks(panel, feature_columns):
+    """Matrice empilée (zones contiguës) + description des blocs de lignes"""
+    from sklearn.ensemble import RandomForestRegressor
+    
+    X_parts, y_parts, blocks = [], [], []
+    offset = 0
+    
+    for zone, df_zone in panel.groupby('zone', sort=False):
+        df_zone = build_features(df_zone.reset_index(drop=True), feature_columns)
+        df_zone = df_zone.dropna(subset=['price_eur_mwh'])
+        if len(df_zone) < MIN_ZONE_HOURS:
+            print(f"⚠️ {zone}: {len(df_zone)} heures, minimum {MIN_ZONE_HOURS}, zone ignorée")
+            continue
+        
+        X_zone = feature_matrix(df_zone, feature_columns)
+        y_zone = df_zone['price_eur_mwh']
+        split = int(len(X_zone) * TRAIN_FRACTION)
+        
+        X_parts.append(X_zone.to_numpy(dtype=np.float32))
+        y_parts.append(y_zone.to_numpy(dtype=np.float64))
+        blocks.append({
+            'zone': zone,
+            'start': offset,
+            'stop': offset + len(X_zone),
+            'split': split,
+            'n_rows': len(X_zone),
+            # Même empreinte que train_price_model: données + features + hyperparamètres
+            'fingerprint': training_fingerprint(
+                feature_columns, X_zone[:split], y_zone[:split], RandomForestRegressor, RF_PARAMS
+            ),
+            'data_window': (df_zone['timestamp'].iloc[0], df_zone['timestamp'].iloc[split - 1]),
+        })
+        offset += len(X_zone)
+    
+    if not blocks:
+        return None, None, []
+    
+    return np.concatenate(X_parts), np.concatenate(y_parts), blocks
+
+
+def train_zone_models(panel, feature_columns=None, max_workers=None, registry=None):
+    """
+    Entraîne un modèle par zone en parallèle et les publie au registre
+    
+    Les zones dont les données n'ont pas changé (même empreinte) ne sont
+    pas réentraînées: la version existante est reprise.
+    
+    Args:
+        panel: DataFrame long (build_zone_panel)
+        feature_columns: Features (défaut: ZONE_FEATURES)
+        max_workers: Process en parallèle (défaut: nombre de cœurs)
+        registry: ModelRegistry (défaut: registre standard)
+    
+    Returns:
+        Dict avec report (DataFrame par zone: n_rows, fit_seconds, mae, rmse,
+        version, source) et timing
+    """
+    start = time.time()
+    feature_columns = list(feature_columns or ZONE_FEATURES)
+    registry = registry or ModelRegistry()
+    
+    X, y, blocks = _zone_blocks(panel, feature_columns)
+    if not blocks:
+        print("❌ Aucune zone entraînable")
+        return {'report': pd.DataFrame(), 'timing': {'total_seconds': time.time() - start}}
+    
+    results = []
+    pending = []
+    for block in blocks:
+        version = registry.find_version(zone_model_name(block['zone']), block['fingerprint'])
+        meta = registry.metadata(zone_model_name(block['zone']), version) if version else None
+        if meta is None or meta.get('price_source') != PRICE_SOURCE:
+            pending.append(block)
+            continue
+        if registry.current_version(zone_model_name(block['zone'])) is None:
+            registry.promote(zone_model_name(block['zone']), version)
+        results.append({
+            'zone': block['zone'],
+            'source': 'registre',
+            'version': version,
+            'fit_seconds': meta.get('train_seconds'),
+            'pid': None,
+            **meta['metrics'],
+        })
+    
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(pending) or 1))
+    n_threads = max(1, (os.cpu_count() or 1) // max_workers)
+    
+    print(f"🌍 Entraînement multi-marchés: {len(pending)}/{len(blocks)} zones à entraîner, "
+          f"{len(X)} lignes × {len(feature_columns)} features, {max_workers} process")
+    
+    if pending:
+        shm_X, X_spec = _to_shared(X)
+        shm_y, y_spec = _to_shared(y)
+        try:
+            # spawn: pas de fork d'un process qui a déjà initialisé OpenMP
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(X_spec, y_spec, feature_columns, registry.root, n_threads)) as executor:
+                # Plus grosses zones d'abord: meilleur équilibrage entre process
+                futures = {
+                    executor.submit(_train_zone, b['zone'], b['start'], b['stop'], b['split'],
+                                    b['fingerprint'], b['data_window']): b['zone']
+                    for b in sorted(pending, key=lambda b: -b['n_rows'])
+                }
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"❌ {futures[future]}: {e}")
+                        continue
+                    results.append(result)
+                    print(f"   ✅ {result['zone']}: {result['fit_seconds']:.1f}s, RMSE {result['rmse']:.2f} €/MWh")
+        finally:
+            shm_X.close()
+            shm_X.unlink()
+            shm_y.close()
+            shm_y.unlink()
+    
+    n_rows = {b['zone']: b['n_rows'] for b in blocks}
+    report = pd.DataFrame(results)
+    report.insert(1, 'n_rows', report['zone'].map(n_rows))
+    report = report.sort_values('zone').reset_index(drop=True)
+    
+    total_seconds = time.time() - start
+    fit_seconds = float(report.loc[report['source'] == 'entraînement', 'fit_seconds'].sum())
+    timing = {
+        'total_seconds': total_seconds,
+        'zones_trained': int((report['source'] == 'entraînement').sum()),
+        'zones_reused': int((report['source'] == 'registre').sum()),
+        'fit_seconds': fit_seconds,
+        'workers': max_workers,
+        # Temps de fit cumulé / (temps réel × process): taux d'occupation du pool
+        'pool_utilization': fit_seconds / (total_seconds * max_workers) if pending else None,
+    }
+    
+    print(f"✅ {len(report)} zones en {total_seconds:.1f}s "
+          f"(fit cumulé {fit_seconds:.1f}s sur {max_workers} process)")
+    
+    return {'report': report, 'timing': timing}
+
+
+def load_zone_models(zones, registry=None):
+    """
+    Modèles courants des zones (LazyModel)
+    
+    Zones ignorées: sans modèle, ou dont la version courante n'a pas été
+    entraînée sur des prix ENTSO-E (pas de marque PRICE_SOURCE)
+    
+    Returns:
+        Dict {zone: LazyModel}
+    """
+    registry = registry or ModelRegistry()
+    models = {}
+    
+    for zone in zones:
+        name = zone_model_name(zone)
+        version = registry.current_version(name)
+        if version is None:
+            continue
+        meta = registry.metadata(name, version) or {}
+        if meta.get('price_source') != PRICE_SOURCE:
+            print(f"⚠️ {zone}: modèle {version} sans prix ENTSO-E vérifiés, non utilisé")
+            continue
+        models[zone] = registry.load(name, version)
+    
+    return models
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Entraînement d'un modèle de prix par zone")
+    parser.add_argument('--zones', nargs='+', default=['FR', 'DE', 'ES', 'IT', 'GB'], help="Codes zone")
+    parser.add_argument('--days', type=int, default=365, help="Jours d'historique de prix")
+    parser.add_argument('--workers', type=int, default=None, help="Process en parallèle")
+    parser.add_argument('--registry', default=REGISTRY_DIR, help="Dossier du registre")
+    args = parser.parse_args()
+    
+    from src.data.fetch_europe import fetch_european_prices
+    
+    prices = fetch_european_prices(countries=args.zones, days=args.days)
+    panel = build_zone_panel(prices)
+    
+    result = train_zone_models(panel, max_workers=args.workers, registry=ModelRegistry(args.registry))
+    print(result['report'].to_string(index=False))
+    print(f"\n⏱️ {result['timing']}")
@@ -3,10 +3,14 @@ Prédictions futures (J+1, J+2) pour MétéoTrader
 Utilise prévisions météo + patterns historiques
 """
 
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 import numpy as np
-import requests
 from datetime import datetime, timedelta
+from src.data.weather_service import get_weather_service
+from src.features.pipeline import MODEL_FEATURES, build_features, feature_matrix, frame_hash
 
 
 def fetch_weather_forecast(latitude=48.8566, longitude=2.3522, days=2):
@@ -21,36 +25,161 @@ def fetch_weather_forecast(latitude=48.8566, longitude=2.3522, days=2):
     Returns:
         DataFrame avec prévisions horaires
     """
-    url = "https://api.open-meteo.com/v1/forecast"
-    
-    params = {
-        'latitude': latitude,
-        'longitude': longitude,
-        'hourly': 'temperature_2m,windspeed_10m,shortwave_radiation',
-        'forecast_days': days,
-        'timezone': 'Europe/Paris'
-    }
-    
-    try:
-        response = requests.get(url, params=params, timeout=30)
-        
-        if response.status_code == 200:
-            data = response.json()
-            hourly = data.get('hourly', {})
+    # Cache partagé avec fetch_europe: un seul téléchargement par run météo
+    return get_weather_service().get_forecast(latitude, longitude, days=days)
+
+
+# Profils saisonniers gardés en mémoire (un par historique distinct)
+PROFILE_CACHE_SIZE = 8
+
+# Valeurs par défaut sans historique
+DEFAULT_DEMAND_GW = 50.0
+DEFAULT_PRODUCTION = {
+    'nuclear_production_gw': 40.0,
+    'wind_production_gw': 5.0,
+    'solar_production_gw': 2.0,
+    'total_production_gw': 50.0,
+    'renewable_production_gw': 7.0,
+    'renewable_share': 0.14,
+}
+
+# Facteurs empiriques production ~ météo
+WIND_PRODUCTION_FACTOR = 0.3    # GW par km/h
+SOLAR_PRODUCTION_FACTOR = 0.01  # GW par W/m²
+
+
+class SeasonalProfile:
+    """
+    Patterns historiques calculés une fois par rafraîchissement des données:
+    demande moyenne par (jour de semaine, heure) en matrice 7×24, et
+    paramètres de production par filière. Remplir un horizon quelconque
+    = un index d'array, sans boucle sur les timestamps.
+    """
+    
+    def __init__(self, demand_matrix=None, production=None):
+        """
+        Args:
+            demand_matrix: Demande moyenne (7 × 24, jour de semaine × heure), None si inconnue
+            production: Dict {colonne: (mode, valeur)} dans l'ordre des colonnes historiques,
+                mode 'mean' (valeur constante), 'wind' ou 'solar' (valeur = plafond)
+        """
+        self.demand_matrix = demand_matrix
+        self.production = production or {}
+    
+    @classmethod
+    def from_history(cls, historical_data):
+        """
+        Args:
+            historical_data: DataFrame avec timestamp, demand_gw, colonnes *production_gw
+        """
+        demand_matrix = None
+        if 'demand_gw' in historical_data.columns:
+            demand = historical_data['demand_gw'].to_numpy(dtype=float)
+            timestamps = historical_data['timestamp'].dt
+            slots = timestamps.dayofweek.to_numpy() * 24 + timestamps.hour.to_numpy()
             
-            df = pd.DataFrame({
-                'timestamp': pd.to_datetime(hourly['time']),
-                'temperature_c': hourly['temperature_2m'],
-                'wind_speed_kmh': hourly['windspeed_10m'],
-                'solar_radiation_wm2': hourly['shortwave_radiation']
-            })
+            valid = ~np.isnan(demand)
+            sums = np.bincount(slots[valid], weights=demand[valid], minlength=7 * 24)
+            counts = np.bincount(slots[valid], minlength=7 * 24)
             
-            return df
-        else:
-            return pd.DataFrame()
-    except Exception as e:
-        print(f"Erreur prévisions météo: {e}")
-        return pd.DataFrame()
+            # Créneau jamais observé: moyenne globale
+            with np.errstate(invalid='ignore', divide='ignore'):
+                demand_matrix = np.where(counts > 0, sums / counts, np.nanmean(demand) if valid.any() else np.nan)
+            demand_matrix = demand_matrix.reshape(7, 24)
+        
+        production = {}
+        for col in [c for c in historical_data.columns if 'production_gw' in c]:
+            values = historical_data[col]
+            if 'wind' in col.lower() and values.std() > 0:
+                production[col] = ('wind', float(values.max()))
+            elif 'solar' in col.lower() and values.std() > 0:
+                production[col] = ('solar', float(values.max()))
+            else:
+                # Nucléaire (stable), filières sans variance, autres: moyenne historique
+                production[col] = ('mean', float(values.mean()))
+        
+        return cls(demand_matrix, production)
+    
+    def demand(self, timestamps):
+        """
+        Demande estimée pour des timestamps quelconques (array)
+        
+        Args:
+            timestamps: Series / DatetimeIndex
+        """
+        timestamps = pd.DatetimeIndex(timestamps)
+        if self.demand_matrix is None:
+            return np.full(len(timestamps), DEFAULT_DEMAND_GW)
+        return self.demand_matrix[timestamps.dayofweek.to_numpy(), timestamps.hour.to_numpy()]
+    
+    def production_frame(self, forecast_weather):
+        """
+        Production estimée par filière + totaux
+        
+        Args:
+            forecast_weather: DataFrame avec wind_speed_kmh, solar_radiation_wm2
+        
+        Returns:
+            DataFrame (une ligne par heure de forecast_weather)
+        """
+        n_hours = len(forecast_weather)
+        
+        if not self.production:
+            return pd.DataFrame({col: np.full(n_hours, value) for col, value in DEFAULT_PRODUCTION.items()})
+        
+        columns = {}
+        for col, (mode, value) in self.production.items():
+            if mode == 'wind':
+                columns[col] = np.clip(forecast_weather['wind_speed_kmh'].to_numpy(dtype=float) * WIND_PRODUCTION_FACTOR, 0, value)
+            elif mode == 'solar':
+                columns[col] = np.clip(forecast_weather['solar_radiation_wm2'].to_numpy(dtype=float) * SOLAR_PRODUCTION_FACTOR, 0, value)
+            else:
+                columns[col] = np.full(n_hours, value)
+        
+        prod_forecast = pd.DataFrame(columns)
+        
+        # Totaux
+        renewable_cols = [c for c in prod_forecast.columns if 'wind' in c.lower() or 'solar' in c.lower()]
+        if renewable_cols:
+            prod_forecast['renewable_production_gw'] = prod_forecast[renewable_cols].sum(axis=1)
+        
+        if 'total_production_gw' not in prod_forecast.columns:
+            prod_forecast['total_production_gw'] = prod_forecast[[c for c in prod_forecast.columns if c != 'renewable_production_gw']].sum(axis=1)
+        
+        if 'renewable_production_gw' in prod_forecast.columns:
+            prod_forecast['renewable_share'] = (prod_forecast['renewable_production_gw'] /
+                                                prod_forecast['total_production_gw'].replace(0, np.nan)).fillna(0)
+        
+        return prod_forecast
+
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def get_seasonal_profile(historical_data):
+    """
+    Profil saisonnier de cet historique (calculé une fois, puis en cache)
+    
+    Clé = hash des colonnes utilisées: nouvelles données → nouveau profil
+    """
+    columns = [c for c in historical_data.columns
+               if c in ('timestamp', 'demand_gw') or 'production_gw' in c]
+    key = frame_hash(historical_data[columns])
+    
+    with _profiles_lock:
+        if key in _profiles:
+            _profiles.move_to_end(key)
+            return _profiles[key]
+    
+    profile = SeasonalProfile.from_history(historical_data)
+    
+    with _profiles_lock:
+        _profiles[key] = profile
+        while len(_profiles) > PROFILE_CACHE_SIZE:
+            _profiles.popitem(last=False)
+    
+    return profile
 
 
 def estimate_future_demand(historical_data, forecast_dates):
@@ -64,31 +193,9 @@ def estimate_future_demand(historical_data, forecast_dates):
     Returns:
         Series avec demande estimée
     """
-    if 'demand_gw' not in historical_data.columns:
-        # Valeur par défaut si pas de données historiques
-        return pd.Series(50.0, index=range(len(forecast_dates)))
-    
-    # Extraire patterns par heure et jour de la semaine
-    historical_data = historical_data.copy()
-    historical_data['hour'] = historical_data['timestamp'].dt.hour
-    historical_data['day_of_week'] = historical_data['timestamp'].dt.dayofweek
-    
-    # Moyenne par (heure, jour_semaine)
-    demand_patterns = historical_data.groupby(['hour', 'day_of_week'])['demand_gw'].mean()
-    
-    # Appliquer patterns aux dates futures
-    estimated_demand = []
-    for ts in forecast_dates:
-        hour = ts.hour
-        dow = ts.dayofweek
-        
-        if (hour, dow) in demand_patterns.index:
-            estimated_demand.append(demand_patterns[(hour, dow)])
-        else:
-            # Fallback: moyenne globale
-            estimated_demand.append(historical_data['demand_gw'].mean())
-    
-    return pd.Series(estimated_demand, index=range(len(forecast_dates)))
+    # Moyenne par (jour_semaine, heure), lue dans la matrice du profil
+    demand = get_seasonal_profile(historical_data).demand(forecast_dates)
+    return pd.Series(demand, index=range(len(demand)))
 
 
 def estimate_future_production(historical_data, forecast_weather):
@@ -102,63 +209,7 @@ def estimate_future_production(historical_data, forecast_weather):
     Returns:
         DataFrame avec production estimée par filière
     """
-    n_hours = len(forecast_weather)
-    
-    # Colonnes de production
-    prod_cols = [c for c in historical_data.columns if 'production_gw' in c]
-    
-    if not prod_cols:
-        # Valeurs par défaut
-        return pd.DataFrame({
-            'nuclear_production_gw': [40.0] * n_hours,
-            'wind_production_gw': [5.0] * n_hours,
-            'solar_production_gw': [2.0] * n_hours,
-            'total_production_gw': [50.0] * n_hours,
-            'renewable_production_gw': [7.0] * n_hours,
-            'renewable_share': [0.14] * n_hours
-        })
-    
-    # Production de base (moyenne historique pour sources stables)
-    base_production = {}
-    for col in prod_cols:
-        if 'nuclear' in col.lower():
-            # Nucléaire: relativement stable
-            base_production[col] = [historical_data[col].mean()] * n_hours
-        elif 'wind' in col.lower():
-            # Éolien: corrélé au vent
-            # Modèle simple: production proportionnelle au vent
-            if historical_data[col].std() > 0:
-                wind_prod = forecast_weather['wind_speed_kmh'] * 0.3  # Facteur empirique
-                base_production[col] = wind_prod.clip(0, historical_data[col].max()).tolist()
-            else:
-                base_production[col] = [historical_data[col].mean()] * n_hours
-        elif 'solar' in col.lower():
-            # Solaire: corrélé à radiation
-            if historical_data[col].std() > 0:
-                solar_prod = forecast_weather['solar_radiation_wm2'] * 0.01  # Facteur empirique
-                base_production[col] = solar_prod.clip(0, historical_data[col].max()).tolist()
-            else:
-                base_production[col] = [historical_data[col].mean()] * n_hours
-        else:
-            # Autres: moyenne historique
-            base_production[col] = [historical_data[col].mean()] * n_hours
-    
-    # Créer DataFrame
-    prod_forecast = pd.DataFrame(base_production)
-    
-    # Calculer totaux
-    renewable_cols = [c for c in prod_forecast.columns if 'wind' in c.lower() or 'solar' in c.lower()]
-    if renewable_cols:
-        prod_forecast['renewable_production_gw'] = prod_forecast[renewable_cols].sum(axis=1)
-    
-    if 'total_production_gw' not in prod_forecast.columns:
-        prod_forecast['total_production_gw'] = prod_forecast[[c for c in prod_forecast.columns if c != 'renewable_production_gw']].sum(axis=1)
-    
-    if 'renewable_production_gw' in prod_forecast.columns and 'total_production_gw' in prod_forecast.columns:
-        prod_forecast['renewable_share'] = (prod_forecast['renewable_production_gw'] / 
-                                            prod_forecast['total_production_gw'].replace(0, np.nan)).fillna(0)
-    
-    return prod_forecast
+    return get_seasonal_profile(historical_data).production_frame(forecast_weather)
 
 
 def create_future_features(forecast_df):
@@ -171,31 +222,33 @@ def create_future_features(forecast_df):
     Returns:
         DataFrame avec toutes les features
     """
-    df = forecast_df.copy()
-    
-    # Features temporelles
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.dayofweek
-    df['month'] = df['timestamp'].dt.month
-    df['is_weekend'] = (df['day_of_week'] >= 5).astype(int)
-    df['is_peak_hour'] = ((df['hour'] >= 18) & (df['hour'] <= 20)).astype(int)
-    
-    # Features température
-    if 'temperature_c' in df.columns:
-        df['temp_extreme'] = ((df['temperature_c'] < 5) | (df['temperature_c'] > 25)).astype(int)
-    else:
-        df['temp_extreme'] = 0
+    # Même pipeline qu'à l'entraînement (src/features/pipeline.py)
+    return build_features(forecast_df, MODEL_FEATURES)
+
+
+def build_forecast_inputs(historical_data, forecast_weather):
+    """
+    Entrées brutes du modèle sur l'horizon: météo prévue + demande et
+    production estimées (patterns historiques)
     
-    # Gap production-demande
-    if 'demand_gw' in df.columns and 'total_production_gw' in df.columns:
-        df['production_demand_gap'] = df['demand_gw'] - df['total_production_gw']
-    else:
-        df['production_demand_gap'] = 0
+    Args:
+        historical_data: DataFrame avec données historiques
+        forecast_weather: Prévisions météo horaires
+    
+    Returns:
+        DataFrame (une ligne par heure de forecast_weather)
+    """
+    forecast_df = forecast_weather.copy()
+    forecast_df['demand_gw'] = estimate_future_demand(historical_data, forecast_weather['timestamp']).values
     
-    return df
+    forecast_production = estimate_future_production(historical_data, forecast_weather)
+    for col in forecast_production.columns:
+        forecast_df[col] = forecast_production[col].values
+    
+    return forecast_df
 
 
-def predict_future_prices(model, feature_columns, historical_data, days=1):
+def predict_future_prices(model, feature_columns, historical_data, days=1, calibrator=None):
     """
     Prédit les prix futurs (J+1, J+2)
     
@@ -204,9 +257,10 @@ def predict_future_prices(model, feature_columns, historical_data, days=1):
         feature_columns: Liste des features utilisées par le modèle
         historical_data: DataFrame avec données historiques
         days: Nombre de jours à prédire (1 ou 2)
+        calibrator: ConformalCalibrator (src/models/conformal.py); défaut: ±8 €/MWh
     
     Returns:
-        DataFrame avec timestamps et prédictions
+        DataFrame avec timestamps, lead_time_hours (depuis l'heure courante) et prédictions
     """
     print(f"🔮 Prédiction des prix pour les {days} prochains jours...")
     
@@ -219,28 +273,14 @@ def predict_future_prices(model, feature_columns, historical_data, days=1):
     
     print(f"✅ {len(forecast_weather)} heures de prévisions météo")
     
-    # 2. Estimer demande future
-    forecast_demand = estimate_future_demand(historical_data, forecast_weather['timestamp'])
-    forecast_weather['demand_gw'] = forecast_demand.values
-    
-    # 3. Estimer production future
-    forecast_production = estimate_future_production(historical_data, forecast_weather)
-    
-    # 4. Fusionner toutes les données
-    forecast_df = forecast_weather.copy()
-    for col in forecast_production.columns:
-        forecast_df[col] = forecast_production[col].values
+    # 2-4. Demande et production futures estimées
+    forecast_df = build_forecast_inputs(historical_data, forecast_weather)
     
     # 5. Créer features
     forecast_df = create_future_features(forecast_df)
     
-    # 6. Sélectionner features du modèle
-    # Remplir colonnes manquantes avec 0
-    for col in feature_columns:
-        if col not in forecast_df.columns:
-            forecast_df[col] = 0
-    
-    X_future = forecast_df[feature_columns]
+    # 6. Sélectionner features du modèle (manquantes → 0)
+    X_future = feature_matrix(forecast_df, feature_columns)
     
     # 7. Prédire
     predictions = model.predict(X_future)
@@ -255,10 +295,20 @@ def predict_future_prices(model, feature_columns, historical_data, days=1):
         'is_peak_hour': forecast_df['is_peak_hour']
     })
     
-    # 9. Ajouter intervalles de confiance (estimation simple)
-    # Utiliser std des erreurs historiques comme proxy
-    result['confidence_lower'] = result['predicted_price'] - 8  # ±RMSE approximatif
-    result['confidence_upper'] = result['predicted_price'] + 8
+    # Horizon depuis l'heure d'émission (stockage: PriceDatabase.store_prediction_batch)
+    issued_at = pd.Timestamp(datetime.now()).floor('h')
+    result['lead_time_hours'] = ((result['timestamp'] - issued_at) / pd.Timedelta(hours=1)).round().astype(int)
+    
+    # 9. Ajouter intervalles de confiance
+    if calibrator is not None:
+        # Calibrés sur les erreurs passées au même horizon et à la même heure
+        result['confidence_lower'], result['confidence_upper'] = calibrator.interval(
+            result['predicted_price'], result['lead_time_hours'].to_numpy(), result['timestamp'].dt.hour
+        )
+    else:
+        # Estimation simple: ±RMSE approximatif
+        result['confidence_lower'] = result['predicted_price'] - 8
+        result['confidence_upper'] = result['predicted_price'] + 8
     
     print(f"✅ Prédictions calculées: {len(result)} heures")
     print(f"💰 Prix moyen prédit: {result['predicted_price'].mean():.2f} €/MWh")
@@ -267,6 +317,88 @@ def predict_future_prices(model, feature_columns, historical_data, days=1):
     return result
 
 
+def predict_prices_batch(model, feature_columns, historical_data, zones=('FR',), days=2,
+                         lead_hours=None, forecasts=None, issued_at=None, interval=8.0, calibrator=None):
+    """
+    Prédictions multi-zones, multi-horizons en un seul appel au modèle
+    
+    Météo de toutes les zones récupérée en une passe, une matrice de
+    features empilée (zones × heures), un seul model.predict().
+    
+    Args:
+        model: Modèle ML entraîné (ou LazyModel / RemoteModel)
+        feature_columns: Features du modèle
+        historical_data: DataFrame historique commun, ou dict {zone: DataFrame}
+            (patterns demande/production, cf. SeasonalProfile)
+        zones: Codes zone
+        days: Horizon max (jours)
+        lead_hours: Horizons à garder (heures, ex: [1, 24, 48]); défaut: tous
+        forecasts: Dict {zone: DataFrame météo} déjà récupéré (défaut: téléchargé)
+        issued_at: Instant d'émission (défaut: heure courante)
+        interval: Demi-largeur de l'intervalle de confiance sans calibrateur (€/MWh)
+        calibrator: ConformalCalibrator: intervalles par (horizon, heure)
+    
+    Returns:
+        DataFrame tidy: zone, target_timestamp, lead_time_hours, predicted_price,
+        confidence_lower, confidence_upper (cf. PriceDatabase.store_prediction_batch)
+    """
+    zones = list(zones)
+    issued_at = pd.Timestamp(issued_at or datetime.now()).floor('h')
+    
+    if forecasts is None:
+        from src.data.fetch_europe import fetch_zone_forecasts
+        # Jours comptés depuis aujourd'hui 00h: un de plus pour couvrir days × 24h d'horizon
+        forecasts = fetch_zone_forecasts(zones, days=days + 1)
+    
+    frames = []
+    for zone in zones:
+        weather = forecasts.get(zone)
+        if weather is None or weather.empty:
+            print(f"⚠️ {zone}: pas de prévisions météo")
+            continue
+        
+        lead = ((weather['timestamp'] - issued_at) / pd.Timedelta(hours=1)).to_numpy()
+        keep = (lead >= 1) & (lead <= days * 24)
+        if lead_hours is not None:
+            keep &= np.isin(lead, list(lead_hours))
+        
+        frame = weather.loc[keep].reset_index(drop=True)
+        frame.insert(0, 'zone', zone)
+        frame['lead_time_hours'] = lead[keep].astype(int)
+        
+        history = historical_data.get(zone) if isinstance(historical_data, dict) else historical_data
+        profile = get_seasonal_profile(history) if history is not None else SeasonalProfile()
+        frame['demand_gw'] = profile.demand(frame['timestamp'])
+        production = profile.production_frame(frame)
+        for col in production.columns:
+            frame[col] = production[col].values
+        
+        frames.append(frame)
+    
+    if not frames:
+        return pd.DataFrame(columns=['zone', 'target_timestamp', 'lead_time_hours', 'predicted_price',
+                                     'confidence_lower', 'confidence_upper'])
+    
+    # Une matrice pour toutes les zones et tous les horizons → un seul predict
+    stacked = pd.concat(frames, ignore_index=True)
+    X = feature_matrix(build_features(stacked, MODEL_FEATURES), feature_columns)
+    predictions = np.asarray(model.predict(X), dtype=float)
+    
+    if calibrator is not None:
+        lower, upper = calibrator.interval(predictions, stacked['lead_time_hours'], stacked['timestamp'].dt.hour)
+    else:
+        lower, upper = predictions - interval, predictions + interval
+    
+    return pd.DataFrame({
+        'zone': stacked['zone'],
+        'target_timestamp': stacked['timestamp'],
+        'lead_time_hours': stacked['lead_time_hours'],
+        'predicted_price': predictions,
+        'confidence_lower': lower,
+        'confidence_upper': upper,
+    })
+
+
 if __name__ == "__main__":
     # Test rapide
     print("🧪 Test prédictions futures...")
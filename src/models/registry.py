@@ -0,0 +1,302 @@
+"""
+Registre de modèles versionnés
+Chaque version = artefact au format natif (booster XGBoost .ubj, arbres
+sklearn aplatis en .npy memory-mappés) + métadonnées (features, métriques,
+fenêtre de données, date). Promotion / rollback, chargement paresseux.
+
+Arborescence:
+    data/models/<nom>/registry.json      version courante + historique des promotions
+    data/models/<nom>/<version>/meta.json
+    data/models/<nom>/<version>/...      artefact
+"""
+
+import json
+import os
+import pickle
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.models.tree_ensemble import TreeEnsemble
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-process
+    fcntl = None
+
+
+REGISTRY_DIR = 'data/models'
+
+
+def _write_json(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+class LazyModel:
+    """Modèle du registre: l'artefact n'est lu qu'au premier usage"""
+    
+    def __init__(self, directory, metadata):
+        self.directory = directory
+        self.metadata = metadata
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def version(self):
+        return self.metadata['version']
+    
+    @property
+    def features(self):
+        return self.metadata['features']
+    
+    @property
+    def model(self):
+        """Estimateur chargé (TreeEnsemble, XGBRegressor ou objet dé-picklé)"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = _load_artifact(self.directory, self.metadata['kind'])
+        return self._model
+    
+    def warm(self):
+        """Charge l'artefact maintenant (plutôt qu'au premier predict)"""
+        self.model
+        return self
+    
+    def predict(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        return self.model.predict(X)
+    
+    @property
+    def feature_importances_(self):
+        return self.model.feature_importances_
+
+
+def _artifact_kind(model):
+    """Format natif selon le type de modèle"""
+    if type(model).__name__ == 'XGBoostPricePredictor':
+        model = model.model
+    if type(model).__module__.startswith('xgboost'):
+        return 'xgboost', model
+    if hasattr(model, 'estimators_') or hasattr(model, 'tree_'):
+        return 'tree_ensemble', model
+    return 'pickle', model
+
+
+def _save_artifact(directory, kind, model, features):
+    if kind == 'xgboost':
+        model.save_model(os.path.join(directory, 'model.ubj'))
+    elif kind == 'tree_ensemble':
+        # Arrays seuls (pas de pickle): memory-mappés et partagés par tous les process
+        TreeEnsemble.from_sklearn(model, feature_names=list(features)).save(directory)
+    else:
+        with open(os.path.join(directory, 'model.pkl'), 'wb') as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_artifact(directory, kind):
+    if kind == 'xgboost':
+        import xgboost as xgb
+        model = xgb.XGBRegressor()
+        model.load_model(os.path.join(directory, 'model.ubj'))
+        return model
+    if kind == 'tree_ensemble':
+        return TreeEnsemble.load(directory, mmap=True)
+    with open(os.path.join(directory, 'model.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+class ModelRegistry:
+    """Registre de modèles sur disque (partageable entre process)"""
+    
+    def __init__(self, root=REGISTRY_DIR):
+        """
+        Args:
+            root: Dossier racine du registre
+        """
+        self.root = root
+        self._loaded = {}
+        self._lock = threading.Lock()
+    
+    # ===== ENREGISTREMENT =====
+    
+    def register(self, name, model, features, metrics=None, data_window=None,
+                 params=None, fingerprint=None, info=None, promote=True):
+        """
+        Enregistre une nouvelle version
+        
+        Args:
+            name: Nom du modèle (ex: 'rf_france')
+            model: Estimateur entraîné (RandomForest, XGBRegressor, XGBoostPricePredictor...)
+            features: Features dans l'ordre attendu par le modèle
+            metrics: Dict de métriques (mae, rmse, r2...)
+            data_window: (début, fin) des données d'entraînement
+            params: Hyperparamètres
+            fingerprint: Empreinte d'entraînement (cf. model_cache)
+            info: Métadonnées supplémentaires (ex: train_seconds)
+            promote: Devient la version courante
+        
+        Returns:
+            Version créée ('v1', 'v2'...)
+        """
+        kind, artifact = _artifact_kind(model)
+        if metrics is None and type(model).__name__ == 'XGBoostPricePredictor':
+            metrics = model.test_score
+        
+        model_dir = os.path.join(self.root, name)
+        os.makedirs(model_dir, exist_ok=True)
+        
+        # makedirs exclusif: deux process ne peuvent pas prendre le même numéro
+        number = len(self._version_dirs(name)) + 1
+        while True:
+            version = f'v{number}'
+            try:
+                os.makedirs(os.path.join(model_dir, version))
+                break
+            except FileExistsError:
+                number += 1
+        
+        directory = os.path.join(model_dir, version)
+        _save_artifact(directory, kind, artifact, features)
+        
+        metadata = {
+            'name': name,
+            'version': version,
+            'kind': kind,
+            'model_class': f'{type(artifact).__module__}.{type(artifact).__name__}',
+            'features': list(features),
+            'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+            'data_window': [str(d) for d in data_window] if data_window else None,
+            'params': params or {},
+            'fingerprint': fingerprint,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            **(info or {}),
+        }
+        # meta.json en dernier: une version sans meta.json est incomplète
+        _write_json(os.path.join(directory, 'meta.json'), metadata)
+        
+        print(f"✅ Modèle {name}:{version} enregistré ({kind})")
+        
+        if promote:
+            self.promote(name, version)
+        
+        return version
+    
+    # ===== PROMOTION =====
+    
+    def promote(self, name, version):
+        """Rend une version courante"""
+        if self.metadata(name, version) is None:
+            raise ValueError(f"Version inconnue: {name}:{version}")
+        
+        with self._state_lock(name):
+            state = self._state(name)
+            state['history'] = [v for v in state['history'] if v != version] + [version]
+            state['current'] = version
+            _write_json(os.path.join(self.root, name, 'registry.json'), state)
+        
+        print(f"🚀 {name}:{version} promu")
+    
+    def rollback(self, name):
+        """
+        Revient à la version promue précédemment
+        
+        Returns:
+            Version redevenue courante
+        """
+        with self._state_lock(name):
+            state = self._state(name)
+            if len(state['history']) < 2:
+                raise ValueError(f"Aucune version précédente pour {name}")
+            
+            state['history'].pop()
+            state['current'] = state['history'][-1]
+            _write_json(os.path.join(self.root, name, 'registry.json'), state)
+        
+        print(f"↩️ {name} revenu à {state['current']}")
+        return state['current']
+    
+    # ===== LECTURE =====
+    
+    def current_version(self, name):
+        """Version courante (None si aucune)"""
+        return self._state(name)['current']
+    
+    def tag(self, name, version=None):
+        """Identifiant 'nom:version' (ex: pour store_predictions(model_version=...))"""
+        return f'{name}:{version or self.current_version(name)}'
+    
+    def metadata(self, name, version):
+        return _read_json(os.path.join(self.root, name, version, 'meta.json'))
+    
+    def versions(self, name):
+        """Métadonnées de toutes les versions complètes, de la plus ancienne à la plus récente"""
+        metadata = [self.metadata(name, v) for v in self._version_dirs(name)]
+        return [m for m in metadata if m is not None]
+    
+    def find_version(self, name, fingerprint):
+        """Version déjà enregistrée pour cette empreinte d'entraînement (None sinon)"""
+        for meta in reversed(self.versions(name)):
+            if fingerprint and meta.get('fingerprint') == fingerprint:
+                return meta['version']
+        return None
+    
+    def load(self, name, version=None):
+        """
+        Modèle d'une version (courante par défaut), chargé paresseusement
+        
+        Returns:
+            LazyModel (même instance pour une version déjà demandée dans ce process)
+        """
+        version = version or self.current_version(name)
+        if version is None:
+            raise ValueError(f"Aucune version enregistrée pour {name}")
+        
+        key = (name, version)
+        with self._lock:
+            if key not in self._loaded:
+                metadata = self.metadata(name, version)
+                if metadata is None:
+                    raise ValueError(f"Version inconnue: {name}:{version}")
+                self._loaded[key] = LazyModel(os.path.join(self.root, name, version), metadata)
+            return self._loaded[key]
+    
+    def unload(self, name, version):
+        """Oublie le modèle chargé d'une version (libéré dès qu'il n'est plus référencé)"""
+        with self._lock:
+            self._loaded.pop((name, version), None)
+    
+    @contextmanager
+    def _state_lock(self, name):
+        """Lecture-modification-écriture de registry.json exclusive entre process (fcntl)"""
+        model_dir = os.path.join(self.root, name)
+        os.makedirs(model_dir, exist_ok=True)
+        with open(os.path.join(model_dir, 'registry.lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+    
+    def _state(self, name):
+        return _read_json(os.path.join(self.root, name, 'registry.json'), {'current': None, 'history': []})
+    
+    def _version_dirs(self, name):
+        model_dir = os.path.join(self.root, name)
+        if not os.path.isdir(model_dir):
+            return []
+        versions = [v for v in os.listdir(model_dir) if v.startswith('v') and v[1:].isdigit()]
+        return sorted(versions, key=lambda v: int(v[1:]))
@@ -0,0 +1,179 @@
+"""
+Entraînement du modèle de prix France
+Code du worker d'entraînement (src/models/training_worker.py)
+Historique d'entraînement: archive météo multi-années (src/data/weather_archive.py)
+jointe aux prix réels stockés en base, complétée par les données RTE récentes
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.features.pipeline import MODEL_FEATURES, available_features, build_features, feature_matrix
+from src.models.model_cache import ModelCache, training_fingerprint
+from src.models.registry import ModelRegistry
+
+
+MODEL_NAME = 'rf_france'
+
+RF_PARAMS = {'n_estimators': 100, 'max_depth': 15, 'random_state': 42}
+
+TRAIN_FRACTION = 0.8
+
+# Historique d'entraînement (archive météo + prix stockés)
+TRAIN_HISTORY_DAYS = 365 * 3
+
+# Point météo du modèle France (même point que fetch_meteo_data / fetch_weather_forecast)
+FRANCE_WEATHER_POINT = (48.8566, 2.3522)
+
+# Features présentes sur moins de cette part de l'historique: ignorées
+# (production/consommation RTE disponibles seulement sur les derniers jours)
+MIN_FEATURE_COVERAGE = 0.9
+
+
+def store_recent_prices(df_recent, db):
+    """
+    Ajoute les prix réels récupérés aux prix stockés (l'historique s'allonge à chaque cycle)
+    
+    Returns:
+        Nombre de prix stockés (0 si prix simulés)
+    """
+    if df_recent.attrs.get('synthetic_prices') or 'price_eur_mwh' not in df_recent.columns:
+        return 0
+    return db.store_actual_prices(df_recent[['timestamp', 'price_eur_mwh']].dropna())
+
+
+def build_training_frame(df_recent, db, archive=None, history_days=TRAIN_HISTORY_DAYS,
+                         weather_point=FRANCE_WEATHER_POINT):
+    """
+    Historique d'entraînement: météo archivée × prix réels stockés, sur history_days
+    
+    Les heures récentes (pas encore archivées) et les colonnes RTE
+    (production, consommation) viennent de df_recent.
+    
+    Args:
+        df_recent: DataFrame fetch_all_data (derniers jours)
+        db: PriceDatabase (prix réels stockés)
+        archive: WeatherArchive (défaut: archive standard)
+        history_days: Profondeur d'historique
+        weather_point: (latitude, longitude) du point météo
+    
+    Returns:
+        DataFrame trié par timestamp (df_recent tel quel si l'archive n'apporte rien)
+    """
+    from src.data.weather_archive import WeatherArchive
+    
+    end = pd.Timestamp(df_recent['timestamp'].max()) if not df_recent.empty else pd.Timestamp.now()
+    start = (end - pd.Timedelta(days=history_days)).normalize()
+    
+    prices = db.get_actual_prices(start_date=str(start), end_date=str(end))
+    if prices.empty:
+        return df_recent
+    prices = prices.rename(columns={'price': 'price_eur_mwh'})[['timestamp', 'price_eur_mwh']]
+    
+    try:
+        weather = (archive or WeatherArchive()).point_frame(*weather_point, start_date=start, end_date=end)
+    except Exception as e:
+        print(f"⚠️ Archive météo illisible: {e}")
+        return df_recent
+    if weather.empty:
+        return df_recent
+    
+    history = prices.merge(weather, on='timestamp', how='inner')
+    if len(history) <= len(df_recent):
+        return df_recent
+    
+    # Heures récentes absentes de l'archive, puis colonnes RTE récentes
+    recent = df_recent[~df_recent['timestamp'].isin(history['timestamp'])]
+    frame = pd.concat([history, recent[[c for c in history.columns if c in recent.columns]]], ignore_index=True)
+    extra = [c for c in df_recent.columns if c not in frame.columns]
+    if extra:
+        frame = frame.merge(df_recent[['timestamp'] + extra], on='timestamp', how='left')
+    
+    frame = frame.drop_duplicates('timestamp', keep='last').sort_values('timestamp').reset_index(drop=True)
+    print(f"📚 Historique d'entraînement: {len(frame)} heures ({frame['timestamp'].min().date()} → "
+          f"{frame['timestamp'].max().date()}), dont {len(df_recent)} récentes")
+    return frame
+
+
+def prepare_training_data(df_france, feature_columns=None):
+    """
+    Features + split temporel train/test
+    
+    Args:
+        df_france: DataFrame fetch_all_data (avec price_eur_mwh)
+        feature_columns: Features imposées (ex: celles d'un modèle publié)
+    
+    Returns:
+        Dict avec feature_columns, df (enrichi), X_train, X_test, y_train, y_test, split_idx
+    """
+    df = build_features(df_france, MODEL_FEATURES + ['renewable_production_gw'])
+    if feature_columns is None:
+        feature_columns = [
+            f for f in available_features(df_france, MODEL_FEATURES)
+            if df[f].notna().mean() >= MIN_FEATURE_COVERAGE
+        ]
+    
+    # Lignes complètes seulement (plus de NaN remplacés par 0 à l'entraînement)
+    df = df.dropna(subset=['price_eur_mwh'] + feature_columns).reset_index(drop=True)
+    
+    X = feature_matrix(df, feature_columns)
+    y = df['price_eur_mwh']
+    
+    split_idx = int(len(X) * TRAIN_FRACTION)
+    
+    return {
+        'feature_columns': feature_columns,
+        'df': df,
+        'X_train': X[:split_idx],
+        'X_test': X[split_idx:],
+        'y_train': y[:split_idx],
+        'y_test': y[split_idx:],
+        'split_idx': split_idx,
+    }
+
+
+def train_price_model(data, n_jobs=-1, registry=None, promote=True):
+    """
+    Entraîne (ou recharge du cache) le RandomForest et le publie au registre
+    
+    Args:
+        data: Résultat de prepare_training_data
+        n_jobs: Cœurs utilisés par le RandomForest
+        registry: ModelRegistry (défaut: registre standard)
+        promote: Publier comme version courante
+    
+    Returns:
+        (model, report): report = dict de ModelCache.get_or_train + 'version'
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    
+    X_train, y_train = data['X_train'], data['y_train']
+    X_test, y_test = data['X_test'], data['y_test']
+    
+    # n_jobs hors empreinte: même modèle quel que soit le nombre de cœurs
+    fingerprint = training_fingerprint(data['feature_columns'], X_train, y_train, RandomForestRegressor, RF_PARAMS)
+    model, report = ModelCache().get_or_train(
+        fingerprint, lambda: RandomForestRegressor(**RF_PARAMS, n_jobs=n_jobs).fit(X_train, y_train)
+    )
+    
+    # Version au registre (une par empreinte): traçabilité des prédictions stockées
+    registry = registry or ModelRegistry()
+    version = registry.find_version(MODEL_NAME, fingerprint)
+    if version is None:
+        y_pred = model.predict(X_test)
+        version = registry.register(
+            MODEL_NAME, model, data['feature_columns'],
+            metrics={
+                'mae': float(np.mean(np.abs(y_test - y_pred))),
+                'rmse': float(np.sqrt(np.mean((y_test - y_pred) ** 2))),
+            },
+            data_window=(data['df']['timestamp'].min(), data['df']['timestamp'].iloc[data['split_idx'] - 1]),
+            params=RF_PARAMS,
+            fingerprint=fingerprint,
+            info={'train_seconds': report['train_seconds']},
+            promote=promote
+        )
+    
+    report['version'] = registry.tag(MODEL_NAME, version)
+    
+    return model, report
@@ -0,0 +1,313 @@
+"""
+Worker d'entraînement en arrière-plan
+Process séparé du dashboard (priorité basse): recharge les données,
+réentraîne si elles ont changé et publie le modèle au registre.
+Chaque cycle stocke aussi la prévision 48h du modèle courant (intervalles
+calibrés): ses erreurs alimentent le calibrateur conforme.
+Entraînement sur l'historique multi-années (archive météo × prix stockés,
+cf. training.build_training_frame); les HISTORY_DAYS derniers jours
+viennent de RTE et complètent les prix stockés.
+Le dashboard voit la nouvelle version courante au prochain rerun (hot-swap).
+
+Usage:
+    python -m src.models.training_worker                # boucle (toutes les heures)
+    python -m src.models.training_worker --once         # un seul cycle
+    python -m src.models.training_worker --backfill-days 1095 --once   # prix RTE passés stockés d'abord
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.models.registry import REGISTRY_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: heartbeat seulement
+    fcntl = None
+
+
+WORKER_STATE_PATH = os.path.join(REGISTRY_DIR, 'worker.json')
+WORKER_LOG_PATH = os.path.join(REGISTRY_DIR, 'worker.log')
+RETRAIN_REQUEST_PATH = os.path.join(REGISTRY_DIR, 'retrain.request')
+# Verrou tenu par le worker toute sa vie: libéré par le noyau à sa mort
+WORKER_LOCK_PATH = os.path.join(REGISTRY_DIR, 'worker.lock')
+
+TRAIN_INTERVAL_SECONDS = 3600
+POLL_SECONDS = 30
+HISTORY_DAYS = 30
+
+# Priorité CPU basse: le dashboard reste réactif pendant un fit
+WORKER_NICE = 10
+
+
+def backfill_prices(days, db=None):
+    """
+    Stocke les prix RTE des days derniers jours (historique d'entraînement initial)
+    
+    Returns:
+        Nombre de prix stockés
+    """
+    from src.data.database import PriceDatabase
+    from src.data.fetch_apis_oauth import fetch_rte_wholesale_prices
+    
+    end_date = datetime.now().date()
+    prices = fetch_rte_wholesale_prices(str(end_date - timedelta(days=days)), str(end_date))
+    if prices.empty:
+        print("⚠️ Aucun prix RTE récupéré")
+        return 0
+    
+    prices['timestamp'] = pd.to_datetime(prices['timestamp']).dt.tz_localize(None)
+    n = (db or PriceDatabase()).store_actual_prices(prices[['timestamp', 'price_eur_mwh']].dropna())
+    print(f"✅ {n} prix RTE stockés ({days} jours)")
+    return n
+
+
+def request_retrain():
+    """Demande un cycle d'entraînement immédiat (nouvelles données disponibles)"""
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    with open(RETRAIN_REQUEST_PATH, 'w') as f:
+        f.write(datetime.now().isoformat())
+
+
+def read_worker_state():
+    """État publié par le worker (None si jamais lancé)"""
+    if not os.path.exists(WORKER_STATE_PATH):
+        return None
+    try:
+        with open(WORKER_STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _try_lock(path):
+    """Fichier verrouillé (fcntl, non bloquant), ou None si un autre process le tient"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lock = open(path, 'a')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def worker_alive():
+    """
+    True si un worker tourne
+    
+    Verrou worker.lock tenu = worker vivant, même au milieu d'un fit ou d'un
+    téléchargement long. Sans fcntl: process vivant et heartbeat récent.
+    """
+    if fcntl is not None:
+        lock = _try_lock(WORKER_LOCK_PATH)
+        if lock is None:
+            return True
+        lock.close()  # Libère aussitôt: personne ne le tenait
+        return False
+    
+    state = read_worker_state()
+    if not state:
+        return False
+    
+    try:
+        os.kill(state['pid'], 0)
+    except (OSError, KeyError):
+        return False
+    
+    heartbeat = datetime.fromisoformat(state['heartbeat'])
+    return datetime.now() - heartbeat < timedelta(seconds=POLL_SECONDS * 4)
+
+
+def ensure_training_worker():
+    """
+    Lance le worker en arrière-plan s'il ne tourne pas déjà
+    
+    Returns:
+        PID du worker lancé, ou None s'il tournait déjà
+    """
+    if worker_alive():
+        return None
+    
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    
+    with open(WORKER_LOG_PATH, 'a') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'src.models.training_worker'],
+            cwd=project_root,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            start_new_session=True  # Survit aux redémarrages du dashboard
+        )
+    
+    print(f"🚀 Worker d'entraînement lancé (PID {process.pid})")
+    return process.pid
+
+
+class TrainingWorker:
+    """Boucle d'entraînement: périodique ou sur demande"""
+    
+    def __init__(self, interval=TRAIN_INTERVAL_SECONDS, n_jobs=None, history_days=HISTORY_DAYS):
+        """
+        Args:
+            interval: Secondes entre deux cycles
+            n_jobs: Cœurs pour le fit (défaut: tous sauf un, laissé au dashboard)
+            history_days: Jours de données d'entraînement
+        """
+        self.interval = interval
+        self.n_jobs = n_jobs or max(1, (os.cpu_count() or 2) - 1)
+        self.history_days = history_days
+        self.calibrator = None
+        self.state = {'pid': os.getpid(), 'started_at': datetime.now().isoformat(timespec='seconds')}
+        self._state_lock = threading.Lock()
+        self._lock_file = None
+    
+    def run_once(self):
+        """
+        Un cycle: données → empreinte → entraînement si nouvelle → publication
+        
+        Returns:
+            Tag de la version courante ('rf_france:vN') ou None si échec
+        """
+        from src.data.database import PriceDatabase
+        from src.data.fetch_apis_oauth import fetch_all_data
+        from src.models.training import (build_training_frame, prepare_training_data, store_recent_prices,
+                                         train_price_model)
+        
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=self.history_days)
+        
+        self._publish(status='données')
+        df_france = fetch_all_data(str(start_date), str(end_date))
+        if df_france.empty or 'price_eur_mwh' not in df_france.columns:
+            print("⚠️ Pas de données d'entraînement, cycle ignoré")
+            return None
+        
+        # Prix réels récents ajoutés à la base, puis historique complet (archive météo × prix stockés)
+        db = PriceDatabase()
+        store_recent_prices(df_france, db)
+        df_train = build_training_frame(df_france, db)
+        
+        self._publish(status='entraînement')
+        data = prepare_training_data(df_train)
+        # Empreinte inchangée → rechargé du cache, pas de nouvelle version
+        _, report = train_price_model(data, n_jobs=self.n_jobs, promote=True)
+        
+        self._publish(status='prévision')
+        try:
+            self._store_forecast(df_france, db, report['version'])
+        except Exception as e:
+            print(f"⚠️ Prévision non stockée: {e}")
+        
+        self.state['last_run'] = datetime.now().isoformat(timespec='seconds')
+        self.state['last_version'] = report['version']
+        self.state['last_source'] = report['source']
+        print(f"✅ Cycle terminé: {report['version']} ({report['source']})")
+        
+        return report['version']
+    
+    def _store_forecast(self, df_france, db, tag):
+        """Prévision 48h France du modèle courant, stockée avec horizon et intervalles calibrés"""
+        from src.models.conformal import ConformalCalibrator
+        from src.models.predict_future import predict_prices_batch
+        from src.models.registry import ModelRegistry
+        from src.models.training import MODEL_NAME
+        
+        # Calibrateur gardé entre les cycles: seules les nouvelles erreurs sont lues
+        self.calibrator = self.calibrator or ConformalCalibrator()
+        self.calibrator.sync(db)
+        
+        model = ModelRegistry().load(MODEL_NAME)
+        issued_at = pd.Timestamp(datetime.now()).floor('h')
+        batch = predict_prices_batch(model, model.features, df_france, zones=('FR',), days=2,
+                                     issued_at=issued_at, calibrator=self.calibrator)
+        
+        n_rows = db.store_prediction_batch(batch, model_version=tag, prediction_time=issued_at)
+        print(f"🔮 Prévision stockée: {n_rows} heures ({tag})")
+        return n_rows
+    
+    def run_forever(self):
+        """Cycles toutes les interval secondes, ou dès qu'un réentraînement est demandé"""
+        if hasattr(os, 'nice'):
+            os.nice(WORKER_NICE)
+        
+        # Un seul worker par machine: verrou pris atomiquement (deux lancements simultanés → un seul garde)
+        if fcntl is not None:
+            self._lock_file = _try_lock(WORKER_LOCK_PATH)
+            if self._lock_file is None:
+                print("ℹ️ Un worker tourne déjà, arrêt")
+                return
+        elif worker_alive() and read_worker_state()['pid'] != os.getpid():
+            print("ℹ️ Un worker tourne déjà, arrêt")
+            return
+        
+        self._publish(status='démarrage')
+        # Heartbeat indépendant des phases: un fit ou un téléchargement long ne fait pas croire à un arrêt
+        threading.Thread(target=self._heartbeat, daemon=True).start()
+        print(f"🔄 Worker d'entraînement démarré (PID {os.getpid()}, {self.n_jobs} cœurs, toutes les {self.interval}s)")
+        
+        next_run = time.time()
+        while True:
+            if time.time() >= next_run or os.path.exists(RETRAIN_REQUEST_PATH):
+                if os.path.exists(RETRAIN_REQUEST_PATH):
+                    os.remove(RETRAIN_REQUEST_PATH)
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print(f"❌ Erreur cycle d'entraînement: {e}")
+                next_run = time.time() + self.interval
+            
+            self.state['next_run'] = datetime.fromtimestamp(next_run).isoformat(timespec='seconds')
+            self._publish(status='en attente')
+            time.sleep(POLL_SECONDS)
+    
+    def _heartbeat(self):
+        """Thread: heartbeat toutes les POLL_SECONDS, statut inchangé"""
+        while True:
+            time.sleep(POLL_SECONDS)
+            try:
+                self._publish()
+            except Exception as e:
+                print(f"⚠️ Heartbeat non écrit: {e}")
+    
+    def _publish(self, status=None):
+        """Heartbeat + état lisibles par le dashboard (status None: inchangé)"""
+        with self._state_lock:
+            if status is not None:
+                self.state['status'] = status
+            self.state['heartbeat'] = datetime.now().isoformat(timespec='seconds')
+            
+            os.makedirs(REGISTRY_DIR, exist_ok=True)
+            tmp_path = f'{WORKER_STATE_PATH}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, WORKER_STATE_PATH)
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Worker d'entraînement MétéoTrader")
+    parser.add_argument('--once', action='store_true', help="Un seul cycle puis arrêt")
+    parser.add_argument('--interval', type=int, default=TRAIN_INTERVAL_SECONDS, help="Secondes entre deux cycles")
+    parser.add_argument('--n-jobs', type=int, default=None, help="Cœurs pour le fit")
+    parser.add_argument('--backfill-days', type=int, default=None, help="Stocker d'abord les prix RTE de N jours")
+    args = parser.parse_args()
+    
+    if args.backfill_days:
+        backfill_prices(args.backfill_days)
+    
+    worker = TrainingWorker(interval=args.interval, n_jobs=args.n_jobs)
+    if args.once:
+        worker.run_once()
+    else:
+        worker.run_forever()
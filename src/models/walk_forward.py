@@ -0,0 +1,281 @@
+"""
+Réentraînement walk-forward XGBoost
+- Chaque nouvelle heure (ou lot d'heures): on continue le boosting du
+  modèle courant avec quelques arbres peu profonds, appris sur ces heures
+  et un court contexte récent (une heure seule fait diverger le boosting)
+- Tous les N updates: refit complet sur la fenêtre glissante
+- Suivi de dérive: erreur du modèle incrémental vs modèle du dernier
+  refit complet, mesurée sur les heures nouvelles avant apprentissage
+"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+
+# Paramètres de XGBoostPricePredictor
+WALK_FORWARD_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 7,
+    'learning_rate': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'random_state': 42,
+}
+
+# Arbres ajoutés à chaque update: peu profonds, pas d'apprentissage faible
+INCREMENTAL_PARAMS = {'max_depth': 3, 'learning_rate': 0.05, 'subsample': 1.0}
+
+
+class WalkForwardTrainer:
+    """Modèle XGBoost mis à jour heure par heure, refit complet périodique"""
+    
+    def __init__(self, params=None, incremental_rounds=2, context_hours=24, full_refit_every=24,
+                 window_hours=24 * 90, n_jobs=None):
+        """
+        Args:
+            params: Paramètres XGBRegressor (défaut: WALK_FORWARD_PARAMS)
+            incremental_rounds: Arbres ajoutés à chaque update
+            context_hours: Heures récentes (nouvelles incluses) vues par un update
+            full_refit_every: Updates entre deux refits complets
+            window_hours: Fenêtre glissante du refit complet (heures)
+            n_jobs: Threads XGBoost
+        """
+        self.params = dict(params or WALK_FORWARD_PARAMS)
+        self.incremental_rounds = incremental_rounds
+        self.context_hours = context_hours
+        self.full_refit_every = full_refit_every
+        self.window_hours = window_hours
+        self.n_jobs = n_jobs
+        
+        self.model = None          # Chemin incrémental (servi)
+        self.reference = None      # Dernier refit complet (référence de dérive)
+        self.feature_names = None
+        self.updates_since_refit = 0
+        self.history = []
+        
+        self._X_chunks = []
+        self._y_chunks = []
+    
+    # ===== ENTRAÎNEMENT =====
+    
+    def fit_full(self, X, y):
+        """
+        Refit complet sur la fenêtre (remplace les deux chemins)
+        
+        Args:
+            X: Features (DataFrame), ordre chronologique
+            y: Cible
+        """
+        if self.feature_names is None and hasattr(X, 'columns'):
+            self.feature_names = list(X.columns)
+        
+        self._append(X, y)
+        X_window, y_window = self._window()
+        
+        start = time.perf_counter()
+        model = self._regressor(self.params['n_estimators'])
+        model.fit(X_window, y_window, verbose=False)
+        seconds = time.perf_counter() - start
+        
+        self.model = model
+        self.reference = model
+        self.updates_since_refit = 0
+        
+        self._record('full', len(y_window), seconds)
+        print(f"✅ Refit complet: {len(y_window)} heures en {seconds:.2f}s")
+        
+        return self
+    
+    def update(self, X_new, y_new):
+        """
+        Nouvelles heures: boosting continué (ou refit complet si cadence atteinte)
+        
+        Args:
+            X_new: Features des nouvelles heures
+            y_new: Prix observés
+        
+        Returns:
+            Dict de suivi de l'update (type, durée, erreurs, divergence)
+        """
+        if self.model is None:
+            self.fit_full(X_new, y_new)
+            return self.history[-1]
+        
+        # Dérive mesurée AVANT d'apprendre ces heures (erreur hors échantillon)
+        drift = self._drift(X_new, y_new)
+        
+        if self.updates_since_refit + 1 >= self.full_refit_every:
+            self.fit_full(X_new, y_new)
+            self.history[-1].update(drift)
+            return self.history[-1]
+        
+        self._append(X_new, y_new)
+        
+        X_context, y_context = self._tail(max(self.context_hours, len(y_new)))
+        
+        start = time.perf_counter()
+        model = self._regressor(self.incremental_rounds, **INCREMENTAL_PARAMS)
+        model.fit(X_context, y_context, xgb_model=self.model.get_booster(), verbose=False)
+        seconds = time.perf_counter() - start
+        
+        self.model = model
+        self.updates_since_refit += 1
+        
+        self._record('incrémental', len(y_new), seconds, **drift)
+        return self.history[-1]
+    
+    def predict(self, X):
+        """Prédiction du chemin incrémental (modèle servi)"""
+        return self.model.predict(self._as_frame(X))
+    
+    # ===== SUIVI =====
+    
+    def drift_report(self):
+        """Historique des updates (DataFrame)"""
+        return pd.DataFrame(self.history)
+    
+    def timing_summary(self):
+        """
+        Coût moyen incrémental vs refit complet
+        
+        Returns:
+            Dict avec full_seconds, incremental_seconds, speedup
+        """
+        report = self.drift_report()
+        if report.empty:
+            return {}
+        
+        full = report.loc[report['kind'] == 'full', 'seconds'].mean()
+        incremental = report.loc[report['kind'] == 'incrémental', 'seconds'].mean()
+        
+        return {
+            'full_seconds': float(full),
+            'incremental_seconds': float(incremental) if not np.isnan(incremental) else None,
+            'speedup': float(full / incremental) if incremental and not np.isnan(incremental) else None,
+        }
+    
+    def publish(self, registry, name, metrics=None):
+        """Enregistre le modèle servi au registre (cf. src/models/registry.py)"""
+        return registry.register(
+            name, self.model, self.feature_names,
+            metrics=metrics, params=self.params,
+            info={'walk_forward': self.history[-1]['kind'] if self.history else None,
+                  'n_trees': self._n_trees(self.model)}
+        )
+    
+    # ===== INTERNE =====
+    
+    def _regressor(self, n_estimators, **overrides):
+        params = {k: v for k, v in self.params.items() if k != 'n_estimators'}
+        params.update(overrides)
+        return xgb.XGBRegressor(
+            n_estimators=n_estimators,
+            objective='reg:squarederror',
+            tree_method='hist',
+            n_jobs=self.n_jobs,
+            verbosity=0,
+            **params
+        )
+    
+    def _drift(self, X_new, y_new):
+        X_new = self._as_frame(X_new)
+        y_new = np.asarray(y_new, dtype=float)
+        
+        pred_model = self.model.predict(X_new)
+        pred_reference = self.reference.predict(X_new)
+        
+        return {
+            'rmse_incremental': float(np.sqrt(np.mean((y_new - pred_model) ** 2))),
+            'rmse_reference': float(np.sqrt(np.mean((y_new - pred_reference) ** 2))),
+            'divergence': float(np.mean(np.abs(pred_model - pred_reference))),
+        }
+    
+    def _append(self, X, y):
+        self._X_chunks.append(self._as_frame(X))
+        self._y_chunks.append(np.asarray(y, dtype=float))
+        
+        # Fenêtre glissante: on oublie les lots trop anciens
+        total = sum(len(c) for c in self._y_chunks)
+        while len(self._y_chunks) > 1 and total - len(self._y_chunks[0]) >= self.window_hours:
+            total -= len(self._y_chunks[0])
+            self._X_chunks.pop(0)
+            self._y_chunks.pop(0)
+    
+    def _window(self):
+        X = pd.concat(self._X_chunks, ignore_index=True)
+        y = np.concatenate(self._y_chunks)
+        # Concaténé une fois par refit: les lots suivants repartent de là
+        self._X_chunks, self._y_chunks = [X], [y]
+        return X.iloc[-self.window_hours:], y[-self.window_hours:]
+    
+    def _tail(self, n):
+        """n dernières heures reçues (sans tout concaténer)"""
+        X_parts, y_parts, count = [], [], 0
+        for X_chunk, y_chunk in zip(reversed(self._X_chunks), reversed(self._y_chunks)):
+            take = min(n - count, len(y_chunk))
+            X_parts.append(X_chunk.iloc[len(y_chunk) - take:])
+            y_parts.append(y_chunk[len(y_chunk) - take:])
+            count += take
+            if count >= n:
+                break
+        return pd.concat(X_parts[::-1], ignore_index=True), np.concatenate(y_parts[::-1])
+    
+    def _as_frame(self, X):
+        if hasattr(X, 'columns'):
+            return X[self.feature_names] if self.feature_names else X
+        return pd.DataFrame(np.asarray(X), columns=self.feature_names)
+    
+    @staticmethod
+    def _n_trees(model):
+        return model.get_booster().num_boosted_rounds()
+    
+    def _record(self, kind, n_rows, seconds, **drift):
+        self.history.append({
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'kind': kind,
+            'n_rows': n_rows,
+            'seconds': seconds,
+            'n_trees': self._n_trees(self.model),
+            **drift
+        })
+
+
+if __name__ == "__main__":
+    print("🧪 Test walk-forward")
+    
+    rng = np.random.default_rng(42)
+    n_hours = 24 * 120
+    hours = np.arange(n_hours)
+    df = pd.DataFrame({
+        'hour': hours % 24,
+        'temperature_c': 12 + 8 * np.sin(hours / (24 * 365) * 2 * np.pi) + rng.normal(0, 3, n_hours),
+        'demand_gw': rng.normal(55, 8, n_hours),
+        'wind_speed_kmh': rng.gamma(2, 8, n_hours),
+    })
+    # Dérive lente du niveau de prix
+    df['price_eur_mwh'] = (
+        40 + 0.8 * df['demand_gw'] - 0.5 * df['wind_speed_kmh']
+        + 15 * ((df['hour'] >= 18) & (df['hour'] <= 20)) + hours * 0.005
+        + rng.normal(0, 5, n_hours)
+    )
+    
+    X = df.drop(columns='price_eur_mwh')
+    y = df['price_eur_mwh']
+    
+    history_hours = 24 * 90
+    trainer = WalkForwardTrainer(full_refit_every=24)
+    trainer.fit_full(X[:history_hours], y[:history_hours])
+    
+    for start in range(history_hours, history_hours + 24 * 7):
+        trainer.update(X[start:start + 1], y[start:start + 1])
+    
+    report = trainer.drift_report()
+    print(report.groupby('kind')[['seconds', 'n_trees', 'rmse_incremental', 'rmse_reference', 'divergence']].mean())
+    
+    summary = trainer.timing_summary()
+    print(f"\n⚡ Refit complet: {summary['full_seconds'] * 1000:.0f} ms, "
+          f"incrémental: {summary['incremental_seconds'] * 1000:.1f} ms → ×{summary['speedup']:.0f}")
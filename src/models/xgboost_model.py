@@ -21,7 +21,9 @@ class XGBoostPricePredictor:
                  learning_rate: float = 0.1,
                  subsample: float = 0.8,
                  colsample_bytree: float = 0.8,
-                 random_state: int = 42):
+                 random_state: int = 42,
+                 early_stopping_rounds: int = None,
+                 n_jobs: int = None):
         """
         Initialize XGBoost model
         
@@ -32,6 +34,9 @@ class XGBoostPricePredictor:
             subsample: Fraction échantillons par arbre
             colsample_bytree: Fraction features par arbre
             random_state: Seed reproductibilité
+            early_stopping_rounds: Arrêt si le score test ne s'améliore plus
+                pendant N arbres (None = tous les arbres)
+            n_jobs: Threads XGBoost (None = tous les cœurs)
         """
         self.model = xgb.XGBRegressor(
             n_estimators=n_estimators,
@@ -42,6 +47,8 @@ class XGBoostPricePredictor:
             random_state=random_state,
             objective='reg:squarederror',
             tree_method='hist',  # Plus rapide
+            early_stopping_rounds=early_stopping_rounds,
+            n_jobs=n_jobs,
             verbosity=0  # Pas de logs
         )
         
@@ -49,6 +56,7 @@ class XGBoostPricePredictor:
         self.training_score = None
         self.test_score = None
         self.feature_importance = None
+        self.best_iteration = None
     
     def train(self, X_train, y_train, X_test, y_test):
         """
@@ -75,6 +83,11 @@ class XGBoostPricePredictor:
             verbose=False
         )
         
+        # Early stopping: predict() utilise automatiquement la meilleure itération
+        if self.model.early_stopping_rounds:
+            self.best_iteration = self.model.best_iteration
+            print(f"   Early stopping: {self.best_iteration + 1} arbres retenus")
+        
         # Prédictions
         y_train_pred = self.model.predict(X_train)
         y_test_pred = self.model.predict(X_test)
@@ -2,23 +2,42 @@
 Système de recommandations avancées basé sur ML et analyse du marché
 """
 
+import warnings
+
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Seuils des règles de décision (balayables: src/analysis/parameter_sweep.py)
+ADVISOR_THRESHOLDS = {
+    'band_sigma': 0.5,           # Prix hors de la moyenne 24h ± band_sigma × σ (règles 1-2)
+    'trend_eur': 2.0,            # Tendance 6h minimum en €/MWh (règles 1-2)
+    'strong_trend_pct': 8.0,     # Forte hausse/baisse 6h en % (règles 3-4, bornes 8-9)
+    'moderate_trend_pct': 3.0,   # Tendance modérée 6h en % (règles 8-9)
+    'stable_trend_pct': 3.0,     # Marché stable: |tendance 6h| en dessous (règle 5)
+    'low_volatility_ratio': 1.2,   # Volatilité prévue / passée: marché calme (règle 5)
+    'high_volatility_ratio': 1.8,  # Volatilité prévue / passée: attendre (règle 6)
+    'arbitrage_eur': 10.0,       # Pic 24h - prix actuel pour arbitrage intraday (règle 7)
+}
+
 
 class AdvancedTradingAdvisor:
     """
     Conseiller trading avancé utilisant ML + règles métier
     """
     
-    def __init__(self, model, features):
+    def __init__(self, model, features, thresholds=None):
         """
         Args:
             model: Modèle ML entraîné (Random Forest ou XGBoost)
             features: Liste des features utilisées par le modèle
+            thresholds: Seuils des règles (défaut: ADVISOR_THRESHOLDS, clés partielles acceptées)
         """
         self.model = model
         self.features = features
+        self.thresholds = {**ADVISOR_THRESHOLDS, **(thresholds or {})}
     
     def generate_recommendation(self, df_historical, df_future_predictions, contracts=None):
         """
@@ -90,6 +109,8 @@ class AdvancedTradingAdvisor:
         
         # === RÈGLES DE DÉCISION ===
         
+        t = self.thresholds
+        
         action = 'HOLD'
         confiance = 0.5
         raison = ""
@@ -97,7 +118,7 @@ class AdvancedTradingAdvisor:
         horizon = 'next_6h'
         
         # RÈGLE 1: Prix bas + hausse prévue → BUY
-        if current_price < avg_24h - 0.5 * std_24h and price_trend_6h > 2:
+        if current_price < avg_24h - t['band_sigma'] * std_24h and price_trend_6h > t['trend_eur']:
             action = 'BUY'
             confiance = min(0.9, 0.6 + abs(price_trend_pct_6h) / 20)
             raison = f"Prix actuel ({current_price:.2f} €/MWh) inférieur à la moyenne 24h (-{abs(position_vs_avg)*100:.1f}%). Hausse de {price_trend_pct_6h:+.1f}% prévue dans les 6h. **Opportunité d'achat**."
@@ -105,7 +126,7 @@ class AdvancedTradingAdvisor:
             horizon = 'next_6h'
         
         # RÈGLE 2: Prix élevé + baisse prévue → SELL
-        elif current_price > avg_24h + 0.5 * std_24h and price_trend_6h < -2:
+        elif current_price > avg_24h + t['band_sigma'] * std_24h and price_trend_6h < -t['trend_eur']:
             action = 'SELL'
             confiance = min(0.9, 0.6 + abs(price_trend_pct_6h) / 20)
             raison = f"Prix actuel ({current_price:.2f} €/MWh) supérieur à la moyenne 24h (+{abs(position_vs_avg)*100:.1f}%). Baisse de {price_trend_pct_6h:.1f}% prévue dans les 6h. **Opportunité de vente/couverture**."
@@ -113,7 +134,7 @@ class AdvancedTradingAdvisor:
             horizon = 'next_6h'
         
         # RÈGLE 3: Forte hausse prévue (peu importe le prix actuel) → BUY
-        elif price_trend_pct_6h > 8:
+        elif price_trend_pct_6h > t['strong_trend_pct']:
             action = 'BUY'
             confiance = min(0.85, 0.55 + price_trend_pct_6h / 30)
             raison = f"Forte hausse prévue: **+{price_trend_pct_6h:.1f}%** dans les 6h ({current_price:.2f} → {avg_next_6h:.2f} €/MWh). Signal haussier puissant."
@@ -121,7 +142,7 @@ class AdvancedTradingAdvisor:
             horizon = 'immediate'
         
         # RÈGLE 4: Forte baisse prévue → SELL
-        elif price_trend_pct_6h < -8:
+        elif price_trend_pct_6h < -t['strong_trend_pct']:
             action = 'SELL'
             confiance = min(0.85, 0.55 + abs(price_trend_pct_6h) / 30)
             raison = f"Forte baisse prévue: **{price_trend_pct_6h:.1f}%** dans les 6h ({current_price:.2f} → {avg_next_6h:.2f} €/MWh). Signal baissier puissant."
@@ -129,7 +150,7 @@ class AdvancedTradingAdvisor:
             horizon = 'immediate'
         
         # RÈGLE 5: Prix stable + volatilité faible → HOLD
-        elif abs(price_trend_pct_6h) < 3 and volatility_ratio < 1.2:
+        elif abs(price_trend_pct_6h) < t['stable_trend_pct'] and volatility_ratio < t['low_volatility_ratio']:
             action = 'HOLD'
             confiance = 0.7
             raison = f"Marché stable. Variation prévue: {price_trend_pct_6h:+.1f}% dans les 6h. Volatilité faible. **Maintenir les positions actuelles**."
@@ -137,7 +158,7 @@ class AdvancedTradingAdvisor:
             horizon = 'next_6h'
         
         # RÈGLE 6: Forte volatilité prévue → WAIT (risque élevé)
-        elif volatility_ratio > 1.8:
+        elif volatility_ratio > t['high_volatility_ratio']:
             action = 'WAIT'
             confiance = 0.65
             raison = f"Volatilité élevée prévue (×{volatility_ratio:.1f}). Écart attendu: {min_next_24h:.2f} - {max_next_24h:.2f} €/MWh. **Attendre clarification du marché**."
@@ -145,7 +166,7 @@ class AdvancedTradingAdvisor:
             horizon = 'next_24h'
         
         # RÈGLE 7: Opportunité d'arbitrage 24h (achat maintenant, vente plus tard)
-        elif max_next_24h - current_price > 10:
+        elif max_next_24h - current_price > t['arbitrage_eur']:
             action = 'BUY'
             confiance = min(0.8, 0.5 + (max_next_24h - current_price) / 40)
             raison = f"Arbitrage intraday détecté. Pic à {max_next_24h:.2f} €/MWh prévu dans les 24h (vs {current_price:.2f} actuellement). Gain potentiel: **+{max_next_24h - current_price:.2f} €/MWh**."
@@ -153,7 +174,7 @@ class AdvancedTradingAdvisor:
             horizon = 'next_24h'
         
         # RÈGLE 8: Tendance haussière modérée → BUY avec prudence
-        elif 3 <= price_trend_pct_6h <= 8:
+        elif t['moderate_trend_pct'] <= price_trend_pct_6h <= t['strong_trend_pct']:
             action = 'BUY'
             confiance = 0.6
             raison = f"Tendance haussière modérée: +{price_trend_pct_6h:.1f}% dans les 6h. Prix stable autour de {current_price:.2f} €/MWh. Opportunité limitée mais favorable."
@@ -161,7 +182,7 @@ class AdvancedTradingAdvisor:
             horizon = 'next_6h'
         
         # RÈGLE 9: Tendance baissière modérée → SELL avec prudence
-        elif -8 <= price_trend_pct_6h <= -3:
+        elif -t['strong_trend_pct'] <= price_trend_pct_6h <= -t['moderate_trend_pct']:
             action = 'SELL'
             confiance = 0.6
             raison = f"Tendance baissière modérée: {price_trend_pct_6h:.1f}% dans les 6h. Envisager de couvrir les positions ou réduire l'exposition."
@@ -199,6 +220,32 @@ class AdvancedTradingAdvisor:
             'details': details
         }
     
+    def replay(self, df_history, price_col='price_eur_mwh', prediction_col='predicted_price'):
+        """
+        Rejoue generate_recommendation sur chaque heure de l'historique (vectorisé)
+        
+        À l'heure i: prix réels des 24 dernières heures (i incluse) et prix
+        prédits des 24 heures suivantes, comme un appel scalaire à cette heure.
+        Les textes 'raison' ne sont pas générés.
+        
+        Args:
+            df_history: DataFrame chronologique avec prix réels et prédits
+            price_col: Colonne des prix réels
+            prediction_col: Colonne des prix prédits
+        
+        Returns:
+            DataFrame: timestamp (si présent), action, confiance, impact_eur_mwh,
+            horizon, rule (1-9, 0 = défaut, -1 = données insuffisantes) + détails
+        """
+        windows = advisor_windows(df_history[price_col].to_numpy(dtype=float),
+                                  df_history[prediction_col].to_numpy(dtype=float))
+        signals = advisor_rules(windows, self.thresholds)
+        
+        replay = pd.DataFrame({**signals, **windows})
+        if 'timestamp' in df_history.columns:
+            replay.insert(0, 'timestamp', df_history['timestamp'].to_numpy())
+        return replay
+    
     def find_optimal_trading_windows(self, df_predictions, window_hours=6):
         """
         Trouve les meilleurs moments pour acheter/vendre sur les prochaines 48h
@@ -258,3 +305,166 @@ class AdvancedTradingAdvisor:
             'arbitrage_opportunities': arbitrage_opps[:5]
         }
 
+
+# ===== REJEU VECTORISÉ =====
+
+def advisor_windows(actual, predicted):
+    """
+    Statistiques des fenêtres de generate_recommendation pour chaque heure
+    
+    Fenêtres par ligne: 24 prix réels jusqu'à l'heure i incluse (moins en
+    début d'historique), 6h / 24h de prix prédits à partir de l'heure i + 1
+    (tronquées en fin d'historique).
+    
+    Args:
+        actual: Prix réels (ordre chronologique)
+        predicted: Prix prédits des mêmes heures
+    
+    Returns:
+        Dict d'arrays (heures): clés de 'details' + has_data
+    """
+    actual = np.asarray(actual, dtype=float)
+    predicted = np.asarray(predicted, dtype=float)
+    n = len(actual)
+    pad = np.full(23, np.nan)
+    
+    # Lignes = fenêtres, NaN hors historique (ignorés par les réductions nan*)
+    recent = sliding_window_view(np.concatenate([pad, actual]), 24)
+    future = sliding_window_view(np.concatenate([predicted[1:], pad, [np.nan, np.nan]]), 24)[:n]
+    
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        # Dernière heure: aucune prédiction suivante (fenêtres vides)
+        warnings.simplefilter('ignore', RuntimeWarning)
+        
+        current_price = actual
+        avg_24h = np.nanmean(recent, axis=1)
+        std_24h = np.nanstd(recent, axis=1)
+        
+        avg_next_6h = np.nanmean(future[:, :6], axis=1)
+        avg_next_24h = np.nanmean(future, axis=1)
+        min_next_24h = np.nanmin(future, axis=1)
+        max_next_24h = np.nanmax(future, axis=1)
+        volatility_predicted = np.nanstd(future, axis=1)
+        
+        trend_6h = avg_next_6h - current_price
+        volatility_ratio = np.where(std_24h > 0, volatility_predicted / std_24h, 1.0)
+        position_vs_avg = np.where(avg_24h > 0, (current_price - avg_24h) / avg_24h, 0.0)
+        
+        return {
+            'current_price': current_price,
+            'avg_24h': avg_24h,
+            'std_24h': std_24h,
+            'avg_next_6h': avg_next_6h,
+            'avg_next_24h': avg_next_24h,
+            'min_next_24h': min_next_24h,
+            'max_next_24h': max_next_24h,
+            'trend_6h': trend_6h,
+            'trend_6h_pct': trend_6h / current_price * 100,
+            'trend_24h_pct': (avg_next_24h - current_price) / current_price * 100,
+            'volatility_ratio': volatility_ratio,
+            'position_vs_avg_pct': position_vs_avg * 100,
+            'has_data': np.arange(n) < n - 1,
+        }
+
+
+def advisor_rules(windows, thresholds=None):
+    """
+    Règles 1-9 de generate_recommendation évaluées sur toutes les heures (np.select)
+    
+    Les seuils peuvent être des arrays (ex: forme (1, k)): les fenêtres
+    (forme (n, 1)) sont diffusées et chaque colonne est une configuration.
+    
+    Args:
+        windows: advisor_windows()
+        thresholds: Seuils (défaut: ADVISOR_THRESHOLDS, clés partielles acceptées)
+    
+    Returns:
+        Dict d'arrays: action, confiance, impact_eur_mwh, horizon, rule
+    """
+    t = {**ADVISOR_THRESHOLDS, **(thresholds or {})}
+    w = windows
+    
+    cur, avg, std = w['current_price'], w['avg_24h'], w['std_24h']
+    trend, pct = w['trend_6h'], w['trend_6h_pct']
+    ratio, spread = w['volatility_ratio'], w['max_next_24h'] - w['current_price']
+    
+    with np.errstate(invalid='ignore'):
+        # Même ordre que la cascade if/elif: la première règle vraie l'emporte
+        conditions = [
+            ~w['has_data'],
+            (cur < avg - t['band_sigma'] * std) & (trend > t['trend_eur']),
+            (cur > avg + t['band_sigma'] * std) & (trend < -t['trend_eur']),
+            pct > t['strong_trend_pct'],
+            pct < -t['strong_trend_pct'],
+            (np.abs(pct) < t['stable_trend_pct']) & (ratio < t['low_volatility_ratio']),
+            ratio > t['high_volatility_ratio'],
+            spread > t['arbitrage_eur'],
+            (t['moderate_trend_pct'] <= pct) & (pct <= t['strong_trend_pct']),
+            (-t['strong_trend_pct'] <= pct) & (pct <= -t['moderate_trend_pct']),
+        ]
+    
+    actions = ['WAIT', 'BUY', 'SELL', 'BUY', 'SELL', 'HOLD', 'WAIT', 'BUY', 'BUY', 'SELL']
+    confidences = [
+        0.3,
+        np.minimum(0.9, 0.6 + np.abs(pct) / 20),
+        np.minimum(0.9, 0.6 + np.abs(pct) / 20),
+        np.minimum(0.85, 0.55 + pct / 30),
+        np.minimum(0.85, 0.55 + np.abs(pct) / 30),
+        0.7,
+        0.65,
+        np.minimum(0.8, 0.5 + spread / 40),
+        0.6,
+        0.6,
+    ]
+    impacts = [0.0, trend, np.abs(trend), trend, np.abs(trend), 0.0,
+               w['max_next_24h'] - w['min_next_24h'], spread, trend, np.abs(trend)]
+    horizons = ['immediate', 'next_6h', 'next_6h', 'immediate', 'immediate', 'next_6h',
+                'next_24h', 'next_24h', 'next_6h', 'next_6h']
+    
+    return {
+        'action': np.select(conditions, actions, default='HOLD'),
+        'confiance': np.select(conditions, confidences, default=0.5),
+        'impact_eur_mwh': np.select(conditions, impacts, default=0.0),
+        'horizon': np.select(conditions, horizons, default='next_6h'),
+        'rule': np.select(conditions, [-1] + list(range(1, 10)), default=0),
+    }
+
+
+if __name__ == "__main__":
+    import time
+    
+    print("🧪 Test rejeu vectorisé vs generate_recommendation...")
+    
+    rng = np.random.default_rng(42)
+    n_hours = 24 * 365
+    timestamps = pd.date_range('2024-01-01', periods=n_hours, freq='h')
+    actual = 70 + 25 * np.sin(timestamps.hour.to_numpy() / 24 * 2 * np.pi) + rng.normal(0, 12, n_hours)
+    actual[rng.choice(n_hours, 50, replace=False)] = 0.0  # Prix nuls (divisions par zéro)
+    history = pd.DataFrame({
+        'timestamp': timestamps,
+        'price_eur_mwh': actual,
+        'predicted_price': actual + rng.normal(0, 10, n_hours),
+    })
+    
+    advisor = AdvancedTradingAdvisor(model=None, features=[])
+    
+    start = time.perf_counter()
+    replay = advisor.replay(history)
+    vector_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    prices, predictions = history[['price_eur_mwh']], history['predicted_price'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scalar = pd.DataFrame([
+            advisor.generate_recommendation(prices.iloc[:i + 1], predictions[i + 1:i + 25])
+            for i in range(n_hours)
+        ])
+    scalar_seconds = time.perf_counter() - start
+    
+    assert (replay['action'] == scalar['action']).all()
+    assert (replay['horizon'] == scalar['horizon']).all()
+    np.testing.assert_allclose(replay['confiance'], scalar['confiance'], rtol=1e-9)
+    np.testing.assert_allclose(replay['impact_eur_mwh'], scalar['impact_eur_mwh'], rtol=1e-9, atol=1e-9)
+    print(f"✅ {n_hours} heures identiques: {replay['action'].value_counts().to_dict()}")
+    print(f"⚡ Scalaire: {scalar_seconds:.2f}s, vectorisé: {vector_seconds * 1000:.0f} ms "
+          f"→ ×{scalar_seconds / vector_seconds:.0f}")
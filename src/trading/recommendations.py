@@ -21,7 +21,7 @@ class RecommendationEngine:
         self.db = db
     
     def generate_recommendation(self, current_price, predicted_prices, contracts_df, 
-                              volatility_threshold=10):
+                              volatility_threshold=10, scenarios=None, zone='FR'):
         """
         Génère une recommandation basée sur les données actuelles
         
@@ -30,9 +30,11 @@ class RecommendationEngine:
             predicted_prices: DataFrame avec prédictions 48h (timestamp, predicted_price)
             contracts_df: DataFrame avec contrats actifs
             volatility_threshold: Seuil de volatilité acceptable
+            scenarios: PriceScenarios (src/analysis/scenarios.py) pour les probabilités
+            zone: Zone d'achat dans les scénarios
         
         Returns:
-            Dict avec recommandation complète
+            Dict avec recommandation complète (+ probability, gain_p5 si scénarios)
         """
         # Si pas de contrats, pas de recommandation
         if contracts_df.empty:
@@ -42,7 +44,9 @@ class RecommendationEngine:
                 'volume_mwh': 0,
                 'target_price': None,
                 'expected_gain': 0,
-                'reasoning': "Aucun contrat actif. Ajoutez des contrats clients pour obtenir des recommandations."
+                'reasoning': "Aucun contrat actif. Ajoutez des contrats clients pour obtenir des recommandations.",
+                'probability': None,
+                'gain_p5': None
             }
         
         # Calculer prix garanti moyen pondéré
@@ -73,6 +77,10 @@ class RecommendationEngine:
         suggested_volume = total_volume * 0.1
         expected_total_gain = potential_gain_per_mwh * suggested_volume
         
+        # Distribution: probabilité d'atteindre le prix cible, gain pessimiste (5e centile)
+        risk = self._scenario_risk(scenarios, zone, predicted_prices, target_buy_price,
+                                   weighted_guaranteed, suggested_volume)
+        
         # === BUY SIGNAL ===
         if min_predicted < target_buy_price and volatility < volatility_threshold:
             score = self._calculate_buy_score(
@@ -96,6 +104,11 @@ class RecommendationEngine:
                 f"Volatilité: {'Basse ✓' if volatility < volatility_threshold else 'Élevée ⚠️'}\n"
                 f"Gain total attendu: {expected_total_gain:.0f}€"
             )
+            if risk['probability'] is not None:
+                reasoning += (
+                    f"\n\nProbabilité d'atteindre le prix cible: {risk['probability']:.0%}\n"
+                    f"Gain pessimiste (5%): {risk['gain_p5']:.0f}€"
+                )
             
             return {
                 'action': 'BUY',
@@ -104,7 +117,8 @@ class RecommendationEngine:
                 'target_price': min_predicted,
                 'expected_gain': expected_total_gain,
                 'reasoning': reasoning,
-                'best_time': min_predicted_time
+                'best_time': min_predicted_time,
+                **risk
             }
         
         # === HEDGE SIGNAL ===
@@ -127,7 +141,8 @@ class RecommendationEngine:
                 'target_price': current_price,
                 'expected_gain': 0,  # Hedge = protection, pas de gain
                 'reasoning': reasoning,
-                'best_time': datetime.now()
+                'best_time': datetime.now(),
+                **risk
             }
         
         # === HOLD SIGNAL ===
@@ -150,9 +165,33 @@ class RecommendationEngine:
                 'target_price': target_buy_price,
                 'expected_gain': 0,
                 'reasoning': reasoning,
-                'best_time': min_predicted_time
+                'best_time': min_predicted_time,
+                **risk
             }
     
+    def _scenario_risk(self, scenarios, zone, predicted_prices, target_buy_price,
+                       guaranteed_price, volume):
+        """
+        Probabilité que le prix descende sous la cible sur l'horizon, et
+        gain au 5e centile si on achète au minimum de chaque scénario
+        
+        Returns:
+            Dict avec probability, gain_p5 (None sans scénarios)
+        """
+        if scenarios is None or zone not in scenarios or predicted_prices.empty:
+            return {'probability': None, 'gain_p5': None}
+        
+        paths = scenarios.zone_paths(zone, predicted_prices['timestamp'])
+        if np.isnan(paths).all():
+            return {'probability': None, 'gain_p5': None}
+        
+        min_price = np.nanmin(paths, axis=1)  # Meilleur prix de chaque scénario
+        
+        return {
+            'probability': float((min_price < target_buy_price).mean()),
+            'gain_p5': float(np.percentile((guaranteed_price - min_price) * volume, 5)),
+        }
+    
     def _calculate_buy_score(self, current_price, predicted_price, guaranteed_price, 
                            volatility, volatility_threshold):
         """